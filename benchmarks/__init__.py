@@ -0,0 +1,14 @@
+"""
+Benchmarks for the trampoline variants
+
+Runs the same workloads through every calling convention in this repository
+-- the `simpy_fsm.v1` ... `v4` trampolines, the string-dispatch `run()` loop
+of `examples/4-preemptive-resource/v5.py`, the `Transition`-exception
+trampoline of `examples/standalone_example.py`, and plain Simpy process
+functions -- and reports what each convention costs.
+
+Run it from the repository root:
+
+    python -m benchmarks
+    python -m benchmarks --workload interrupt_heavy --impl old v1 v4
+"""
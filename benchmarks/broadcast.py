@@ -0,0 +1,112 @@
+"""
+Measure what it costs to turn `n` idle v4 FSMs on and off: one
+`process.interrupt()` per FSM, one `fsm.signal()` per FSM, and one
+`SignalBus.publish()` for all of them.
+
+The FSMs wait for events that never happen, so the time per delivery is
+the cost of the broadcast and the transition it causes, and nothing else.
+
+Run it from the repository root:
+
+    python -m benchmarks.broadcast
+"""
+
+import argparse
+import time
+
+import simpy
+
+from simpy_fsm import v4
+from simpy_fsm.bus import SignalBus
+
+
+class Interrupted(v4.FSM):
+    __slots__ = ()
+
+    def on(self):
+        try:
+            yield self.env.event()
+        except simpy.Interrupt:
+            return self.off
+
+    def off(self):
+        try:
+            yield self.env.event()
+        except simpy.Interrupt:
+            return self.on
+
+
+class Signalled(v4.FSM):
+    __slots__ = ()
+
+    signals = {"on": {"toggle": "off"}, "off": {"toggle": "on"}}
+
+    def on(self):
+        yield self.env.event()
+
+    def off(self):
+        yield self.env.event()
+
+
+def interrupt_each(env, fsms, bus):
+    for fsm in fsms:
+        fsm.process.interrupt("toggle")
+
+
+def signal_each(env, fsms, bus):
+    for fsm in fsms:
+        fsm.signal("toggle")
+
+
+def publish(env, fsms, bus):
+    bus.publish("all", "toggle")
+
+
+METHODS = {
+    "interrupt": (Interrupted, interrupt_each),
+    "signal": (Signalled, signal_each),
+    "bus": (Signalled, publish),
+}
+
+
+def toggler(env, fsms, bus, toggle, ticks):
+    for _ in range(ticks):
+        yield env.timeout(1)
+        toggle(env, fsms, bus)
+
+
+def measure(cls, toggle, n: int, ticks: int) -> float:
+    """Return the seconds per delivered toggle."""
+    env = simpy.Environment()
+    fsms = cls.spawn_many(env, n, "off")
+    bus = SignalBus(env)
+    bus.subscribe(fsms, "all")
+    env.process(toggler(env, fsms, bus, toggle, ticks))
+    env.run(until=0.5)  # Start the FSMs
+    start = time.perf_counter()
+    env.run()
+    elapsed = time.perf_counter() - start
+    assert fsms.state_counts()["on" if ticks % 2 else "off"] == n
+    return elapsed / (n * ticks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.broadcast",
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=10_000,
+        help="number of FSMs (default: 10000)")
+    parser.add_argument("--ticks", type=int, default=20,
+        help="toggles per FSM (default: 20)")
+    parser.add_argument("--repeat", type=int, default=3,
+        help="report the best of this many runs (default: 3)")
+    args = parser.parse_args(argv)
+
+    print(f"{'method':<10} {'ns/FSM':>8} {'events/toggle':>14}")
+    for name, (cls, toggle) in METHODS.items():
+        best = min(measure(cls, toggle, args.n, args.ticks) for _ in range(args.repeat))
+        events = 1 if toggle is publish else args.n
+        print(f"{name:<10} {best * 1e9:>8.0f} {events:>14}")
+
+
+if __name__ == "__main__":
+    main()
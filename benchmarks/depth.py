@@ -0,0 +1,108 @@
+"""
+Measure what nesting costs: the time per event of a state machine whose
+running state is `depth` sub-machines deep, with the sub-machines nested
+with `yield from substate.generator` (`simpy_fsm.v4`), and with the stack
+driver of `simpy_fsm.hsm`.
+
+The innermost machine only waits for timeouts, so the time per event is
+the cost of getting each event's value down to it.
+
+Run it from the repository root:
+
+    python -m benchmarks.depth
+"""
+
+import argparse
+import time
+
+import simpy
+
+from simpy_fsm import hsm, v4
+
+
+EVENTS = 100_000
+
+
+class V4Level(v4.SubstateFSM):
+    __slots__ = ("depth",)
+
+    def __init__(self, env, initial_state="run", *, depth):
+        self.depth = depth
+        super().__init__(env, initial_state)
+
+    def run(self):
+        if self.depth:
+            yield from V4Level(self.env, depth=self.depth - 1).generator
+        else:
+            for _ in range(EVENTS):
+                yield self.env.timeout(1)
+
+
+class V4Top(v4.FSM):
+    __slots__ = ("depth",)
+
+    def __init__(self, env, initial_state="run", *, depth):
+        self.depth = depth
+        super().__init__(env, initial_state)
+
+    run = V4Level.run
+
+
+class HsmLevel(hsm.SubstateFSM):
+    __slots__ = ("depth",)
+
+    def __init__(self, env, initial_state="run", *, depth):
+        self.depth = depth
+        super().__init__(env, initial_state)
+
+    def run(self):
+        if self.depth:
+            yield HsmLevel(self.env, depth=self.depth - 1)
+        else:
+            for _ in range(EVENTS):
+                yield self.env.timeout(1)
+
+
+class HsmTop(hsm.FSM):
+    __slots__ = ("depth",)
+
+    def __init__(self, env, initial_state="run", *, depth):
+        self.depth = depth
+        super().__init__(env, initial_state)
+
+    run = HsmLevel.run
+
+
+ENGINES = {"v4": V4Top, "hsm": HsmTop}
+
+
+def measure(top: type, depth: int) -> float:
+    """Return the seconds per event of a machine nested `depth` deep."""
+    env = simpy.Environment()
+    top(env, depth=depth)
+    start = time.perf_counter()
+    env.run()
+    elapsed = time.perf_counter() - start
+    assert env.now == EVENTS
+    return elapsed / EVENTS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.depth",
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--depth", type=int, nargs="+", default=[0, 1, 5, 10],
+        help="nesting depths to measure (default: 0 1 5 10)")
+    parser.add_argument("--repeat", type=int, default=3,
+        help="report the best of this many runs (default: 3)")
+    args = parser.parse_args(argv)
+
+    print(f"{'depth':>5} " + " ".join(f"{name + ' ns/event':>14}" for name in ENGINES))
+    for depth in args.depth:
+        row = [
+            min(measure(top, depth) for _ in range(args.repeat)) for top in ENGINES.values()
+        ]
+        print(f"{depth:>5} " + " ".join(f"{seconds * 1e9:>14.0f}" for seconds in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Measure the cyclic garbage collector's share of a large model's run: the
+v4 machine shop with `n` machines (and a repairman per 10 machines), run
+as usual, and run inside `simpy_fsm.spawn.gc_frozen()`, which freezes the
+model built during setup out of the collector.
+
+Reported: the run time (including the full collection that `gc_frozen`
+does first, which is also shown on its own), then the collections during
+the run per generation, the total and the longest pause of the collector
+during the run, and the parts made, which must be equal.
+
+Run it from the repository root:
+
+    python -m benchmarks.gcpause
+"""
+
+import argparse
+import contextlib
+import gc
+import time
+
+import simpy
+
+from benchmarks import machine_shop
+from benchmarks.machine_shop import v4
+from simpy_fsm.spawn import gc_frozen
+
+
+MODES = {"plain": contextlib.nullcontext, "frozen": gc_frozen}
+
+
+class Pauses:
+    """Record the collections the garbage collector makes, and how long
+    each of them takes."""
+
+    def __init__(self):
+        self.pauses = []
+        self._start = 0.0
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self._start = time.perf_counter()
+        else:
+            self.pauses.append((info["generation"], time.perf_counter() - self._start))
+
+
+def measure(mode, machines: int, sim_time: float):
+    """Return (run seconds, seconds of the freeze's collection, the
+    (generation, seconds) of the collections during the run, parts
+    made)."""
+    gc.collect()
+    env = simpy.Environment()
+    shop = machine_shop.setup(
+        env, v4, machines=machines, repairmen=max(1, machines // 10)
+    )
+    pauses = Pauses()
+    gc.callbacks.append(pauses)
+    try:
+        start = time.perf_counter()
+        with MODES[mode]():
+            env.run(until=sim_time)
+        elapsed = time.perf_counter() - start
+    finally:
+        gc.callbacks.remove(pauses)
+    collections = pauses.pauses
+    freeze = 0.0
+    if mode == "frozen":
+        freeze = collections.pop(0)[1]
+    return elapsed, freeze, collections, shop.checksum()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.gcpause",
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, nargs="+", default=[10_000, 100_000],
+        help="numbers of machines to measure (default: 10000 100000)")
+    parser.add_argument("--time", type=float, default=None,
+        help="simulated minutes (default: 2000000 / n)")
+    parser.add_argument("--repeat", type=int, default=3,
+        help="report the fastest of this many runs (default: 3)")
+    args = parser.parse_args(argv)
+
+    print(f"{'n':>7} {'mode':>7} {'run s':>7} {'freeze ms':>10} {'gen0':>6} {'gen1':>5} "
+          f"{'gen2':>5} {'GC ms':>7} {'max ms':>7} {'parts':>9}")
+    for n in args.n:
+        sim_time = args.time if args.time is not None else 2_000_000 / n
+        for mode in MODES:
+            runs = [measure(mode, n, sim_time) for _ in range(args.repeat)]
+            elapsed, freeze, collections, parts = min(runs, key=lambda run: run[0])
+            counts = [
+                sum(1 for generation, _ in collections if generation == g)
+                for g in range(3)
+            ]
+            seconds = [pause for _, pause in collections]
+            print(f"{n:>7} {mode:>7} {elapsed:>7.2f} {freeze * 1e3:>10.0f} "
+                  f"{counts[0]:>6} {counts[1]:>5} {counts[2]:>5} "
+                  f"{sum(seconds) * 1e3:>7.0f} {max(seconds, default=0) * 1e3:>7.1f} "
+                  f"{parts:>9}")
+
+
+if __name__ == "__main__":
+    main()
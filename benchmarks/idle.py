@@ -0,0 +1,85 @@
+"""
+Measure what an idle population costs: `n` v4 FSMs that wait to be switched
+on, for `hours` of simulated time (one tick is a minute). A polling FSM
+wakes up every 100 ticks to stay alive; a `dormant()` one waits for its
+signal without any event.
+
+Run it from the repository root:
+
+    python -m benchmarks.idle
+"""
+
+import argparse
+import time
+
+import simpy
+
+from simpy_fsm import v4
+
+
+class Polling(v4.FSM):
+    __slots__ = ()
+
+    signals = {"off": {"on": "on"}}
+
+    def off(self):
+        yield self.env.timeout(100)
+        return self.off
+
+    def on(self):
+        yield self.env.timeout(1)
+
+
+class Dormant(v4.FSM):
+    __slots__ = ()
+
+    signals = {"off": {"on": "on"}}
+
+    off = v4.dormant()
+
+    def on(self):
+        yield self.env.timeout(1)
+
+
+KINDS = {"polling": Polling, "dormant": Dormant}
+
+
+def measure(cls: type, n: int, hours: int):
+    """Return the seconds and the events it takes to keep `n` FSMs idle for
+    `hours`, and then switch them all on."""
+    env = simpy.Environment()
+    fsms = cls.spawn_many(env, n, "off")
+    while env.peek() == 0:  # Start the FSMs
+        env.step()
+    events = 0
+    step = env.step
+    start = time.perf_counter()
+    until = hours * 60
+    while env.peek() < until:
+        step()
+        events += 1
+    fsms.signal("on")
+    env.run()
+    elapsed = time.perf_counter() - start
+    assert fsms.alive() == 0
+    return elapsed, events
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.idle",
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=10_000,
+        help="number of FSMs (default: 10000)")
+    parser.add_argument("--hours", type=int, default=24,
+        help="simulated hours of idling (default: 24)")
+    args = parser.parse_args(argv)
+
+    print(f"{'kind':<8} {'run ms':>8} {'idle events':>12} {'events/FSM/hour':>16}")
+    for name, cls in KINDS.items():
+        elapsed, events = measure(cls, args.n, args.hours)
+        per_hour = events / args.n / args.hours
+        print(f"{name:<8} {elapsed * 1e3:>8.0f} {events:>12} {per_hour:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Machine shop workload
+
+The scenario from `examples/4-preemptive-resource`: *n* machines make parts
+and break down every now and then; broken machines preempt the repairman's
+unimportant work. Every implementation module in this package models the
+same scenario with the same transitions, so the only difference between them
+is the calling convention that drives the states.
+
+Each implementation module exposes `build(shop)`, which creates the
+machines and the unimportant work on `shop.env` and stores them on the shop.
+"""
+
+import random
+
+import simpy
+
+
+PT_MEAN = 10.0  # Avg. processing time in minutes
+PT_SIGMA = 2.0  # Sigma of processing time
+
+MTTF = 300.0  # Mean time to failure in minutes
+REPAIR_TIME = 30.0  # Time it takes to repair a machine in minutes
+
+JOB_DURATION = 30.0  # Duration of other jobs in minutes
+
+RANDOM_SEED = 42
+
+
+# Implementation name -> module in this package.
+IMPLEMENTATIONS = {
+    "old": "old",
+    "v1": "v1",
+    "v2": "v2",
+    "v3": "v3",
+    "v4": "v4",
+    "v4_timed": "v4_timed",
+    "v4_looping": "v4_looping",
+    "v4_flat": "v4_flat",
+    "v4_signals": "v4_signals",
+    "v4_regions": "v4_regions",
+    "v4_timers": "v4_timers",
+    "v4_watchdog": "v4_watchdog",
+    "v4_sleep": "v4_sleep",
+    "v5": "v5",
+    "cps": "cps",
+    "transition": "transition",
+}
+
+
+class Shop:
+    """Everything one run of the machine shop shares: parameters, random
+    streams, the repairman resource, and the benchmark counters.
+
+    State methods count every state they enter in `transitions`, and every
+    `simpy.Interrupt` they catch in `interrupts`.
+    """
+
+    def __init__(
+        self,
+        env,
+        *,
+        machines=10,
+        mttf=MTTF,
+        repair_time=REPAIR_TIME,
+        repairmen=1,
+        seed=RANDOM_SEED
+    ):
+        self.env = env
+        self.n_machines = machines
+        self.repair_time = repair_time
+        self.job_duration = JOB_DURATION
+        self.break_mean = 1 / mttf
+        self.rng1 = random.Random(seed)
+        self.rng2 = random.Random(seed)
+        self.repairman = simpy.PreemptiveResource(env, capacity=repairmen)
+
+        self.machines = []
+        self.unimportant_work = None
+
+        self.transitions = 0
+        self.interrupts = 0
+
+    def time_per_part(self):
+        """Return actual processing time for a concrete part."""
+        return abs(self.rng1.normalvariate(PT_MEAN, PT_SIGMA))
+
+    def time_to_failure(self):
+        """Return time until next failure for a machine."""
+        return self.rng2.expovariate(self.break_mean)
+
+    def checksum(self):
+        """Return the total number of parts made: equal across
+        implementations that consume the random streams in the same order."""
+        return sum(machine.parts_made for machine in self.machines)
+
+
+def setup(env, module, **params):
+    """Create a shop on `env` and populate it with `module.build()`."""
+    shop = Shop(env, **params)
+    module.build(shop)
+    return shop
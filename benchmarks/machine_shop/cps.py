@@ -0,0 +1,108 @@
+"""Machine shop on `simpy_fsm.cps`: states are plain `(self)` methods that
+return `(event, next_state[, interrupt_state])`, run without a Simpy
+Process.
+
+What a generator state does after its `yield` moves into a continuation
+state (`part_done`, `broken`, ...). Continuation states return their
+successor right away and are not counted as transitions, so the counters
+match the generator implementations."""
+
+from simpy_fsm.cps import FSM
+
+
+class Machine(FSM):
+    __slots__ = (
+        "shop", "parts_made", "broken", "work_left", "breaker", "start",
+        "repairman_request",
+    )
+
+    def __init__(self, shop, initial_state="working"):
+        self.shop = shop
+        self.parts_made = 0
+        self.broken = False
+        self.work_left = shop.time_per_part()
+        self.breaker = MachineFailure(shop, machine=self)
+        super().__init__(shop.env, initial_state)
+
+    def working(self):
+        self.shop.transitions += 1
+        self.broken = False
+        self.start = self.env.now
+        return self.env.timeout(self.work_left), self.part_done, self.broken_down
+
+    def part_done(self):
+        self.parts_made += 1
+        self.work_left = self.shop.time_per_part()
+        return self.working
+
+    def broken_down(self):
+        self.shop.interrupts += 1
+        self.work_left -= self.env.now - self.start
+        return self.awaiting_repairman
+
+    def awaiting_repairman(self):
+        self.shop.transitions += 1
+        self.broken = True
+        self.repairman_request = self.shop.repairman.request(priority=1)
+        return self.repairman_request, self.being_repaired
+
+    def being_repaired(self):
+        self.shop.transitions += 1
+        return self.env.timeout(self.shop.repair_time), self.repaired
+
+    def repaired(self):
+        self.shop.repairman.release(self.repairman_request)
+        return self.working
+
+
+class MachineFailure(FSM):
+    __slots__ = ("shop", "machine")
+
+    def __init__(self, shop, initial_state="break_machine", *, machine):
+        self.shop = shop
+        self.machine = machine
+        super().__init__(shop.env, initial_state)
+
+    def break_machine(self):
+        self.shop.transitions += 1
+        return self.env.timeout(self.shop.time_to_failure()), self.failing
+
+    def failing(self):
+        if not self.machine.broken:
+            self.machine.interrupt()
+        return self.break_machine
+
+
+class UnimportantWork(FSM):
+    __slots__ = ("shop", "works_made", "work_left", "start", "repairman_request")
+
+    def __init__(self, shop, initial_state="awaiting_repairman"):
+        self.shop = shop
+        self.works_made = 0
+        self.work_left = shop.job_duration
+        super().__init__(shop.env, initial_state)
+
+    def awaiting_repairman(self):
+        self.shop.transitions += 1
+        self.repairman_request = self.shop.repairman.request(priority=2)
+        return self.repairman_request, self.working
+
+    def working(self):
+        self.shop.transitions += 1
+        self.start = self.env.now
+        return self.env.timeout(self.work_left), self.work_done, self.preempted
+
+    def work_done(self):
+        self.works_made += 1
+        self.work_left = self.shop.job_duration
+        return self.working
+
+    def preempted(self):
+        self.shop.interrupts += 1
+        self.work_left -= self.env.now - self.start
+        return self.awaiting_repairman
+
+
+def build(shop):
+    shop.machines = [Machine(shop) for _ in range(shop.n_machines)]
+    shop.unimportant_work = UnimportantWork(shop)
@@ -0,0 +1,88 @@
+"""Machine shop as plain Simpy process functions, no FSM: states are
+positions in the control flow."""
+
+import simpy
+
+
+class Machine:
+    def __init__(self, shop):
+        self.shop = shop
+        self.env = shop.env
+        self.parts_made = 0
+        self.broken = False
+        self.work_left = shop.time_per_part()
+        self.breaker = self.env.process(self.break_machine())
+        self.process = self.env.process(self.working())
+
+    def working(self):
+        """Produce parts as long as the simulation runs.
+
+        While making a part, the machine may break multiple times.
+        Request a repairman when this happens.
+        """
+        while True:
+            # working
+            self.shop.transitions += 1
+            self.broken = False
+            start = self.env.now
+            try:
+                yield self.env.timeout(self.work_left)
+                self.parts_made += 1
+                self.work_left = self.shop.time_per_part()
+                continue
+            except simpy.Interrupt:
+                self.shop.interrupts += 1
+                self.work_left -= self.env.now - start
+
+            # awaiting_repairman
+            self.shop.transitions += 1
+            self.broken = True
+            with self.shop.repairman.request(priority=1) as req:
+                yield req
+                # being_repaired
+                self.shop.transitions += 1
+                yield self.env.timeout(self.shop.repair_time)
+
+    def break_machine(self):
+        """Break the machine every now and then."""
+        while True:
+            self.shop.transitions += 1
+            yield self.env.timeout(self.shop.time_to_failure())
+            if not self.broken:
+                # Only break the machine if it is currently working.
+                self.process.interrupt()
+
+
+class UnimportantWork:
+    """The repairman's other (unimportant) job."""
+
+    def __init__(self, shop):
+        self.shop = shop
+        self.env = shop.env
+        self.works_made = 0
+        self.work_left = shop.job_duration
+        self.process = self.env.process(self.run())
+
+    def run(self):
+        while True:
+            # awaiting_repairman
+            self.shop.transitions += 1
+            self.repairman_request = self.shop.repairman.request(priority=2)
+            yield self.repairman_request
+            while True:
+                # working
+                self.shop.transitions += 1
+                start = self.env.now
+                try:
+                    yield self.env.timeout(self.work_left)
+                    self.works_made += 1
+                    self.work_left = self.shop.job_duration
+                except simpy.Interrupt:
+                    self.shop.interrupts += 1
+                    self.work_left -= self.env.now - start
+                    break
+
+
+def build(shop):
+    shop.machines = [Machine(shop) for _ in range(shop.n_machines)]
+    shop.unimportant_work = UnimportantWork(shop)
@@ -0,0 +1,96 @@
+"""Machine shop with the `Transition`-exception trampoline of
+`examples/standalone_example.py`: states end with
+`raise Transition(self.next_state)`."""
+
+import simpy
+
+from benchmarks.transition import Transition, trampoline
+
+
+class Machine:
+    def __init__(self, shop, initial_state="working"):
+        self.shop = shop
+        self.parts_made = 0
+        self.broken = False
+        self.work_left = shop.time_per_part()
+        self.breaker = MachineFailure(shop, machine=self)
+
+        self.env = shop.env
+        self.process = self.env.process(trampoline(getattr(self, initial_state)()))
+
+    def working(self):
+        self.shop.transitions += 1
+        self.broken = False
+        start = self.env.now
+        try:
+            yield self.env.timeout(self.work_left)
+        except simpy.Interrupt:
+            self.shop.interrupts += 1
+            self.work_left -= self.env.now - start
+            raise Transition(self.awaiting_repairman)
+        self.parts_made += 1
+        self.work_left = self.shop.time_per_part()
+        raise Transition(self.working)
+
+    def awaiting_repairman(self):
+        self.shop.transitions += 1
+        self.broken = True
+        self.repairman_request = self.shop.repairman.request(priority=1)
+        yield self.repairman_request
+        raise Transition(self.being_repaired)
+
+    def being_repaired(self):
+        self.shop.transitions += 1
+        yield self.env.timeout(self.shop.repair_time)
+        self.shop.repairman.release(self.repairman_request)
+        raise Transition(self.working)
+
+
+class MachineFailure:
+    def __init__(self, shop, initial_state="break_machine", *, machine):
+        self.shop = shop
+        self.machine = machine
+
+        self.env = shop.env
+        self.process = self.env.process(trampoline(getattr(self, initial_state)()))
+
+    def break_machine(self):
+        self.shop.transitions += 1
+        yield self.env.timeout(self.shop.time_to_failure())
+        if not self.machine.broken:
+            self.machine.process.interrupt()
+        raise Transition(self.break_machine)
+
+
+class UnimportantWork:
+    def __init__(self, shop, initial_state="awaiting_repairman"):
+        self.shop = shop
+        self.works_made = 0
+        self.work_left = shop.job_duration
+
+        self.env = shop.env
+        self.process = self.env.process(trampoline(getattr(self, initial_state)()))
+
+    def awaiting_repairman(self):
+        self.shop.transitions += 1
+        self.repairman_request = self.shop.repairman.request(priority=2)
+        yield self.repairman_request
+        raise Transition(self.working)
+
+    def working(self):
+        self.shop.transitions += 1
+        start = self.env.now
+        try:
+            yield self.env.timeout(self.work_left)
+        except simpy.Interrupt:
+            self.shop.interrupts += 1
+            self.work_left -= self.env.now - start
+            raise Transition(self.awaiting_repairman)
+        self.works_made += 1
+        self.work_left = self.shop.job_duration
+        raise Transition(self.working)
+
+
+def build(shop):
+    shop.machines = [Machine(shop) for _ in range(shop.n_machines)]
+    shop.unimportant_work = UnimportantWork(shop)
@@ -0,0 +1,90 @@
+"""Machine shop on `simpy_fsm.v2`: states take `(self, *args, **kwargs)`
+and return the bare next state, or `self.goto(next_state, *args)` to pass
+arguments."""
+
+import simpy
+
+from simpy_fsm.v2 import FSM
+
+
+class Machine(FSM):
+    def __init__(self, shop, initial_state="working"):
+        self.shop = shop
+        self.parts_made = 0
+        self.broken = False
+        self.work_left = shop.time_per_part()
+        self.breaker = MachineFailure(shop, machine=self)
+        super().__init__(shop.env, initial_state)
+
+    def working(self):
+        self.shop.transitions += 1
+        self.broken = False
+        start = self.env.now
+        try:
+            yield self.env.timeout(self.work_left)
+            self.parts_made += 1
+            self.work_left = self.shop.time_per_part()
+            return self.working
+        except simpy.Interrupt:
+            self.shop.interrupts += 1
+            self.work_left -= self.env.now - start
+            return self.awaiting_repairman
+
+    def awaiting_repairman(self):
+        self.shop.transitions += 1
+        self.broken = True
+        repairman_request = self.shop.repairman.request(priority=1)
+        yield repairman_request
+        return self.goto(self.being_repaired, repairman_request)
+
+    def being_repaired(self, repairman_request):
+        self.shop.transitions += 1
+        yield self.env.timeout(self.shop.repair_time)
+        self.shop.repairman.release(repairman_request)
+        return self.working
+
+
+class MachineFailure(FSM):
+    def __init__(self, shop, initial_state="break_machine", *, machine):
+        self.shop = shop
+        self.machine = machine
+        super().__init__(shop.env, initial_state)
+
+    def break_machine(self):
+        self.shop.transitions += 1
+        yield self.env.timeout(self.shop.time_to_failure())
+        if not self.machine.broken:
+            self.machine.process.interrupt()
+        return self.break_machine
+
+
+class UnimportantWork(FSM):
+    def __init__(self, shop, initial_state="awaiting_repairman"):
+        self.shop = shop
+        self.works_made = 0
+        self.work_left = shop.job_duration
+        super().__init__(shop.env, initial_state)
+
+    def awaiting_repairman(self):
+        self.shop.transitions += 1
+        self.repairman_request = self.shop.repairman.request(priority=2)
+        yield self.repairman_request
+        return self.working
+
+    def working(self):
+        self.shop.transitions += 1
+        start = self.env.now
+        try:
+            yield self.env.timeout(self.work_left)
+            self.works_made += 1
+            self.work_left = self.shop.job_duration
+            return self.working
+        except simpy.Interrupt:
+            self.shop.interrupts += 1
+            self.work_left -= self.env.now - start
+            return self.awaiting_repairman
+
+
+def build(shop):
+    shop.machines = [Machine(shop) for _ in range(shop.n_machines)]
+    shop.unimportant_work = UnimportantWork(shop)
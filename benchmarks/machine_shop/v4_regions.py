@@ -0,0 +1,65 @@
+"""Machine shop on `simpy_fsm.regions`: each machine runs its failure clock
+as a second region of the same FSM, instead of as a `MachineFailure` FSM
+with a Process of its own, and breaks its main region with a signal. The
+repairman's preemption of the unimportant work is still an Interrupt, raised
+by Simpy."""
+
+from simpy_fsm.regions import FSM, Signal
+
+from benchmarks.machine_shop.v4 import UnimportantWork
+
+
+BREAK = "break"
+
+
+class Machine(FSM):
+    regions = {"failures": "break_machine"}
+
+    def __init__(self, shop, initial_state="working"):
+        self.shop = shop
+        self.parts_made = 0
+        self.broken = False
+        self.work_left = shop.time_per_part()
+        super().__init__(shop.env, initial_state)
+
+    # The main region
+
+    def working(self):
+        self.shop.transitions += 1
+        self.broken = False
+        start = self.env.now
+        done = yield self.env.timeout(self.work_left)
+        if done.__class__ is Signal:
+            self.shop.interrupts += 1
+            self.work_left -= self.env.now - start
+            return self.awaiting_repairman
+        self.parts_made += 1
+        self.work_left = self.shop.time_per_part()
+        return self.working
+
+    def awaiting_repairman(self):
+        self.shop.transitions += 1
+        self.broken = True
+        self.repairman_request = self.shop.repairman.request(priority=1)
+        yield self.repairman_request
+        return self.being_repaired
+
+    def being_repaired(self):
+        self.shop.transitions += 1
+        yield self.env.timeout(self.shop.repair_time)
+        self.shop.repairman.release(self.repairman_request)
+        return self.working
+
+    # The "failures" region
+
+    def break_machine(self):
+        self.shop.transitions += 1
+        yield self.env.timeout(self.shop.time_to_failure())
+        if not self.broken:
+            self.signal(BREAK)
+        return self.break_machine
+
+
+def build(shop):
+    shop.machines = [Machine(shop) for _ in range(shop.n_machines)]
+    shop.unimportant_work = UnimportantWork(shop)
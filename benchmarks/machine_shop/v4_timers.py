@@ -0,0 +1,33 @@
+"""Machine shop on `simpy_fsm.v4`, with one `TimerService` for the whole
+shop breaking the machines, instead of a `MachineFailure` FSM per machine."""
+
+from simpy_fsm.timers import TimerService
+
+from benchmarks.machine_shop.v4 import UnimportantWork
+from benchmarks.machine_shop.v4 import Machine as V4Machine
+
+
+class Machine(V4Machine):
+    def __init__(self, shop, initial_state="working"):
+        self.shop = shop
+        self.parts_made = 0
+        self.broken = False
+        self.work_left = shop.time_per_part()
+        # Counted as the `break_machine` state of a MachineFailure
+        shop.transitions += 1
+        shop.failures.arm(self, shop.time_to_failure(), break_machine)
+        super(V4Machine, self).__init__(shop.env, initial_state)
+
+
+def break_machine(machine):
+    shop = machine.shop
+    shop.transitions += 1
+    if not machine.broken:
+        machine.process.interrupt()
+    return shop.time_to_failure()
+
+
+def build(shop):
+    shop.failures = TimerService(shop.env)
+    shop.machines = [Machine(shop) for _ in range(shop.n_machines)]
+    shop.unimportant_work = UnimportantWork(shop)
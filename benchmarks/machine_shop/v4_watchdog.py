@@ -0,0 +1,15 @@
+"""Machine shop on `simpy_fsm.v4`, with a `max_dwell` limit on waiting for
+the repairman. The limit is never reached, so this measures what the shared
+watchdog costs when nothing expires."""
+
+from benchmarks.machine_shop.v4 import Machine as V4Machine
+from benchmarks.machine_shop.v4 import UnimportantWork
+
+
+class Machine(V4Machine):
+    max_dwell = {"awaiting_repairman": (10_000, "being_repaired")}
+
+
+def build(shop):
+    shop.machines = [Machine(shop) for _ in range(shop.n_machines)]
+    shop.unimportant_work = UnimportantWork(shop)
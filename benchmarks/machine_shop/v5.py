@@ -0,0 +1,103 @@
+"""Machine shop with the string-dispatch `run()` loop of
+`examples/4-preemptive-resource/v5.py`: one process function per object that
+branches on `self.state`."""
+
+import simpy
+
+
+class Machine:
+    def __init__(self, shop, initial_state="working"):
+        self.shop = shop
+        self.parts_made = 0
+        self.broken = False
+        self.work_left = shop.time_per_part()
+        self.breaker = MachineFailure(shop, machine=self)
+
+        self.state = initial_state
+        self.env = shop.env
+        self.process = self.env.process(self.run())
+
+    def run(self):
+        while True:
+            if self.state == "working":
+                self.shop.transitions += 1
+                self.broken = False
+                start = self.env.now
+                try:
+                    yield self.env.timeout(self.work_left)
+                    self.parts_made += 1
+                    self.work_left = self.shop.time_per_part()
+                    self.state = "working"
+                except simpy.Interrupt:
+                    self.shop.interrupts += 1
+                    self.work_left -= self.env.now - start
+                    self.state = "awaiting_repairman"
+
+            elif self.state == "awaiting_repairman":
+                self.shop.transitions += 1
+                self.broken = True
+                self.repairman_request = self.shop.repairman.request(priority=1)
+                yield self.repairman_request
+                self.state = "being_repaired"
+
+            elif self.state == "being_repaired":
+                self.shop.transitions += 1
+                yield self.env.timeout(self.shop.repair_time)
+                self.shop.repairman.release(self.repairman_request)
+                self.state = "working"
+
+
+class MachineFailure:
+    def __init__(self, shop, initial_state="break_machine", *, machine):
+        self.shop = shop
+        self.machine = machine
+
+        self.state = initial_state
+        self.env = shop.env
+        self.process = self.env.process(self.run())
+
+    def run(self):
+        while True:
+            if self.state == "break_machine":
+                self.shop.transitions += 1
+                yield self.env.timeout(self.shop.time_to_failure())
+                if not self.machine.broken:
+                    self.machine.process.interrupt()
+                self.state = "break_machine"
+
+
+class UnimportantWork:
+    def __init__(self, shop, initial_state="awaiting_repairman"):
+        self.shop = shop
+        self.works_made = 0
+        self.work_left = shop.job_duration
+
+        self.state = initial_state
+        self.env = shop.env
+        self.process = self.env.process(self.run())
+
+    def run(self):
+        while True:
+            if self.state == "awaiting_repairman":
+                self.shop.transitions += 1
+                self.repairman_request = self.shop.repairman.request(priority=2)
+                yield self.repairman_request
+                self.state = "working"
+
+            elif self.state == "working":
+                self.shop.transitions += 1
+                start = self.env.now
+                try:
+                    yield self.env.timeout(self.work_left)
+                    self.works_made += 1
+                    self.work_left = self.shop.job_duration
+                    self.state = "working"
+                except simpy.Interrupt:
+                    self.shop.interrupts += 1
+                    self.work_left -= self.env.now - start
+                    self.state = "awaiting_repairman"
+
+
+def build(shop):
+    shop.machines = [Machine(shop) for _ in range(shop.n_machines)]
+    shop.unimportant_work = UnimportantWork(shop)
@@ -0,0 +1,113 @@
+"""
+Measure what it costs a v4 FSM to consume bursts of messages: from a
+`simpy.Store`, one `get()` per message, and from a `Mailbox`, one
+`receive()` per simulation time.
+
+One producer process puts a burst of `burst` messages in the queue of each
+of `n` consumer FSMs per tick. Every consumer counts its messages.
+
+Run it from the repository root:
+
+    python -m benchmarks.mailbox
+"""
+
+import argparse
+import time
+
+import simpy
+
+from simpy_fsm import v4
+from simpy_fsm.mailbox import Mailbox
+
+
+class StoreConsumer(v4.FSM):
+    __slots__ = ("queue", "count")
+
+    def __init__(self, env, initial_state="consuming"):
+        self.queue = simpy.Store(env)
+        self.count = 0
+        super().__init__(env, initial_state)
+
+    def consuming(self):
+        get = self.queue.get
+        while True:
+            yield get()
+            self.count += 1
+
+
+class MailboxConsumer(v4.FSM):
+    __slots__ = ("queue", "count")
+
+    def __init__(self, env, initial_state="consuming"):
+        self.queue = Mailbox(env)
+        self.count = 0
+        super().__init__(env, initial_state)
+
+    def consuming(self):
+        receive = self.queue.receive
+        while True:
+            messages = yield receive()
+            self.count += len(messages)
+
+
+KINDS = {"store": StoreConsumer, "mailbox": MailboxConsumer}
+
+
+def producer(env, fsms, ticks, burst):
+    for tick in range(ticks):
+        yield env.timeout(1)
+        for fsm in fsms:
+            put = fsm.queue.put
+            for i in range(burst):
+                put(i)
+
+
+def measure(cls: type, n: int, ticks: int, burst: int):
+    """Return the seconds per message, and the events processed per
+    message."""
+    env = simpy.Environment()
+    fsms = [cls(env) for _ in range(n)]
+    env.process(producer(env, fsms, ticks, burst))
+    while env.peek() == 0:  # Start the FSMs
+        env.step()
+    events = 0
+    step = env.step
+    start = time.perf_counter()
+    try:
+        while True:
+            step()
+            events += 1
+    except simpy.core.EmptySchedule:
+        pass
+    elapsed = time.perf_counter() - start
+    messages = n * ticks * burst
+    assert sum(fsm.count for fsm in fsms) == messages
+    return elapsed / messages, events / messages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.mailbox",
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=1000,
+        help="number of consumer FSMs (default: 1000)")
+    parser.add_argument("--ticks", type=int, default=20,
+        help="bursts per consumer (default: 20)")
+    parser.add_argument("--burst", type=int, nargs="+", default=[1, 10, 100],
+        help="messages per burst to measure (default: 1 10 100)")
+    parser.add_argument("--repeat", type=int, default=3,
+        help="report the best of this many runs (default: 3)")
+    args = parser.parse_args(argv)
+
+    print(f"{'burst':>5} " + " ".join(
+        f"{kind + ' ns/msg':>16} {'events/msg':>10}" for kind in KINDS))
+    for burst in args.burst:
+        row = []
+        for cls in KINDS.values():
+            runs = [measure(cls, args.n, args.ticks, burst) for _ in range(args.repeat)]
+            row.append(min(runs))
+        print(f"{burst:>5} " + " ".join(
+            f"{seconds * 1e9:>16.0f} {events:>10.2f}" for seconds, events in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Measure the memory cost of one FSM instance, per variant, with and without
+slots:
+
+- object: the FSM instance, its `__dict__` and its `data` object (if any),
+  as reported by `sys.getsizeof`.
+- created: everything `tracemalloc` sees allocated per instance right after
+  construction: the object, its Simpy Process, the trampoline generator and
+  the scheduled Initialize event.
+- running: the same, after the process has started and is waiting in its
+  first state (so this includes the state's generator and its Timeout).
+
+Run it from the repository root:
+
+    python -m benchmarks.memory
+"""
+
+import argparse
+import gc
+import sys
+import tracemalloc
+
+import simpy
+
+from simpy_fsm import cps, v1, v2, v3, v4
+
+
+def v1_car(slotted: bool):
+    """Return a Car class for `simpy_fsm.v1`, with or without slots."""
+
+    class Car(v1.FSM):
+        if slotted:
+            __slots__ = ("name",)
+            data_slots = ("n_trips",)
+
+        def __init__(self, env, initial_state="parking", *, name):
+            self.name = name
+            super().__init__(env, initial_state)
+            self.data.n_trips = 0
+
+        def parking(self, data):
+            yield self.env.timeout(5)
+            return self.driving
+
+        def driving(self, data):
+            yield self.env.timeout(2)
+            data.n_trips += 1
+            return self.parking
+
+    return Car
+
+
+def v2_car(slotted: bool):
+    """Return a Car class for `simpy_fsm.v2`, with or without slots."""
+
+    class Car(v2.FSM):
+        if slotted:
+            __slots__ = ("name", "n_trips")
+
+        def __init__(self, env, initial_state="parking", *, name):
+            self.name = name
+            self.n_trips = 0
+            super().__init__(env, initial_state)
+
+        def parking(self):
+            yield self.env.timeout(5)
+            return self.driving, (), {}
+
+        def driving(self):
+            yield self.env.timeout(2)
+            self.n_trips += 1
+            return self.parking, (), {}
+
+    return Car
+
+
+def self_style_car(FSM, slotted: bool):
+    """Return a Car class for a variant whose states take only `self`
+    (`simpy_fsm.v3`, `simpy_fsm.v4`), with or without slots."""
+
+    class Car(FSM):
+        if slotted:
+            __slots__ = ("name", "n_trips")
+
+        def __init__(self, env, initial_state="parking", *, name):
+            self.name = name
+            self.n_trips = 0
+            super().__init__(env, initial_state)
+
+        def parking(self):
+            yield self.env.timeout(5)
+            return self.driving
+
+        def driving(self):
+            yield self.env.timeout(2)
+            self.n_trips += 1
+            return self.parking
+
+    return Car
+
+
+def cps_car(slotted: bool):
+    """Return a Car class for `simpy_fsm.cps`, with or without slots."""
+
+    class Car(cps.FSM):
+        if slotted:
+            __slots__ = ("name", "n_trips")
+
+        def __init__(self, env, initial_state="parking", *, name):
+            self.name = name
+            self.n_trips = 0
+            super().__init__(env, initial_state)
+
+        def parking(self):
+            return self.env.timeout(5), self.driving
+
+        def driving(self):
+            return self.env.timeout(2), self.trip_done
+
+        def trip_done(self):
+            self.n_trips += 1
+            return self.parking
+
+    return Car
+
+
+CLASSES = {
+    "v1": v1_car(slotted=False),
+    "v1 slotted": v1_car(slotted=True),
+    "v2": v2_car(slotted=False),
+    "v2 slotted": v2_car(slotted=True),
+    "v3": self_style_car(v3.FSM, slotted=False),
+    "v3 slotted": self_style_car(v3.FSM, slotted=True),
+    "v4": self_style_car(v4.FSM, slotted=False),
+    "v4 slotted": self_style_car(v4.FSM, slotted=True),
+    "cps": cps_car(slotted=False),
+    "cps slotted": cps_car(slotted=True),
+}
+
+
+def object_size(fsm) -> int:
+    """Return the size of `fsm`, its `__dict__` and its `data`."""
+    size = sys.getsizeof(fsm)
+    if hasattr(fsm, "__dict__"):
+        size += sys.getsizeof(fsm.__dict__)
+    data = getattr(fsm, "data", None)
+    if data is not None:
+        size += sys.getsizeof(data)
+        if hasattr(data, "__dict__"):
+            size += sys.getsizeof(data.__dict__)
+    return size
+
+
+def measure(cls, n: int):
+    """Return (object, created, running) bytes per instance of `cls`."""
+    gc.collect()
+    env = simpy.Environment()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        fsms = [cls(env, name=f"car {i}") for i in range(n)]
+        created = tracemalloc.get_traced_memory()[0]
+        env.run(until=1)
+        running = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (
+        object_size(fsms[0]),
+        (created - before) / n,
+        (running - before) / n,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.memory",
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=10000,
+        help="number of instances to create (default: 10000)")
+    args = parser.parse_args(argv)
+
+    print(f"{'variant':<12} {'object B':>9} {'created B':>10} {'running B':>10}")
+    for name, cls in CLASSES.items():
+        obj, created, running = measure(cls, args.n)
+        print(f"{name:<12} {obj:>9} {created:>10.0f} {running:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
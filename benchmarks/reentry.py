@@ -0,0 +1,117 @@
+"""
+Measure what it costs to enter a sub-machine: by creating a new
+SubstateFSM every time, and by `restart()`ing one that the parent created
+once. For `simpy_fsm.v4` (`yield from substate.generator`) and
+`simpy_fsm.hsm` (`yield substate`).
+
+The sub-machine has one state, which returns at once, so the time per entry
+is the cost of creating (or restarting) the sub-machine, running its
+trampoline, and leaving it again.
+
+Run it from the repository root:
+
+    python -m benchmarks.reentry
+"""
+
+import argparse
+import time
+
+import simpy
+
+from simpy_fsm import hsm, v4
+
+
+class V4Sub(v4.SubstateFSM):
+    def __init__(self, env, initial_state, *, parent):
+        self.parent = parent
+        super().__init__(env, initial_state)
+
+    def go(self):
+        self.parent.entries += 1
+        return
+        yield
+
+
+class V4New(v4.FSM):
+    def __init__(self, env, entries, initial_state="run"):
+        self.todo = entries
+        self.entries = 0
+        super().__init__(env, initial_state)
+
+    def run(self):
+        for _ in range(self.todo):
+            yield from V4Sub(self.env, "go", parent=self).generator
+
+
+class V4Restart(V4New):
+    def run(self):
+        substate = V4Sub(self.env, "go", parent=self)
+        for _ in range(self.todo):
+            yield from substate.restart("go")
+
+
+class HsmSub(hsm.SubstateFSM):
+    def __init__(self, env, initial_state, *, parent):
+        self.parent = parent
+        super().__init__(env, initial_state)
+
+    def go(self):
+        self.parent.entries += 1
+        return
+        yield
+
+
+class HsmNew(hsm.FSM):
+    def __init__(self, env, entries, initial_state="run"):
+        self.todo = entries
+        self.entries = 0
+        super().__init__(env, initial_state)
+
+    def run(self):
+        for _ in range(self.todo):
+            yield HsmSub(self.env, "go", parent=self)
+
+
+class HsmRestart(HsmNew):
+    def run(self):
+        substate = HsmSub(self.env, "go", parent=self)
+        for _ in range(self.todo):
+            yield substate.restart("go")
+
+
+KINDS = {
+    "v4 new": V4New,
+    "v4 restart": V4Restart,
+    "hsm new": HsmNew,
+    "hsm restart": HsmRestart,
+}
+
+
+def measure(cls: type, entries: int) -> float:
+    """Return the seconds per entry into the sub-machine."""
+    env = simpy.Environment()
+    start = time.perf_counter()
+    fsm = cls(env, entries)
+    env.run()
+    elapsed = time.perf_counter() - start
+    assert fsm.entries == entries
+    return elapsed / entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.reentry",
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100_000,
+        help="entries per run (default: 100000)")
+    parser.add_argument("--repeat", type=int, default=5,
+        help="report the best of this many runs (default: 5)")
+    args = parser.parse_args(argv)
+
+    print(f"{'kind':<12} {'ns/entry':>9}")
+    for name, cls in KINDS.items():
+        best = min(measure(cls, args.entries) for _ in range(args.repeat))
+        print(f"{name:<12} {best * 1e9:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
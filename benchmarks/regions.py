@@ -0,0 +1,153 @@
+"""
+Measure what a composite agent costs: a worker whose clock nudges it every
+tick. As two v4 FSMs, the clock interrupting or signalling the worker's
+Process; and as one FSM with the clock in a second region
+(`simpy_fsm.regions`), signalling the main region.
+
+Reported: the time per nudge, the Simpy Processes per agent, and the bytes
+that `tracemalloc` sees allocated per agent once it is running.
+
+Run it from the repository root:
+
+    python -m benchmarks.regions
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+import simpy
+
+from simpy_fsm import regions, v4
+from simpy_fsm.signals import Signal
+
+
+NUDGE = "nudge"
+
+
+class InterruptedWorker(v4.FSM):
+    __slots__ = ("nudges", "clock")
+
+    def __init__(self, env, initial_state="working"):
+        self.nudges = 0
+        super().__init__(env, initial_state)
+        self.clock = InterruptingClock(env, worker=self)
+
+    def working(self):
+        event = self.env.event()
+        while True:
+            try:
+                yield event
+            except simpy.Interrupt:
+                self.nudges += 1
+
+
+class InterruptingClock(v4.FSM):
+    __slots__ = ("worker",)
+
+    def __init__(self, env, initial_state="ticking", *, worker):
+        self.worker = worker
+        super().__init__(env, initial_state)
+
+    def ticking(self):
+        while True:
+            yield self.env.timeout(1)
+            self.worker.process.interrupt(NUDGE)
+
+
+class SignalledWorker(v4.FSM):
+    __slots__ = ("nudges", "clock")
+
+    def __init__(self, env, initial_state="working"):
+        self.nudges = 0
+        super().__init__(env, initial_state)
+        self.clock = SignallingClock(env, worker=self)
+
+    def working(self):
+        event = self.env.event()
+        while True:
+            value = yield event
+            if value.__class__ is Signal:
+                self.nudges += 1
+
+
+class SignallingClock(InterruptingClock):
+    __slots__ = ()
+
+    def ticking(self):
+        while True:
+            yield self.env.timeout(1)
+            self.worker.signal(NUDGE)
+
+
+class RegionWorker(regions.FSM):
+    __slots__ = ("nudges",)
+
+    regions = {"clock": "ticking"}
+
+    def __init__(self, env, initial_state="working"):
+        self.nudges = 0
+        super().__init__(env, initial_state)
+
+    working = SignalledWorker.working
+
+    def ticking(self):
+        while True:
+            yield self.env.timeout(1)
+            self.signal(NUDGE)
+
+
+KINDS = {
+    "interrupt": (InterruptedWorker, 2),
+    "signal": (SignalledWorker, 2),
+    "regions": (RegionWorker, 1),
+}
+
+
+def measure_time(cls: type, n: int, ticks: int) -> float:
+    """Return the seconds per nudge."""
+    env = simpy.Environment()
+    agents = [cls(env) for _ in range(n)]
+    env.run(until=0.5)  # Start the agents
+    start = time.perf_counter()
+    env.run(until=ticks + 0.5)
+    elapsed = time.perf_counter() - start
+    assert sum(agent.nudges for agent in agents) == n * ticks
+    return elapsed / (n * ticks)
+
+
+def measure_memory(cls: type, n: int) -> float:
+    """Return the bytes allocated per running agent."""
+    env = simpy.Environment()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    agents = [cls(env) for _ in range(n)]
+    env.run(until=0.5)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(agents) == n
+    return (after - before) / n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.regions",
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=1000,
+        help="number of agents (default: 1000)")
+    parser.add_argument("--ticks", type=int, default=100,
+        help="nudges per agent (default: 100)")
+    parser.add_argument("--repeat", type=int, default=3,
+        help="report the best of this many runs (default: 3)")
+    args = parser.parse_args(argv)
+
+    print(f"{'kind':<10} {'ns/nudge':>9} {'processes':>10} {'bytes/agent':>12}")
+    for name, (cls, processes) in KINDS.items():
+        seconds = min(measure_time(cls, args.n, args.ticks) for _ in range(args.repeat))
+        memory = measure_memory(cls, args.n)
+        print(f"{name:<10} {seconds * 1e9:>9.0f} {processes:>10} {memory:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
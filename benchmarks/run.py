@@ -0,0 +1,170 @@
+"""
+Run every workload through every implementation, and print one row per
+(workload, implementation) pair:
+
+- transitions/s: state entries per second of wall-clock time
+- events/s: Simpy events scheduled per second
+- interrupts/s: `simpy.Interrupt`s caught by states per second
+- ns/transition: wall-clock time per state entry
+- peak KiB: peak memory traced by `tracemalloc` during setup and run. This is
+  measured in a separate, shorter run, because tracing slows everything
+  down; the populations reach their steady-state size early on.
+- checksum: a workload-specific result (parts made, stoplights on). Equal
+  checksums show that implementations simulated the same thing.
+"""
+
+import argparse
+import gc
+import importlib
+import time
+import tracemalloc
+from typing import NamedTuple, Optional
+
+import simpy
+
+from benchmarks import machine_shop, stoplight
+
+
+# Workload name -> (workload package, setup parameters, simulated time)
+WORKLOADS = {
+    "machine_shop": (machine_shop, dict(machines=10), 4 * 7 * 24 * 60),
+    # Machines break every few minutes and are repaired within a minute, so
+    # most transitions are caused by interrupts.
+    "interrupt_heavy": (
+        machine_shop,
+        dict(machines=10, mttf=5.0, repair_time=1.0, repairmen=4),
+        7 * 24 * 60,
+    ),
+    "stoplight": (stoplight, dict(lights=100), 10000),
+}
+
+# Setup parameters that `--scale` multiplies
+SCALED_PARAMS = ("machines", "lights")
+
+# The traced run simulates this fraction of the workload's simulated time
+MEMORY_RUN_FRACTION = 0.1
+
+
+class Result(NamedTuple):
+    workload: str
+    impl: str
+    setup_time: float
+    run_time: float
+    transitions: int
+    events: int
+    interrupts: int
+    checksum: int
+    peak_memory: Optional[int] = None
+
+
+def load(workload: str, impl: str):
+    """Return the workload package, the implementation module, the setup
+    parameters and the simulated time for a (workload, impl) pair."""
+    package, params, sim_time = WORKLOADS[workload]
+    module = importlib.import_module(
+        f"{package.__name__}.{package.IMPLEMENTATIONS[impl]}"
+    )
+    return package, module, params, sim_time
+
+
+def run_once(package, module, params, sim_time) -> Result:
+    gc.collect()
+    # An implementation module can bring its own Environment class
+    env = getattr(module, "Environment", simpy.Environment)()
+    start = time.perf_counter()
+    model = package.setup(env, module, **params)
+    setup_done = time.perf_counter()
+    env.run(until=sim_time)
+    run_done = time.perf_counter()
+    return Result(
+        workload="",
+        impl="",
+        setup_time=setup_done - start,
+        run_time=run_done - setup_done,
+        transitions=model.transitions,
+        # Every scheduled event draws an id from `env._eid`; the next id is
+        # the number of events scheduled so far.
+        events=next(env._eid),
+        interrupts=model.interrupts,
+        checksum=model.checksum(),
+    )
+
+
+def measure(
+    workload: str, impl: str, *, scale: int = 1, repeat: int = 3, memory: bool = True
+) -> Result:
+    """Run `impl` on `workload` `repeat` times and return the fastest run;
+    if `memory`, add the peak memory of one extra, traced run."""
+    package, module, params, sim_time = load(workload, impl)
+    params = {
+        key: value * scale if key in SCALED_PARAMS else value
+        for key, value in params.items()
+    }
+
+    best = None
+    for _ in range(repeat):
+        result = run_once(package, module, params, sim_time)
+        if best is None or result.run_time < best.run_time:
+            best = result
+    best = best._replace(workload=workload, impl=impl)
+
+    if memory:
+        tracemalloc.start()
+        try:
+            run_once(package, module, params, sim_time * MEMORY_RUN_FRACTION)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        best = best._replace(peak_memory=peak)
+    return best
+
+
+HEADER = (
+    f"{'workload':<16} {'impl':<12} {'run s':>7} {'transitions/s':>14} "
+    f"{'events/s':>12} {'interrupts/s':>13} {'ns/transition':>14} "
+    f"{'peak KiB':>9} {'checksum':>9}"
+)
+
+
+def format_row(result: Result) -> str:
+    per_second = lambda count: count / result.run_time
+    ns_per_transition = result.run_time / max(result.transitions, 1) * 1e9
+    peak = "-" if result.peak_memory is None else f"{result.peak_memory // 1024}"
+    return (
+        f"{result.workload:<16} {result.impl:<12} {result.run_time:>7.3f} "
+        f"{per_second(result.transitions):>14,.0f} "
+        f"{per_second(result.events):>12,.0f} "
+        f"{per_second(result.interrupts):>13,.0f} "
+        f"{ns_per_transition:>14,.0f} {peak:>9} {result.checksum:>9}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workload", nargs="+", choices=list(WORKLOADS),
+        default=list(WORKLOADS))
+    parser.add_argument("--impl", nargs="+", default=None,
+        help="implementations to run (default: all of each workload's)")
+    parser.add_argument("--scale", type=int, default=1,
+        help="multiply the number of machines/stoplights (default: 1)")
+    parser.add_argument("--repeat", type=int, default=3,
+        help="report the fastest of this many runs (default: 3)")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+        help="skip the traced run that measures peak memory")
+    args = parser.parse_args(argv)
+
+    print(HEADER)
+    for workload in args.workload:
+        package = WORKLOADS[workload][0]
+        impls = args.impl if args.impl is not None else list(package.IMPLEMENTATIONS)
+        for impl in impls:
+            if impl not in package.IMPLEMENTATIONS:
+                continue
+            result = measure(workload, impl, scale=args.scale, repeat=args.repeat,
+                memory=args.memory)
+            print(format_row(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()
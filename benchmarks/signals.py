@@ -0,0 +1,135 @@
+"""
+Measure what it costs to deliver a message to a waiting v4 FSM: with
+`process.interrupt(cause)`, caught by an `except simpy.Interrupt` in the
+state, and with `fsm.signal(cause)`, which ends the state's wait with a
+`Signal` value.
+
+Every FSM waits in a state that is `depth` levels of `yield from` deep
+(nested SubstateFSMs), and goes back to waiting after every message. One
+sender process sends a message to every FSM per tick.
+
+Run it from the repository root:
+
+    python -m benchmarks.signals
+"""
+
+import argparse
+import time
+
+import simpy
+
+from simpy_fsm import v4
+from simpy_fsm.signals import Signal
+
+
+class InterruptedLevel(v4.SubstateFSM):
+    __slots__ = ("depth",)
+
+    def __init__(self, env, initial_state="wait", *, depth):
+        self.depth = depth
+        super().__init__(env, initial_state)
+
+    def wait(self):
+        if self.depth:
+            yield from InterruptedLevel(self.env, depth=self.depth - 1).generator
+            return
+        event = self.env.event()
+        while True:
+            try:
+                yield event
+            except simpy.Interrupt:
+                continue  # Still waiting for `event`
+
+
+class Interrupted(v4.FSM):
+    __slots__ = ("depth",)
+
+    def __init__(self, env, initial_state="wait", *, depth):
+        self.depth = depth
+        super().__init__(env, initial_state)
+
+    wait = InterruptedLevel.wait
+
+    @staticmethod
+    def send(fsm):
+        fsm.process.interrupt("ping")
+
+
+class SignalledLevel(v4.SubstateFSM):
+    __slots__ = ("depth",)
+
+    def __init__(self, env, initial_state="wait", *, depth):
+        self.depth = depth
+        super().__init__(env, initial_state)
+
+    def wait(self):
+        if self.depth:
+            yield from SignalledLevel(self.env, depth=self.depth - 1).generator
+            return
+        event = self.env.event()
+        while True:
+            value = yield event
+            if value.__class__ is Signal:
+                continue  # Still waiting for `event`
+
+
+class Signalled(v4.FSM):
+    __slots__ = ("depth",)
+
+    def __init__(self, env, initial_state="wait", *, depth):
+        self.depth = depth
+        super().__init__(env, initial_state)
+
+    wait = SignalledLevel.wait
+
+    @staticmethod
+    def send(fsm):
+        fsm.signal("ping")
+
+
+KINDS = {"interrupt": Interrupted, "signal": Signalled}
+
+
+def sender(env, fsms, ticks):
+    send = type(fsms[0]).send
+    for _ in range(ticks):
+        yield env.timeout(1)
+        for fsm in fsms:
+            send(fsm)
+
+
+def measure(cls: type, n: int, ticks: int, depth: int) -> float:
+    """Return the seconds per delivered message."""
+    env = simpy.Environment()
+    fsms = [cls(env, depth=depth) for _ in range(n)]
+    env.process(sender(env, fsms, ticks))
+    env.run(until=0.5)  # Start the FSMs
+    start = time.perf_counter()
+    env.run()
+    return (time.perf_counter() - start) / (n * ticks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.signals",
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=1000,
+        help="number of FSMs (default: 1000)")
+    parser.add_argument("--ticks", type=int, default=100,
+        help="messages per FSM (default: 100)")
+    parser.add_argument("--depth", type=int, nargs="+", default=[0, 2],
+        help="nesting depths to measure (default: 0 2)")
+    parser.add_argument("--repeat", type=int, default=3,
+        help="report the best of this many runs (default: 3)")
+    args = parser.parse_args(argv)
+
+    print(f"{'depth':>5} " + " ".join(f"{kind + ' ns/msg':>16}" for kind in KINDS))
+    for depth in args.depth:
+        row = [
+            min(measure(cls, args.n, args.ticks, depth) for _ in range(args.repeat))
+            for cls in KINDS.values()
+        ]
+        print(f"{depth:>5} " + " ".join(f"{seconds * 1e9:>16.0f}" for seconds in row))
+
+
+if __name__ == "__main__":
+    main()
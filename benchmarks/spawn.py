@@ -0,0 +1,106 @@
+"""
+Measure how long it takes to set up a large population of FSMs: creating
+`n` instances one by one, versus `FSM.spawn_many()`, versus
+`spawn_many()` of a class with `autostart = False`, which creates no
+Processes until the group is started.
+
+Also reported: the bytes that `tracemalloc` sees allocated per instance.
+
+The time includes the garbage collection that the creation triggers, up to
+and including the first collection after `spawn_many` re-enables the
+collector.
+
+Run it from the repository root:
+
+    python -m benchmarks.spawn
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+import simpy
+
+from simpy_fsm import v4
+
+
+class Car(v4.FSM):
+    __slots__ = ("id", "n_trips")
+
+    def __init__(self, env, initial_state="parking", *, id):
+        self.id = id
+        self.n_trips = 0
+        super().__init__(env, initial_state)
+
+    def parking(self):
+        yield self.env.timeout(5 + self.id % 3)
+        return self.driving
+
+    def driving(self):
+        yield self.env.timeout(2)
+        self.n_trips += 1
+        return self.parking
+
+
+class LazyCar(Car):
+    __slots__ = ()
+    autostart = False
+
+
+def one_by_one(env, n):
+    return [Car(env, id=i) for i in range(n)]
+
+
+def spawn_many(env, n):
+    return Car.spawn_many(env, n, per_instance={"id": range(n)})
+
+
+def deferred(env, n):
+    return LazyCar.spawn_many(env, n, per_instance={"id": range(n)})
+
+
+METHODS = {"one by one": one_by_one, "spawn_many": spawn_many, "deferred": deferred}
+
+
+def measure(method, n: int) -> float:
+    """Return the seconds `method` takes to set up `n` cars."""
+    gc.collect()
+    env = simpy.Environment()
+    start = time.perf_counter()
+    cars = method(env, n)
+    gc.collect(0)
+    elapsed = time.perf_counter() - start
+    assert len(cars) == n and len(env._queue) == (0 if method is deferred else n)
+    return elapsed
+
+
+def measure_memory(method, n: int) -> float:
+    """Return the bytes allocated per car by `method`."""
+    gc.collect()
+    env = simpy.Environment()
+    tracemalloc.start()
+    cars = method(env, n)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / len(cars)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.spawn",
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=100_000,
+        help="number of instances to create (default: 100000)")
+    parser.add_argument("--repeat", type=int, default=3,
+        help="report the best of this many runs (default: 3)")
+    args = parser.parse_args(argv)
+
+    print(f"{'method':<12} {'setup ms':>9} {'us/instance':>12} {'bytes/instance':>15}")
+    for name, method in METHODS.items():
+        best = min(measure(method, args.n) for _ in range(args.repeat))
+        size = measure_memory(method, args.n)
+        print(f"{name:<12} {best * 1e3:>9.0f} {best / args.n * 1e6:>12.2f} {size:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
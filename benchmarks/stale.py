@@ -0,0 +1,102 @@
+"""
+Measure stale events: `n` v4 FSMs that wait for 1000 to 6000 ticks, while
+a failure process interrupts `n / 4` of them every tick, so that almost
+every wait is interrupted and leaves its event behind. Once with
+`env.timeout()`, whose stale Timeouts stay on the event queue until they
+fire; once with `env.timeout()` and `track_left(env)`, which takes them off
+it; and once with `self.sleep()`, whose stale events are taken off it, and
+recycled.
+
+Reported: the time per interrupt, the events on the event queue at the
+end, and the stale events taken off the queue (`waits(env).cancelled`).
+
+Run it from the repository root:
+
+    python -m benchmarks.stale
+"""
+
+import argparse
+import random
+import time
+
+import simpy
+
+from simpy_fsm import v4
+from simpy_fsm.waits import track_left, waits
+
+
+class Timeouts(v4.FSM):
+    __slots__ = ("rng",)
+
+    def __init__(self, env, rng, initial_state="waiting"):
+        self.rng = rng
+        super().__init__(env, initial_state)
+
+    def waiting(self):
+        try:
+            yield self.env.timeout(self.rng.randint(1000, 6000))
+        except simpy.Interrupt:
+            pass
+        return self.waiting
+
+
+class Sleeps(Timeouts):
+    __slots__ = ()
+
+    def waiting(self):
+        try:
+            yield self.sleep(self.rng.randint(1000, 6000))
+        except simpy.Interrupt:
+            pass
+        return self.waiting
+
+
+# kind -> (FSM class, whether to track the events FSMs leave)
+KINDS = {"timeout": (Timeouts, False), "tracked": (Timeouts, True), "sleep": (Sleeps, False)}
+
+
+def failures(env, fsms, rng):
+    k = len(fsms) // 4
+    while True:
+        yield env.timeout(1)
+        for fsm in rng.sample(fsms, k):
+            fsm.process.interrupt()
+
+
+def measure(cls: type, n: int, ticks: int, track: bool = False):
+    """Return (seconds per interrupt, events queued at the end, events
+    cancelled)."""
+    rng = random.Random(42)
+    env = simpy.Environment()
+    if track:
+        track_left(env)
+    fsms = [cls(env, rng) for _ in range(n)]
+    env.process(failures(env, fsms, rng))
+    start = time.perf_counter()
+    env.run(until=ticks)
+    elapsed = time.perf_counter() - start
+    return elapsed / (ticks * (n // 4)), len(env._queue), waits(env).cancelled
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.stale",
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, nargs="+", default=[100, 10_000],
+        help="numbers of FSMs to measure (default: 100 10000)")
+    parser.add_argument("--interrupts", type=int, default=500_000,
+        help="interrupts per run (default: 500000)")
+    parser.add_argument("--repeat", type=int, default=3,
+        help="report the best of this many runs (default: 3)")
+    args = parser.parse_args(argv)
+
+    print(f"{'n':>6} {'wait':>8} {'ns/interrupt':>13} {'queued':>8} {'cancelled':>10}")
+    for n in args.n:
+        ticks = max(1, args.interrupts // (n // 4))
+        for kind, (cls, track) in KINDS.items():
+            runs = [measure(cls, n, ticks, track) for _ in range(args.repeat)]
+            seconds, queued, cancelled = min(runs)
+            print(f"{n:>6} {kind:>8} {seconds * 1e9:>13.0f} {queued:>8} {cancelled:>10}")
+
+
+if __name__ == "__main__":
+    main()
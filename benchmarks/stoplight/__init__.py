@@ -0,0 +1,105 @@
+"""
+Nested stoplight workload
+
+The hierarchical stoplight from `examples/nested_state_machine.py`: a
+stoplight is `on` or `off`, and while it is on it cycles through the
+substates green (3 ticks), yellow (1 tick) and red (4 ticks). While it is
+off it wakes up every 100 ticks.
+
+A single controller process turns every stoplight on and off with
+`process.interrupt(TurnOn)` / `process.interrupt(TurnOff)`; it is the same
+plain Simpy process for every implementation.
+
+Each implementation module exposes `build(grid)`, which creates
+`grid.n_lights` stoplights on `grid.env` and stores them on the grid. A
+module can also define `toggle(grid, cause)`, to replace the interrupts
+with which the controller turns all the lights on or off.
+"""
+
+
+TOGGLE_PERIOD = 250  # Ticks between turning all stoplights on, and off again
+
+
+# Implementation name -> module in this package.
+IMPLEMENTATIONS = {
+    "old": "old",
+    "v1": "v1",
+    "v2": "v2",
+    "v3": "v3",
+    "v4": "v4",
+    "v4_timed": "v4_timed",
+    "v4_flat": "v4_flat",
+    "v4_reuse": "v4_reuse",
+    "v4_ticks": "v4_ticks",
+    "v4_sleep": "v4_sleep",
+    "v5": "v5",
+    "hsm": "hsm",
+    "hsm_reuse": "hsm_reuse",
+    "hsm_signals": "hsm_signals",
+    "hsm_bus": "hsm_bus",
+    "hsm_dormant": "hsm_dormant",
+    "transition": "transition",
+}
+
+
+class TurnOn:
+    """This class is used by as a signal/symbol: Turn a stoplight on."""
+
+    pass
+
+
+class TurnOff:
+    """This class is used by as a signal/symbol: Turn a stoplight off."""
+
+    pass
+
+
+class Grid:
+    """Everything one run of the stoplight workload shares: parameters, the
+    stoplights, and the benchmark counters.
+
+    State methods count every state they enter in `transitions`, and every
+    `simpy.Interrupt` they catch in `interrupts`.
+    """
+
+    def __init__(self, env, *, lights=100, toggle_period=TOGGLE_PERIOD):
+        self.env = env
+        self.n_lights = lights
+        self.toggle_period = toggle_period
+        self.lights = []
+
+        self.transitions = 0
+        self.interrupts = 0
+
+    def checksum(self):
+        """Return the number of stoplights that are currently on."""
+        # v1 stoplights keep their state on `data`, the others on `self`.
+        return sum(
+            1 for light in self.lights if getattr(light, "data", light).state == "on"
+        )
+
+
+def interrupt_all(grid, cause):
+    """Turn all stoplights on or off the default way: by interrupting their
+    processes."""
+    for light in grid.lights:
+        light.process.interrupt(cause)
+
+
+def controller(grid, toggle=interrupt_all):
+    """Turn all stoplights on, and off again, every `toggle_period` ticks."""
+    env = grid.env
+    while True:
+        yield env.timeout(grid.toggle_period)
+        toggle(grid, TurnOn)
+        yield env.timeout(grid.toggle_period)
+        toggle(grid, TurnOff)
+
+
+def setup(env, module, **params):
+    """Create a grid on `env`, populate it with `module.build()`, and start
+    the controller."""
+    grid = Grid(env, **params)
+    module.build(grid)
+    env.process(controller(grid, getattr(module, "toggle", interrupt_all)))
+    return grid
@@ -0,0 +1,69 @@
+"""Nested stoplight on `simpy_fsm.hsm`: `on` enters `StoplightOn` by yielding
+it, and one driver runs both levels."""
+
+import simpy
+
+from simpy_fsm.hsm import FSM, SubstateFSM
+
+from benchmarks.stoplight import TurnOn, TurnOff
+
+
+class Stoplight(FSM):
+    def __init__(self, grid, initial_state="off"):
+        self.grid = grid
+        super().__init__(grid.env, initial_state)
+
+    def on(self):
+        self.grid.transitions += 1
+        self.state = "on"
+        try:
+            yield StoplightOn(self.env, "green", light=self)
+        except simpy.Interrupt as interrupt:
+            self.grid.interrupts += 1
+            if interrupt.cause is TurnOn:
+                return self.on
+            if interrupt.cause is TurnOff:
+                return self.off
+
+    def off(self):
+        self.grid.transitions += 1
+        self.state = "off"
+        self.colour = None
+        try:
+            yield simpy.Timeout(self.env, 100)
+            return self.off
+        except simpy.Interrupt as interrupt:
+            self.grid.interrupts += 1
+            if interrupt.cause is TurnOn:
+                return self.on
+            if interrupt.cause is TurnOff:
+                return self.off
+
+
+class StoplightOn(SubstateFSM):
+    def __init__(self, env, initial_state, *, light):
+        self.light = light
+        self.grid = light.grid
+        super().__init__(env, initial_state)
+
+    def green(self):
+        self.grid.transitions += 1
+        self.light.colour = "green"
+        yield simpy.Timeout(self.env, 3)
+        return self.yellow
+
+    def yellow(self):
+        self.grid.transitions += 1
+        self.light.colour = "yellow"
+        yield simpy.Timeout(self.env, 1)
+        return self.red
+
+    def red(self):
+        self.grid.transitions += 1
+        self.light.colour = "red"
+        yield simpy.Timeout(self.env, 4)
+        return self.green
+
+
+def build(grid):
+    grid.lights = [Stoplight(grid) for _ in range(grid.n_lights)]
@@ -0,0 +1,71 @@
+"""Nested stoplight on `simpy_fsm.hsm`, turned on and off with signals that
+the controller publishes on a `SignalBus`: one event per toggle, for all
+the stoplights."""
+
+import simpy
+
+from simpy_fsm.bus import SignalBus
+from simpy_fsm.hsm import FSM, SubstateFSM
+
+from benchmarks.stoplight import TurnOn, TurnOff
+
+
+class Stoplight(FSM):
+    signals = {
+        "on": {TurnOn: "on", TurnOff: "off"},
+        "off": {TurnOn: "on", TurnOff: "off"},
+    }
+
+    def __init__(self, grid, initial_state="off"):
+        self.grid = grid
+        super().__init__(grid.env, initial_state)
+
+    def on(self):
+        self.grid.transitions += 1
+        self.state = "on"
+        yield StoplightOn(self.env, "green", light=self)
+
+    def off(self):
+        self.grid.transitions += 1
+        self.state = "off"
+        self.colour = None
+        yield simpy.Timeout(self.env, 100)
+        return self.off
+
+
+class StoplightOn(SubstateFSM):
+    def __init__(self, env, initial_state, *, light):
+        self.light = light
+        self.grid = light.grid
+        super().__init__(env, initial_state)
+
+    def green(self):
+        self.grid.transitions += 1
+        self.light.colour = "green"
+        yield simpy.Timeout(self.env, 3)
+        return self.yellow
+
+    def yellow(self):
+        self.grid.transitions += 1
+        self.light.colour = "yellow"
+        yield simpy.Timeout(self.env, 1)
+        return self.red
+
+    def red(self):
+        self.grid.transitions += 1
+        self.light.colour = "red"
+        yield simpy.Timeout(self.env, 4)
+        return self.green
+
+
+def build(grid):
+    grid.lights = [Stoplight(grid) for _ in range(grid.n_lights)]
+    grid.bus = SignalBus(grid.env)
+    for light in grid.lights:
+        grid.bus.subscribe(light, "lights")
+
+
+def toggle(grid, cause):
+    # Every signal is handled, so count it as the Interrupt it replaces
+    grid.interrupts += len(grid.lights)
+    grid.bus.publish("lights", cause)
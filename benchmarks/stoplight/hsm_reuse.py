@@ -0,0 +1,46 @@
+"""Nested stoplight on `simpy_fsm.hsm`, where each stoplight creates its
+`StoplightOn` once and `restart()`s it every time it is turned on."""
+
+import simpy
+
+from simpy_fsm.hsm import FSM
+
+from benchmarks.stoplight import TurnOn, TurnOff
+from benchmarks.stoplight.hsm import StoplightOn
+
+
+class Stoplight(FSM):
+    def __init__(self, grid, initial_state="off"):
+        self.grid = grid
+        self.substate = StoplightOn(grid.env, "green", light=self)
+        super().__init__(grid.env, initial_state)
+
+    def on(self):
+        self.grid.transitions += 1
+        self.state = "on"
+        try:
+            yield self.substate.restart("green")
+        except simpy.Interrupt as interrupt:
+            self.grid.interrupts += 1
+            if interrupt.cause is TurnOn:
+                return self.on
+            if interrupt.cause is TurnOff:
+                return self.off
+
+    def off(self):
+        self.grid.transitions += 1
+        self.state = "off"
+        self.colour = None
+        try:
+            yield simpy.Timeout(self.env, 100)
+            return self.off
+        except simpy.Interrupt as interrupt:
+            self.grid.interrupts += 1
+            if interrupt.cause is TurnOn:
+                return self.on
+            if interrupt.cause is TurnOff:
+                return self.off
+
+
+def build(grid):
+    grid.lights = [Stoplight(grid) for _ in range(grid.n_lights)]
@@ -0,0 +1,46 @@
+"""Nested stoplight as a plain Simpy process function: the on/off states
+and the colour substates are loops."""
+
+import simpy
+
+from benchmarks.stoplight import TurnOn, TurnOff
+
+
+class Stoplight:
+    def __init__(self, grid, initial_state="off"):
+        self.grid = grid
+        self.env = grid.env
+        self.state = initial_state
+        self.colour = None
+        self.process = self.env.process(self.run())
+
+    def run(self):
+        while True:
+            try:
+                if self.state == "on":
+                    self.grid.transitions += 1
+                    while True:
+                        self.grid.transitions += 1
+                        self.colour = "green"
+                        yield simpy.Timeout(self.env, 3)
+                        self.grid.transitions += 1
+                        self.colour = "yellow"
+                        yield simpy.Timeout(self.env, 1)
+                        self.grid.transitions += 1
+                        self.colour = "red"
+                        yield simpy.Timeout(self.env, 4)
+                else:
+                    while True:
+                        self.grid.transitions += 1
+                        self.colour = None
+                        yield simpy.Timeout(self.env, 100)
+            except simpy.Interrupt as interrupt:
+                self.grid.interrupts += 1
+                if interrupt.cause is TurnOn:
+                    self.state = "on"
+                elif interrupt.cause is TurnOff:
+                    self.state = "off"
+
+
+def build(grid):
+    grid.lights = [Stoplight(grid) for _ in range(grid.n_lights)]
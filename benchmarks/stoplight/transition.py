@@ -0,0 +1,73 @@
+"""Nested stoplight with the `Transition`-exception trampoline of
+`examples/standalone_example.py`: the `on` state delegates to a second
+trampoline that runs the colour substates."""
+
+import simpy
+
+from benchmarks.stoplight import TurnOn, TurnOff
+from benchmarks.transition import Transition, trampoline
+
+
+class Stoplight:
+    def __init__(self, grid, initial_state="off"):
+        self.grid = grid
+        self.colour = None
+
+        self.env = grid.env
+        self.process = self.env.process(trampoline(getattr(self, initial_state)()))
+
+    def on(self):
+        self.grid.transitions += 1
+        self.state = "on"
+        try:
+            substate = StoplightOn(self.env, light=self)
+            yield from trampoline(substate.green())
+        except simpy.Interrupt as interrupt:
+            self.grid.interrupts += 1
+            if interrupt.cause is TurnOn:
+                raise Transition(self.on)
+            if interrupt.cause is TurnOff:
+                raise Transition(self.off)
+
+    def off(self):
+        self.grid.transitions += 1
+        self.state = "off"
+        self.colour = None
+        try:
+            yield simpy.Timeout(self.env, 100)
+        except simpy.Interrupt as interrupt:
+            self.grid.interrupts += 1
+            if interrupt.cause is TurnOn:
+                raise Transition(self.on)
+            if interrupt.cause is TurnOff:
+                raise Transition(self.off)
+        raise Transition(self.off)
+
+
+class StoplightOn:
+    def __init__(self, env, *, light):
+        self.env = env
+        self.light = light
+        self.grid = light.grid
+
+    def green(self):
+        self.grid.transitions += 1
+        self.light.colour = "green"
+        yield simpy.Timeout(self.env, 3)
+        raise Transition(self.yellow)
+
+    def yellow(self):
+        self.grid.transitions += 1
+        self.light.colour = "yellow"
+        yield simpy.Timeout(self.env, 1)
+        raise Transition(self.red)
+
+    def red(self):
+        self.grid.transitions += 1
+        self.light.colour = "red"
+        yield simpy.Timeout(self.env, 4)
+        raise Transition(self.green)
+
+
+def build(grid):
+    grid.lights = [Stoplight(grid) for _ in range(grid.n_lights)]
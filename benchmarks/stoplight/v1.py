@@ -0,0 +1,69 @@
+"""Nested stoplight on `simpy_fsm.v1`, as in
+`examples/nested_state_machine.py`."""
+
+import simpy
+
+from simpy_fsm.v1 import FSM, SubstateFSM
+
+from benchmarks.stoplight import TurnOn, TurnOff
+
+
+class Stoplight(FSM):
+    def __init__(self, grid, initial_state="off"):
+        self.grid = grid
+        super().__init__(grid.env, initial_state)
+
+    def on(self, data):
+        self.grid.transitions += 1
+        data.state = "on"
+        try:
+            substate = StoplightOn(self.env, "green", data, grid=self.grid)
+            yield from substate.generator
+        except simpy.Interrupt as interrupt:
+            self.grid.interrupts += 1
+            if interrupt.cause is TurnOn:
+                return self.on
+            if interrupt.cause is TurnOff:
+                return self.off
+
+    def off(self, data):
+        self.grid.transitions += 1
+        data.state = "off"
+        data.colour = None
+        try:
+            yield simpy.Timeout(self.env, 100)
+            return self.off
+        except simpy.Interrupt as interrupt:
+            self.grid.interrupts += 1
+            if interrupt.cause is TurnOn:
+                return self.on
+            if interrupt.cause is TurnOff:
+                return self.off
+
+
+class StoplightOn(SubstateFSM):
+    def __init__(self, env, initial_state, data, *, grid):
+        self.grid = grid
+        super().__init__(env, initial_state, data)
+
+    def green(self, data):
+        self.grid.transitions += 1
+        data.colour = "green"
+        yield simpy.Timeout(self.env, 3)
+        return self.yellow
+
+    def yellow(self, data):
+        self.grid.transitions += 1
+        data.colour = "yellow"
+        yield simpy.Timeout(self.env, 1)
+        return self.red
+
+    def red(self, data):
+        self.grid.transitions += 1
+        data.colour = "red"
+        yield simpy.Timeout(self.env, 4)
+        return self.green
+
+
+def build(grid):
+    grid.lights = [Stoplight(grid) for _ in range(grid.n_lights)]
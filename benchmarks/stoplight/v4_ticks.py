@@ -0,0 +1,6 @@
+"""The `v4` stoplights, unchanged, on a `TickEnvironment`: the stoplight
+timings are whole ticks already."""
+
+from simpy_fsm.ticks import TickEnvironment as Environment
+
+from benchmarks.stoplight.v4 import build
@@ -0,0 +1,66 @@
+"""Nested stoplight on `simpy_fsm.v4`, with the waiting states declared
+with `timed()`: only `on`, which runs the nested state machine, is a
+generator."""
+
+import simpy
+
+from simpy_fsm.v4 import FSM, SubstateFSM, timed
+
+from benchmarks.stoplight import TurnOn, TurnOff
+
+
+def switched(self, interrupt):
+    """Go to the state the controller asks for."""
+    self.grid.interrupts += 1
+    if interrupt.cause is TurnOn:
+        return self.on
+    if interrupt.cause is TurnOff:
+        return self.off
+
+
+def turned_off(self):
+    self.grid.transitions += 1
+    self.state = "off"
+    self.colour = None
+
+
+class Stoplight(FSM):
+    def __init__(self, grid, initial_state="off"):
+        self.grid = grid
+        super().__init__(grid.env, initial_state)
+
+    def on(self):
+        self.grid.transitions += 1
+        self.state = "on"
+        try:
+            substate = StoplightOn(self.env, "green", light=self)
+            yield from substate.generator
+        except simpy.Interrupt as interrupt:
+            return switched(self, interrupt)
+
+    off = timed(100, "off", on_enter=turned_off, on_interrupt=switched)
+
+
+def showing(colour):
+    """Return an `on_enter` callback that shows `colour`."""
+
+    def on_enter(self):
+        self.grid.transitions += 1
+        self.light.colour = colour
+
+    return on_enter
+
+
+class StoplightOn(SubstateFSM):
+    def __init__(self, env, initial_state, *, light):
+        self.light = light
+        self.grid = light.grid
+        super().__init__(env, initial_state)
+
+    green = timed(3, "yellow", on_enter=showing("green"))
+    yellow = timed(1, "red", on_enter=showing("yellow"))
+    red = timed(4, "green", on_enter=showing("red"))
+
+
+def build(grid):
+    grid.lights = [Stoplight(grid) for _ in range(grid.n_lights)]
@@ -0,0 +1,55 @@
+"""Nested stoplight with string-dispatch `run()` loops, in the style of
+`examples/4-preemptive-resource/v5.py`: the `on` state runs a second
+dispatch loop over the colours."""
+
+import simpy
+
+from benchmarks.stoplight import TurnOn, TurnOff
+
+
+class Stoplight:
+    def __init__(self, grid, initial_state="off"):
+        self.grid = grid
+        self.colour = None
+
+        self.state = initial_state
+        self.env = grid.env
+        self.process = self.env.process(self.run())
+
+    def run(self):
+        while True:
+            try:
+                if self.state == "on":
+                    self.grid.transitions += 1
+                    self.colour = "green"
+                    yield from self.run_on()
+                elif self.state == "off":
+                    self.grid.transitions += 1
+                    self.colour = None
+                    yield simpy.Timeout(self.env, 100)
+                    self.state = "off"
+            except simpy.Interrupt as interrupt:
+                self.grid.interrupts += 1
+                if interrupt.cause is TurnOn:
+                    self.state = "on"
+                elif interrupt.cause is TurnOff:
+                    self.state = "off"
+
+    def run_on(self):
+        while True:
+            if self.colour == "green":
+                self.grid.transitions += 1
+                yield simpy.Timeout(self.env, 3)
+                self.colour = "yellow"
+            elif self.colour == "yellow":
+                self.grid.transitions += 1
+                yield simpy.Timeout(self.env, 1)
+                self.colour = "red"
+            elif self.colour == "red":
+                self.grid.transitions += 1
+                yield simpy.Timeout(self.env, 4)
+                self.colour = "green"
+
+
+def build(grid):
+    grid.lights = [Stoplight(grid) for _ in range(grid.n_lights)]
@@ -0,0 +1,73 @@
+"""
+Measure the event queue: `n` v4 FSMs that each wait for timeouts of 1 to
+100 ticks, on `simpy.Environment` (one heap of all pending events) and on
+`TickEnvironment` (one bucket per pending tick).
+
+Run it from the repository root:
+
+    python -m benchmarks.ticks
+"""
+
+import argparse
+import random
+import time
+
+import simpy
+
+from simpy_fsm import v4
+from simpy_fsm.ticks import TickEnvironment
+
+
+class Timer(v4.FSM):
+    __slots__ = ("delays",)
+
+    def __init__(self, env, delays, initial_state="waiting"):
+        self.delays = delays
+        super().__init__(env, initial_state)
+
+    def waiting(self):
+        timeout = self.env.timeout
+        for delay in self.delays:
+            yield timeout(delay)
+
+
+KINDS = {"simpy": simpy.Environment, "ticks": TickEnvironment}
+
+
+def measure(env_class: type, n: int, events: int) -> float:
+    """Return the seconds per event."""
+    rng = random.Random(42)
+    delays = [rng.randint(1, 100) for _ in range(events // n)]
+    env = env_class()
+    for i in range(n):
+        Timer(env, delays[i % len(delays):] + delays[:i % len(delays)])
+    env.run(until=1)  # Start the FSMs
+    processed = next(env._eid)
+    start = time.perf_counter()
+    env.run()
+    elapsed = time.perf_counter() - start
+    return elapsed / (next(env._eid) - processed - 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.ticks",
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, nargs="+", default=[100, 10_000, 100_000],
+        help="numbers of FSMs to measure (default: 100 10000 100000)")
+    parser.add_argument("--events", type=int, default=1_000_000,
+        help="timeouts per run (default: 1000000)")
+    parser.add_argument("--repeat", type=int, default=3,
+        help="report the best of this many runs (default: 3)")
+    args = parser.parse_args(argv)
+
+    print(f"{'n':>7} " + " ".join(f"{kind + ' ns/event':>16}" for kind in KINDS))
+    for n in args.n:
+        row = [
+            min(measure(env_class, n, args.events) for _ in range(args.repeat))
+            for env_class in KINDS.values()
+        ]
+        print(f"{n:>7} " + " ".join(f"{seconds * 1e9:>16.0f}" for seconds in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Measure failure injection for a large population: `n` v4 FSMs that count
+the interrupts they get, each broken after an exponentially distributed
+time, again and again. By one `Failure` FSM per target, which sleeps and
+interrupts its target, and by one `TimerService` for all of them.
+
+Reported: the time per injected failure, the events on the event queue
+while the population waits, and the bytes that `tracemalloc` sees
+allocated per target for the injection.
+
+Run it from the repository root:
+
+    python -m benchmarks.timers
+"""
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+import simpy
+
+from simpy_fsm import v4
+from simpy_fsm.timers import TimerService
+
+
+MTTF = 100.0
+
+
+class Target(v4.FSM):
+    __slots__ = ("failures",)
+
+    def __init__(self, env, initial_state="running"):
+        self.failures = 0
+        super().__init__(env, initial_state)
+
+    def running(self):
+        event = self.env.event()
+        while True:
+            try:
+                yield event
+            except simpy.Interrupt:
+                self.failures += 1
+
+
+class Failure(v4.FSM):
+    __slots__ = ("target", "rng")
+
+    def __init__(self, env, initial_state="waiting", *, target, rng):
+        self.target = target
+        self.rng = rng
+        super().__init__(env, initial_state)
+
+    def waiting(self):
+        yield self.env.timeout(self.rng.expovariate(1 / MTTF))
+        self.target.process.interrupt()
+        return self.waiting
+
+
+def per_fsm(env, targets, rng):
+    return [Failure(env, target=target, rng=rng) for target in targets]
+
+
+def timer_service(env, targets, rng):
+    timers = TimerService(env)
+
+    def fail(target):
+        target.process.interrupt()
+        return rng.expovariate(1 / MTTF)
+
+    for target in targets:
+        timers.arm(target, rng.expovariate(1 / MTTF), fail)
+    return timers
+
+
+KINDS = {"per-FSM": per_fsm, "service": timer_service}
+
+
+def measure(inject, n: int, until: float):
+    """Return the seconds per failure, the events on the queue, and the
+    bytes allocated per target for the injection."""
+    env = simpy.Environment()
+    targets = [Target(env) for _ in range(n)]
+    env.run(until=0.5)  # Start the targets
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    injectors = inject(env, targets, random.Random(42))
+    env.run(until=1)
+    memory = (tracemalloc.get_traced_memory()[0] - before) / n
+    tracemalloc.stop()
+    queued = len(env._queue)
+    start = time.perf_counter()
+    env.run(until=until)
+    elapsed = time.perf_counter() - start
+    failures = sum(target.failures for target in targets)
+    assert injectors is not None and failures
+    return elapsed / failures, queued, memory
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.timers",
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, nargs="+", default=[1000, 100_000],
+        help="population sizes to measure (default: 1000 100000)")
+    parser.add_argument("--until", type=float, default=1000,
+        help="simulated time (default: 1000)")
+    args = parser.parse_args(argv)
+
+    print(f"{'n':>7} {'kind':<8} {'ns/failure':>11} {'queued':>8} {'bytes/target':>13}")
+    for n in args.n:
+        for name, inject in KINDS.items():
+            seconds, queued, memory = measure(inject, n, args.until)
+            print(f"{n:>7} {name:<8} {seconds * 1e9:>11.0f} {queued:>8} {memory:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
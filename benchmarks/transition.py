@@ -0,0 +1,43 @@
+"""
+The `Transition`-exception trampoline of `examples/standalone_example.py`,
+made usable for models with interrupts.
+
+The standalone example drives its states with `yield next(state_generator)`,
+which drops the values Simpy sends into the process and raises interrupts in
+the trampoline instead of in the state. This version keeps the calling
+convention -- states are `(self)` generator methods that end with
+`raise Transition(self.next_state)` -- but forwards sent values and thrown
+exceptions to the current state, so it can run the same models as the
+`simpy_fsm` variants.
+"""
+
+
+class Transition(Exception):
+    def __init__(self, to):
+        self.to = to
+
+
+def trampoline(state_generator):
+    """Drive `state_generator`, and the states it raises `Transition` into,
+    until a state returns."""
+    value = None
+    error = None
+    while True:
+        try:
+            if error is None:
+                event = state_generator.send(value)
+            else:
+                event = state_generator.throw(error)
+        except Transition as transition:
+            # The state has ended, and told us what state to transition to.
+            state_generator = transition.to()
+            value = error = None
+            continue
+        except StopIteration:
+            return
+        try:
+            value = yield event
+            error = None
+        except Exception as exception:
+            value = None
+            error = exception
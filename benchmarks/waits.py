@@ -0,0 +1,107 @@
+"""
+Measure `fsm.sleep()` against `env.timeout()`: `n` v4 FSMs that wait again
+and again, for the same constant delay (so the FSMs wake up together and
+share events), or for random delays (so `sleep()` can only recycle).
+
+Reported per kind of wait: the time per wait, the events put on the event
+queue and the event objects allocated per 1000 waits, and the garbage
+collections that ran.
+
+Run it from the repository root:
+
+    python -m benchmarks.waits
+"""
+
+import argparse
+import gc
+import random
+import time
+
+import simpy
+
+from simpy_fsm import v4
+from simpy_fsm.waits import waits
+
+
+class Timeouts(v4.FSM):
+    __slots__ = ("delays",)
+
+    def __init__(self, env, delays, initial_state="waiting"):
+        self.delays = delays
+        super().__init__(env, initial_state)
+
+    def waiting(self):
+        timeout = self.env.timeout
+        for delay in self.delays:
+            yield timeout(delay)
+
+
+class Sleeps(Timeouts):
+    __slots__ = ()
+
+    def waiting(self):
+        sleep = self.sleep
+        for delay in self.delays:
+            yield sleep(delay)
+
+
+KINDS = {"timeout": Timeouts, "sleep": Sleeps}
+
+
+def measure(cls: type, n: int, waits_per_fsm: int, constant: bool):
+    """Return (seconds per wait, events scheduled per wait, event objects
+    allocated per wait, garbage collections)."""
+    rng = random.Random(42)
+    env = simpy.Environment()
+    for _ in range(n):
+        if constant:
+            delays = [3] * waits_per_fsm
+        else:
+            delays = [rng.randint(1, 100) for _ in range(waits_per_fsm)]
+        cls(env, delays)
+    env.run(until=1e-9)  # Start the FSMs
+    total = n * waits_per_fsm
+    scheduled = next(env._eid)
+    collections = sum(stats["collections"] for stats in gc.get_stats())
+    start = time.perf_counter()
+    env.run()
+    elapsed = time.perf_counter() - start
+    collections = sum(stats["collections"] for stats in gc.get_stats()) - collections
+    # Minus n process terminations, and the _eid draw just above
+    scheduled = next(env._eid) - scheduled - n - 1
+    if cls is Sleeps:
+        shared = waits(env)
+        allocated = len(shared) + len(shared._free)
+    else:
+        allocated = total
+    return elapsed / total, scheduled / total, allocated / total, collections
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.waits",
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, nargs="+", default=[100, 10_000],
+        help="numbers of FSMs to measure (default: 100 10000)")
+    parser.add_argument("--waits", type=int, default=1_000_000,
+        help="waits per run (default: 1000000)")
+    parser.add_argument("--repeat", type=int, default=3,
+        help="report the best of this many runs (default: 3)")
+    args = parser.parse_args(argv)
+
+    print(f"{'delays':>8} {'n':>6} {'wait':>8} {'ns/wait':>8} "
+          f"{'events/1k':>10} {'allocs/1k':>10} {'GCs':>5}")
+    for constant in (True, False):
+        for n in args.n:
+            for kind, cls in KINDS.items():
+                runs = [
+                    measure(cls, n, args.waits // n, constant)
+                    for _ in range(args.repeat)
+                ]
+                seconds, events, allocated, collections = min(runs)
+                print(f"{'constant' if constant else 'random':>8} {n:>6} {kind:>8} "
+                      f"{seconds * 1e9:>8.0f} {events * 1000:>10.1f} "
+                      f"{allocated * 1000:>10.1f} {collections:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""A server FSM that takes its requests from a Mailbox.
+
+The server logs every batch it receives, with the time. Requests come from
+two producers; one of them puts more than the mailbox has room for, and
+blocks until the server has made room. A supervisor interrupts the server
+while it is waiting for requests: the messages that arrive meanwhile are
+kept for the next receive, as are those of a batch that was due when the
+interrupt came, and none is lost or delivered twice.
+"""
+
+import simpy
+
+from simpy_fsm.mailbox import Mailbox
+from simpy_fsm.v4 import FSM
+
+
+class Server(FSM):
+    def __init__(self, env, initial_state="serving"):
+        self.mailbox = Mailbox(env, capacity=3)
+        self.log = []
+        super().__init__(env, initial_state)
+
+    def serving(self):
+        try:
+            requests = yield self.mailbox.receive()
+        except simpy.Interrupt:
+            self.log.append(("interrupted", self.env.now))
+            return self.pausing
+        self.log.append((self.env.now, requests))
+        return self.serving
+
+    def pausing(self):
+        yield self.env.timeout(2)
+        return self.serving
+
+
+env = simpy.Environment()
+server = Server(env)
+producer_log = []
+
+
+def burst(env):
+    # Three fit; the fourth and fifth wait for the server's first batch
+    yield env.timeout(1)
+    for i in range(5):
+        yield server.mailbox.put(("burst", i))
+        producer_log.append((env.now, i))
+
+
+def trickle(env):
+    # Put at time 1 too, after the burst has filled the mailbox
+    yield env.timeout(1)
+    assert not server.mailbox.try_put("dropped")
+    yield env.timeout(4)
+    server.mailbox.put("late")
+    yield env.timeout(1)
+    # Arrives while the server is paused after the interrupt
+    server.mailbox.put("while paused")
+
+
+def supervisor(env):
+    yield env.timeout(5.5)
+    assert server.state_name == "serving", server.state_name
+    server.process.interrupt()
+    # A batch is due at the end of time 10, but the server is interrupted
+    # first: the batch stays in the mailbox.
+    yield env.timeout(4.5)
+    server.mailbox.put("racing")
+    server.process.interrupt()
+
+
+env.process(burst(env))
+env.process(trickle(env))
+env.process(supervisor(env))
+env.run(until=20)
+
+print("server:", server.log)
+print("producer:", producer_log)
+assert server.log == [
+    # Blocking receive: nothing happens until the first message, at 1
+    (1, [("burst", 0), ("burst", 1), ("burst", 2)]),
+    # The blocked producer got its messages in when the batch was taken
+    (1, [("burst", 3), ("burst", 4)]),
+    (5, ["late"]),
+    ("interrupted", 5.5),
+    # The message put while paused waited in the mailbox
+    (7.5, ["while paused"]),
+    ("interrupted", 10),
+    (12, ["racing"]),
+], server.log
+assert producer_log == [(1, 0), (1, 1), (1, 2), (1, 3), (1, 4)], producer_log
+assert len(server.mailbox) == 0
@@ -0,0 +1,120 @@
+"""Rewritten state methods behave like the plain ones.
+
+A machine makes parts until it is interrupted, is repaired, and goes back to
+work. The same class runs plain, with `working` marked `@looping`, and (in
+v1 and v4) with `flatten = True`; every version must leave the same trace.
+In v2 and v3, `working` takes a parameter: the first pass after a repair is
+a slow one, and the passes after it start over from the default.
+"""
+
+import simpy
+
+from simpy_fsm import v1, v2, v3, v4
+
+
+def v1_machine(looping, flatten):
+    class Machine(v1.FSM):
+        def working(self, data):
+            try:
+                yield self.env.timeout(3)
+                data.append(("part", self.env.now))
+                if len(data) < 12:
+                    return self.working
+            except simpy.Interrupt:
+                data.append(("broken", self.env.now))
+                return self.repairing
+
+        def repairing(self, data):
+            yield self.env.timeout(2)
+            return self.working
+
+        if looping:
+            working = v1.looping(working)
+
+    Machine.flatten = flatten
+    return Machine
+
+
+def v4_machine(looping, flatten):
+    class Machine(v4.FSM):
+        def working(self):
+            try:
+                yield self.env.timeout(3)
+                self.data.append(("part", self.env.now))
+                if len(self.data) < 12:
+                    return self.working
+            except simpy.Interrupt:
+                self.data.append(("broken", self.env.now))
+                return self.repairing
+
+        def repairing(self):
+            yield self.env.timeout(2)
+            return self.working
+
+        if looping:
+            working = v4.looping(working)
+
+    Machine.flatten = flatten
+    return Machine
+
+
+def goto_machine(module, looping):
+    class Machine(module.FSM):
+        def working(self, duration=3):
+            try:
+                yield self.env.timeout(duration)
+                self.data.append(("part", self.env.now, duration))
+                if len(self.data) < 12:
+                    return self.working
+            except simpy.Interrupt:
+                self.data.append(("broken", self.env.now))
+                return self.repairing
+
+        def repairing(self):
+            yield self.env.timeout(2)
+            return self.goto(self.working, 5)
+
+        if looping:
+            working = module.looping(working)
+
+    return Machine
+
+
+def run(module, cls):
+    env = simpy.Environment()
+    data = []
+    if module is v1:
+        machine = cls(env, "working", data)
+    else:
+        machine = cls.__new__(cls)
+        machine.data = data
+        cls.__init__(machine, env, "working")
+
+    def breaker(env):
+        for delay in (7, 4, 0, 10):
+            yield env.timeout(delay)
+            if machine.current_state is cls._states["working"]:
+                machine.process.interrupt()
+
+    env.process(breaker(env))
+    env.run(until=60)
+    return data
+
+
+def check(module, make, variants):
+    plain = run(module, make(False, False))
+    for looping, flatten in variants:
+        cls = make(looping, flatten)
+        working = cls._states["working"]
+        assert (working.func is not working.definition) == looping, working.func
+        if flatten:
+            assert module._trampoline_for(cls) is not module._trampoline
+        trace = run(module, cls)
+        assert trace == plain, (module.__name__, looping, flatten, trace, plain)
+    print(module.__name__, plain)
+
+
+for module, make in ((v1, v1_machine), (v4, v4_machine)):
+    check(module, make, [(True, False), (False, True), (True, True)])
+for module in (v2, v3):
+    check(module, lambda looping, flatten: goto_machine(module, looping), [(True, False)])
@@ -0,0 +1,96 @@
+"""Signals that arrive during a timed state, in every variant.
+
+A car parks for 10 minutes, then drives. It is honked at after 2 minutes.
+Its class does not handle the honk, so the car goes on parking until 10;
+with `on_signal`, the honk sends it off right away instead.
+"""
+
+import simpy
+
+from simpy_fsm import v1, v2, v3, v4
+from simpy_fsm.regions import FSM as RegionsFSM
+
+
+def car_classes(module):
+    class Car(module.FSM):
+        parking = module.timed(
+            10, "driving", on_timeout=lambda self, *data: self.log.append("timeout")
+        )
+        driving = module.timed(1, None)
+
+    class HonkedCar(Car):
+        parking = module.timed(10, "driving", on_signal="fleeing")
+        fleeing = module.timed(1, None)
+
+    class CalledCar(Car):
+        # In v1, callbacks get the state data as well
+        parking = module.timed(
+            10, "driving", on_signal=lambda self, *data_and_signal: self.fleeing
+        )
+        fleeing = module.timed(1, None)
+
+    return Car, HonkedCar, CalledCar
+
+
+def run(module, car_class):
+    env = simpy.Environment()
+    car = car_class(env, "parking")
+    car.log = []
+
+    def honk(env):
+        yield env.timeout(2)
+        car.signal("honk")
+        yield env.timeout(0)
+        car.log.append(f"{car.state_name} at {env.now}")
+
+    def watch(env):
+        yield car.process
+        car.log.append(f"stopped at {env.now}")
+
+    env.process(honk(env))
+    env.process(watch(env))
+    env.run()
+    return car.log
+
+
+for module in (v1, v2, v3, v4):
+    Car, HonkedCar, CalledCar = car_classes(module)
+    name = module.__name__
+    log = run(module, Car)
+    print(name, "unhandled:", log)
+    assert log == ["parking at 2", "timeout", "stopped at 11"], log
+    log = run(module, HonkedCar)
+    print(name, "on_signal:", log)
+    assert log == ["fleeing at 2", "stopped at 3"], log
+    log = run(module, CalledCar)
+    print(name, "on_signal callable:", log)
+    assert log == ["fleeing at 2", "stopped at 3"], log
+
+
+class Machine(RegionsFSM):
+    regions = {"lights": "blinking"}
+    blinking = v4.timed(10, "dark")
+    dark = v4.timed(1, None)
+
+    def working(self):
+        yield self.env.timeout(20)
+
+
+env = simpy.Environment()
+machine = Machine(env, "working")
+
+
+def honk_region(env):
+    yield env.timeout(2)
+    machine.region("lights").signal("honk")
+    yield env.timeout(0)
+    assert machine.state_names == ("working", "blinking"), machine.state_names
+    yield env.timeout(7)
+    assert machine.state_names == ("working", "blinking"), machine.state_names
+    yield env.timeout(2)
+    assert machine.state_names == ("working", "dark"), machine.state_names
+
+
+env.process(honk_region(env))
+env.run()
+print("regions: the lights blinked until 10 despite the signal at 2")
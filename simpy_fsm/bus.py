@@ -0,0 +1,119 @@
+"""
+A signal bus: FSMs subscribe to topics, and one `publish()` call signals
+every subscriber of a topic.
+
+Without a bus, one FSM drives others through direct references, one
+interrupt per target:
+
+    for light in lights:
+        light.process.interrupt(TurnOff)     # n events, n exceptions
+
+With a bus, the lights subscribe once, and the controller publishes:
+
+    bus = SignalBus(env)
+    for light in lights:
+        bus.subscribe(light, "lights", f"street-{light.street}")
+    ...
+    bus.publish("lights", TurnOff)           # one event
+
+`publish()` schedules one urgent `Signal` event for all the subscribers
+(see `Signal.to_all`). When Simpy processes it, that single event-loop step
+delivers the signal to each subscriber in turn, as `fsm.signal(cause)`
+would: through the handlers the class declares in `signals`, or else by
+ending the current state's wait with the `Signal`. No exception is raised.
+
+The subscribers of a topic are an insertion-ordered dict, so subscribing
+and unsubscribing are O(1), and delivery order does not depend on object
+ids: a simulation runs the same every time. Subscribers whose process has
+ended are dropped from the bus when a signal for them is published.
+
+An `FSMGroup` (see `simpy_fsm.spawn`) can subscribe as a whole, and can be
+signalled without a bus: `group.signal(cause)`.
+"""
+
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+import simpy
+from simpy.events import PENDING
+
+from simpy_fsm.signals import Signal
+
+
+class SignalBus:
+    """Topics, each with a set of subscribed FSMs, on environment `env`.
+
+    >>> bus = SignalBus(env)
+    >>> bus.subscribe(light, 'lights')
+    >>> bus.publish('lights', TurnOff)   # signals every subscribed light
+    <Signal(<class 'TurnOff'>) for None>
+    """
+
+    __slots__ = ("env", "topics")
+
+    def __init__(self, env: "simpy.core.Environment"):
+        self.env = env
+        # topic -> {fsm: None}, an ordered set of subscribers
+        self.topics: Dict[Hashable, Dict[Any, None]] = {}
+
+    def __repr__(self):
+        return f"<SignalBus with {len(self.topics)} topics>"
+
+    def subscribe(self, fsm: Any, *topics: Hashable) -> None:
+        """Subscribe `fsm` (or every member of an `FSMGroup`) to `topics`."""
+        members = _members(fsm)
+        for topic in topics:
+            subscribers = self.topics.setdefault(topic, {})
+            for member in members:
+                subscribers[member] = None
+
+    def unsubscribe(self, fsm: Any, *topics: Hashable) -> None:
+        """Unsubscribe `fsm` (or every member of an `FSMGroup`) from
+        `topics`, or from all topics if none are given. Unknown topics and
+        FSMs that are not subscribed are ignored."""
+        members = _members(fsm)
+        for topic in topics or list(self.topics):
+            subscribers = self.topics.get(topic)
+            if subscribers is None:
+                continue
+            for member in members:
+                subscribers.pop(member, None)
+            if not subscribers:
+                del self.topics[topic]
+
+    def subscribers(self, topic: Hashable) -> List[Any]:
+        """Return the FSMs subscribed to `topic`, in subscription order."""
+        return list(self.topics.get(topic, ()))
+
+    def publish(self, topic: Hashable, cause: Any = None) -> Optional[Signal]:
+        """Signal `cause` (by default, `topic` itself) to every running FSM
+        subscribed to `topic`, in one urgent event at the current time.
+
+        Returns the `Signal` event, or None if the topic has no running
+        subscribers.
+        """
+        subscribers = self.topics.get(topic)
+        if not subscribers:
+            return None
+        recipients = [
+            fsm
+            for fsm in subscribers
+            if fsm.process is not None and fsm.process._value is PENDING
+        ]
+        if len(recipients) < len(subscribers):
+            # Forget the subscribers that have stopped; skip the ones that
+            # have not started yet
+            for fsm in list(subscribers):
+                if fsm.process is not None and fsm.process._value is not PENDING:
+                    del subscribers[fsm]
+            if not subscribers:
+                del self.topics[topic]
+            if not recipients:
+                return None
+        return Signal.to_all(self.env, recipients, topic if cause is None else cause)
+
+
+def _members(fsm: Any) -> Iterable[Any]:
+    """Return the FSMs that `fsm` stands for: the members of a group, or
+    `fsm` itself."""
+    members = getattr(fsm, "members", None)
+    return (fsm,) if members is None else members
@@ -0,0 +1,241 @@
+"""
+Simpy FSM engine without Simpy Processes (continuation-passing style):
+    - State method is a plain method that takes (self)
+    - State method returns (event to wait on, next state), or
+      (event to wait on, next state, state to go to when interrupted), or
+      the bare next state to go to right away, or None to stop
+
+The generator variants (`simpy_fsm.v1` ... `v4`) run every FSM instance as a
+Simpy Process around a trampoline generator, so every instance carries a
+Process, a trampoline generator and a generator per state visit, and every
+event goes through `Process._resume`. This engine instead appends one
+callback per FSM to the event it waits on; when the event fires, the
+callback calls the next state directly:
+
+    class Car(FSM):
+        def parking(self):
+            return self.env.timeout(5), self.driving
+
+        def driving(self):
+            return self.env.timeout(2), self.parking
+
+Code that a generator state runs after its `yield` goes into a state of its
+own, which usually returns its successor right away:
+
+    class Machine(FSM):
+        def working(self):
+            self.start = self.env.now
+            return self.env.timeout(self.work_left), self.part_done, self.broken
+
+        def part_done(self):
+            self.parts_made += 1
+            return self.working
+
+        def broken(self):
+            # self.interruption is the simpy.Interrupt
+            self.work_left -= self.env.now - self.start
+            return self.awaiting_repairman
+
+`fsm.interrupt(cause)` works like `process.interrupt(cause)`: the FSM
+stops waiting, stores the `simpy.Interrupt` as `fsm.interruption`, and goes
+to the state's interrupt state. An FSM without an interrupt state for its
+current wait fails with the Interrupt, like a process that does not catch
+it. While a state runs, the FSM is `env.active_process`, so resource
+requests made by a state record the FSM as their owner, and preemption
+interrupts the FSM.
+
+Every public plain method of an `FSM` subclass is a state (`timed()` states
+work too); give helper methods a leading underscore.
+"""
+
+import inspect
+from typing import Any, Optional
+
+import simpy
+from simpy.events import URGENT, Event, Timeout
+from simpy.exceptions import Interrupt
+
+from simpy_fsm.states import (
+    State, StateMachine, Timed, invalid_transition, not_a_state, timed
+)
+from simpy_fsm.waits import left
+
+
+# Methods of `FSM` itself, which are not states
+ENGINE_METHODS = frozenset({"interrupt"})
+
+
+def is_state_method(name: str, value: Any) -> bool:
+    """Return True if class attribute `name = value` is a state of a
+    continuation-style FSM: a public plain function, or a timed state.
+    Methods decorated with `@not_a_state` are not."""
+    if name.startswith("_") or name in ENGINE_METHODS:
+        return False
+    if getattr(value, "_fsm_not_a_state", False):
+        return False
+    if isinstance(value, Timed):
+        return True
+    return inspect.isfunction(value) and not inspect.isgeneratorfunction(value)
+
+
+class FSM(StateMachine):
+    """A finite state machine whose states are plain methods, run by event
+    callbacks instead of a Simpy Process.
+
+    >>> class Car(FSM):
+    >>>     def parked(self):
+    >>>         return self.env.timeout(11), self.driving, self.driving
+    >>>
+    >>>     def driving(self):
+    >>>         self.n_trips = getattr(self, 'n_trips', 0) + 1
+    >>>         return self.env.timeout(1), self.parked
+
+    >>> env = simpy.Environment()
+    >>> car1 = Car(env, initial_state='parked')  # starts like a process
+    >>> env.run(until=13)
+    >>> car1.n_trips
+    1
+    >>> car1.interrupt('Get driving')  # parked -> driving right away
+    >>> env.run(until=15)
+    >>> car1.n_trips
+    2
+
+    `target` is the event the FSM waits for, `interruption` the last
+    `simpy.Interrupt` it received.
+    """
+
+    __slots__ = (
+        "env", "target", "interruption",
+        "_next", "_on_interrupt", "_on_timeout", "_callback",
+    )
+
+    _is_state_method = staticmethod(is_state_method)
+
+    def __init__(self, env: "simpy.core.Environment", initial_state: str):
+        self.env = env
+        self.current_state = self._state(initial_state)
+        self.interruption: Optional[Interrupt] = None
+        self._next: Optional[State] = self.current_state
+        self._on_interrupt = None
+        self._on_timeout = None
+        # One bound method for all the events we will wait for
+        self._callback = self._resume
+
+        # Start the way a Process starts: on an urgent event, so that the FSM
+        # enters its initial state before any interrupt can reach it.
+        start = Event(env)
+        start._ok = True
+        start._value = None
+        start.callbacks.append(self._callback)
+        env.schedule(start, URGENT)
+        self.target: Optional[Event] = start
+
+    def __repr__(self):
+        return f"<{type(self).__name__} in state {self.state_name}>"
+
+    @property
+    def is_alive(self) -> bool:
+        """True until the FSM has stopped."""
+        return self.current_state is not None
+
+    def interrupt(self, cause: Optional[Any] = None) -> None:
+        """Interrupt the FSM with a `simpy.Interrupt(cause)`, as
+        `Process.interrupt()` does: the FSM handles it in an urgent event at
+        the current simulation time."""
+        if self.current_state is None:
+            raise RuntimeError(f"{self} has stopped and cannot be interrupted.")
+        if self.env.active_process is self:
+            raise RuntimeError("An FSM is not allowed to interrupt itself.")
+        interruption = Event(self.env)
+        interruption._ok = True
+        interruption._value = Interrupt(cause)
+        interruption.callbacks.append(self._interrupted)
+        self.env.schedule(interruption, URGENT)
+
+    def _interrupted(self, event: Event) -> None:
+        """Stop waiting for `self.target`, and go to the interrupt state."""
+        if self.current_state is None:
+            return  # Stopped before the interrupt arrived
+        target = self.target
+        if target is not None and target.callbacks is not None:
+            target.callbacks.remove(self._callback)
+        left(self.env, target)
+
+        interrupt = event._value
+        self.interruption = interrupt
+        handler = self._on_interrupt
+        if handler is None:
+            self._stop()
+            raise interrupt
+        if handler.__class__ is not State:
+            # A timed state's on_interrupt callable
+            handler = handler(self, interrupt)
+        self._next = handler
+        self._on_timeout = None
+        self._resume(event)
+
+    def _resume(self, event: Event) -> None:
+        """Continue with the next state now that `event` has happened, and
+        keep going until a state waits for an event that has not happened
+        yet, or the FSM stops."""
+        if not event._ok:
+            # Like an exception thrown into a generator that does not catch it
+            event._defused = True
+            self._stop()
+            raise event._value
+        env = self.env
+        env._active_proc = self
+        if self._on_timeout is not None:
+            on_timeout, self._on_timeout = self._on_timeout, None
+            on_timeout(self)
+
+        state = self._next
+        while state is not None:
+            try:
+                func = state.func
+            except AttributeError:
+                raise invalid_transition(self, state) from None
+            self.current_state = state
+
+            if func is None:
+                # A timed state (see `simpy_fsm.states.timed`)
+                if state.on_enter is not None:
+                    state.on_enter(self)
+                delay_func = state.delay_func
+                event = Timeout(
+                    env, state.delay if delay_func is None else delay_func(self)
+                )
+                self._next = state.next_state
+                self._on_interrupt = state.on_interrupt
+                self._on_timeout = state.on_timeout
+            else:
+                result = func(self)
+                if result is None or result.__class__ is State:
+                    state = result
+                    continue
+                if len(result) == 2:
+                    event, self._next = result
+                    self._on_interrupt = None
+                else:
+                    event, self._next, self._on_interrupt = result
+
+            if event.callbacks is not None:
+                event.callbacks.append(self._callback)
+                self.target = event
+                env._active_proc = None
+                return
+            # The event has already been processed: go on right away
+            if not event._ok:
+                raise event._value
+            state = self._next
+
+        self._stop()
+        env._active_proc = None
+
+    def _stop(self) -> None:
+        """Mark the FSM as stopped. Also drop `_callback`, the bound method
+        through which the FSM refers to itself: without that reference
+        cycle, the FSM is freed as soon as nothing else refers to it,
+        instead of at the next garbage collection."""
+        self.current_state = self.target = None
+        self._callback = None
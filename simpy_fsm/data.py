@@ -0,0 +1,54 @@
+"""
+Data objects for the FSM variants that pass a `data` object to their states.
+
+By default `simpy_fsm.v1.FSM` gives every instance a `SimpleNamespace` as its
+`data`. A class that declares `data_slots` gets a namespace class with
+exactly those slots instead, which needs no per-instance `__dict__`.
+"""
+
+from typing import Iterable
+
+
+def slotted_namespace(name: str, fields: Iterable[str]) -> type:
+    """Return a `SimpleNamespace`-like class called `name` whose instances
+    store `fields` in slots.
+
+    Like a SimpleNamespace, an instance takes its initial attributes as
+    keyword arguments, and reading a field that was never set raises
+    AttributeError. Unlike a SimpleNamespace, setting an attribute that is
+    not one of `fields` raises AttributeError too.
+    """
+    fields = tuple(fields)
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    def __repr__(self):
+        items = (
+            f"{field}={getattr(self, field)!r}"
+            for field in fields
+            if hasattr(self, field)
+        )
+        return f"{name}({', '.join(items)})"
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        missing = object()
+        return all(
+            getattr(self, field, missing) == getattr(other, field, missing)
+            for field in fields
+        )
+
+    return type(
+        name,
+        (),
+        {
+            "__slots__": fields,
+            "__init__": __init__,
+            "__repr__": __repr__,
+            "__eq__": __eq__,
+            "__hash__": None,
+        },
+    )
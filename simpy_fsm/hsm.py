@@ -0,0 +1,308 @@
+"""
+Simpy FSM engine for hierarchical state machines, with an explicit stack:
+    - State method initialized with (self)
+    - State method eventually returns (next state method)
+    - State method enters a sub-machine with `yield substate_fsm`
+
+In the generator variants (`simpy_fsm.v1` ... `v4`) a state runs a nested
+state machine with `yield from substate.generator`, so every level of
+nesting adds a `yield from` that every event, and every interrupt, passes
+through on its way to the innermost state:
+
+    process -> _trampoline -> on() -> _trampoline -> green()
+
+This engine keeps the active machines on a stack instead, and runs them all
+from one driver generator. The driver sends each event's value straight to
+the innermost machine's trampoline, so resuming costs the same at any depth:
+
+    process -> _driver -> _trampoline -> green()
+    # fsm.stack == [stoplight, stoplight_on]
+
+A state enters a sub-machine by yielding it, and the `yield` returns when
+the sub-machine finishes (returns None from its last state):
+
+    class Stoplight(FSM):
+        def on(self):
+            try:
+                yield StoplightOn(self.env, "green")
+            except simpy.Interrupt as interrupt:
+                if interrupt.cause is TurnOff:
+                    return self.off
+
+Interrupts and other exceptions go to the innermost state first; if it does
+not handle them, its machine is left and the exception is raised at the
+`yield` of the state that entered it, just as with `yield from`. Entering or
+leaving a sub-machine pushes or pops one stack entry, and does not touch the
+generators of the states above it.
+
+Signals are the declarative alternative to handling Interrupts in states. A
+class lists, per state, which signals it handles and which state each one
+leads to:
+
+    class Stoplight(FSM):
+        signals = {
+            "on": {TurnOff: "off"},
+            "off": {TurnOn: "on"},
+        }
+
+`fsm.signal(TurnOff)` then goes to the innermost running state that handles
+`TurnOff`: the machines inside it are left, its own state's generator is
+closed, and its machine goes on in the target state (or stops, for a target
+of None; a callable target decides, see `simpy_fsm.signals`). The tables
+are compiled when the class is defined, so routing a signal is one dict
+lookup per level of the stack; no exception is raised in any state. A
+signal that no running state handles is dropped.
+"""
+
+from typing import Any, Generator, Hashable, List, Optional, Set, Tuple
+
+import simpy
+from simpy.events import PENDING
+
+from simpy_fsm.signals import Signal
+from simpy_fsm.spawn import start
+from simpy_fsm.states import (
+    UNHANDLED, State, StateMachine, dormant, looping, not_a_state, timed
+)
+from simpy_fsm.v4 import _trampoline
+from simpy_fsm.waits import FSMProcess, left
+
+
+FsmGen = Generator[simpy.Event, Any, Any]
+
+# The SubstateFSM classes: a state that yields an instance of one of these
+# enters it, instead of waiting for it as an event.
+_submachine_classes: Set[type] = set()
+
+
+class _Route:
+    """Where the driver delivers a signal: to the machine at `level` of the
+    stack, which goes to `state`."""
+
+    __slots__ = ("level", "state")
+
+    def __init__(self, level: int, state: Optional[State]):
+        self.level = level
+        self.state = state
+
+
+def route_signal(machines: List[StateMachine], signal: Hashable) -> Optional[_Route]:
+    """Return the route to the innermost state in `machines` that handles
+    `signal`, or None if none does."""
+    for level in range(len(machines) - 1, -1, -1):
+        machine = machines[level]
+        state = machine.current_state
+        if state is None:
+            continue
+        target = machine._signal_table[state.id].get(signal, UNHANDLED)
+        if target is not UNHANDLED:
+            return _Route(level, target)
+    return None
+
+
+def _driver(fsm: "FSM", initial_state: State) -> FsmGen:
+    """Run `fsm` and the sub-machines its states enter, as one generator.
+
+    Each running machine has a trampoline (the one of `simpy_fsm.v4`), which
+    runs its states and their transitions. `fsm.stack` holds the running
+    machines, outermost first, and `trampolines` their trampolines; the
+    driver only ever resumes the innermost one, so an event's value goes
+    through three generators (driver, trampoline, state) at any depth.
+    """
+    machines = fsm.stack
+    machines.append(fsm)
+    trampolines: List[FsmGen] = []
+    gen = _trampoline(fsm, initial_state)
+    value: Any = None
+    error: Optional[BaseException] = None
+
+    while True:
+        try:
+            if error is None:
+                target = gen.send(value)
+            else:
+                exception, error = error, None
+                target = gen.throw(exception)
+        except StopIteration:
+            # The innermost machine has finished: resume the state that
+            # entered it.
+            machines.pop()
+            if not trampolines:
+                return
+            gen = trampolines.pop()
+            value = None
+            continue
+        except BaseException as exception:
+            # The innermost machine did not handle an exception: leave it,
+            # and raise the exception in the state that entered it.
+            machines.pop().current_state = None
+            if not trampolines:
+                raise
+            gen = trampolines.pop()
+            error = exception
+            continue
+
+        if target.__class__ in _submachine_classes:
+            if target.current_state is None:
+                error = RuntimeError(f"{target!r} has finished; restart() it to enter it again.")
+                continue
+            trampolines.append(gen)
+            machines.append(target)
+            gen = _trampoline(target, target.current_state)
+            value = None
+            continue
+
+        try:
+            value = yield target
+            if value.__class__ is _Route:
+                # A signal (see `FSM._receive`): leave the machines inside the one
+                # that handles it, and send that one to the signal's target.
+                gen.close()
+                for _ in range(len(machines) - 1 - value.level):
+                    machines.pop().current_state = None
+                    gen = trampolines.pop()
+                    gen.close()
+                state, value = value.state, None
+                if state is not None:
+                    gen = _trampoline(machines[-1], state)
+                    continue
+                machines.pop().current_state = None
+                if not trampolines:
+                    return
+                gen = trampolines.pop()
+        except GeneratorExit:
+            # The process is being closed: close the machines, innermost first
+            gen.close()
+            for suspended in reversed(trampolines):
+                suspended.close()
+            raise
+        except BaseException as exception:
+            error = exception
+
+
+class FSM(StateMachine):
+    """A hierarchical state machine, run as one Simpy Process however deeply
+    its states nest sub-machines.
+
+    >>> class Stoplight(FSM):
+    >>>     def on(self):
+    >>>         try:
+    >>>             yield StoplightOn(self.env, 'green')  # runs until it stops
+    >>>         except simpy.Interrupt:
+    >>>             return self.off
+    >>>
+    >>>     def off(self):
+    >>>         yield self.env.timeout(100)
+    >>>         return self.on
+
+    >>> class StoplightOn(SubstateFSM):
+    >>>     def green(self):
+    >>>         yield self.env.timeout(3)
+    >>>         return self.red
+    >>>
+    >>>     def red(self):
+    >>>         yield self.env.timeout(4)
+    >>>         return self.green
+
+    >>> env = simpy.Environment()
+    >>> light = Stoplight(env, initial_state='on')
+    >>> env.run(until=5)
+    >>> light.state_path
+    ('on', 'red')
+    >>> light.process.interrupt()  # handled by `on`, which goes to `off`
+    >>> env.run(until=6)
+    >>> light.state_path
+    ('off',)
+
+    `stack` holds the running machines, this FSM first and the innermost
+    sub-machine last.
+
+    Instead of catching Interrupts, the classes can declare the signals
+    their states handle, and `signal()` delivers them:
+
+    >>> class Stoplight(FSM):
+    >>>     signals = {'on': {'off': 'off'}, 'off': {'on': 'on'}}
+    >>> light.signal('off')
+    """
+
+    __slots__ = ("env", "process", "stack")
+
+    # Create the process in `__init__`, rather than in `start()` (see
+    # `simpy_fsm.spawn`)
+    autostart = True
+
+    def __init__(self, env: "simpy.core.Environment", initial_state: str):
+        """Init state machine instance, and init its Process as
+        `self.process` (unless the class has `autostart = False`).
+        """
+
+        self.env = env
+        self.current_state = self._state(initial_state)
+        self.stack: List[StateMachine] = []
+        self.process: Optional[simpy.Process] = None
+        if self.autostart:
+            self._start()
+
+    def _start(self) -> None:
+        """Create this FSM's Process, which starts in `current_state`."""
+        self.process = FSMProcess(self.env, _driver(self, self.current_state))
+
+    start = start
+
+    @property
+    def state_path(self) -> Tuple[Optional[str], ...]:
+        """The names of the current states, outermost first."""
+        return tuple(machine.state_name for machine in self.stack)
+
+    def signal(self, cause: Hashable = None) -> Signal:
+        """Deliver signal `cause` to the innermost running state that
+        handles it (see `signals`), in an urgent event at the current time.
+        The signal is dropped if no state handles it when it arrives."""
+        return Signal(self, cause)
+
+    def _receive(self, signal: Signal) -> None:
+        process = self.process
+        if process._value is not PENDING:
+            return  # Stopped before the signal arrived
+        route = route_signal(self.stack, signal.cause)
+        if route is None:
+            return
+        if route.state is not None and route.state.__class__ is not State:
+            # A handler: it decides where its machine goes
+            route.state = route.state(self.stack[route.level], signal)
+        # Like an Interrupt: stop waiting for the target event, and resume
+        # the driver with the route.
+        waited = process._target
+        waited.callbacks.remove(process._resume)
+        signal._value = route
+        process._resume(signal)
+        left(self.env, waited)
+
+
+class SubstateFSM(StateMachine):
+    """A state machine that a state of an `FSM` (or of another SubstateFSM)
+    runs by yielding it. It starts in `initial_state` when entered, and the
+    `yield` returns when it finishes."""
+
+    __slots__ = ("env",)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _submachine_classes.add(cls)
+
+    def __init__(self, env: "simpy.core.Environment", initial_state: str):
+        self.env = env
+        self.current_state = self._state(initial_state)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} in state {self.state_name}>"
+
+    def restart(self, initial_state: str) -> "SubstateFSM":
+        """Put this machine back in `initial_state`, and return it. A parent
+        can create its sub-machine once, and re-enter it every time with
+        `yield self.substate.restart('green')`."""
+        self.current_state = self._state(initial_state)
+        return self
+
+
+_submachine_classes.add(SubstateFSM)
@@ -0,0 +1,164 @@
+"""
+Mailboxes: message queues for FSMs that deliver messages in batches.
+
+With a `simpy.Store`, a consumer wakes up once per message: a burst of 100
+messages at one time costs 100 `get()` events and 100 resumes. A `Mailbox`
+wakes its consumer once per simulation time instead, with every message
+that arrived at that time:
+
+    class Server(FSM):
+        def __init__(self, env, initial_state="serving"):
+            self.mailbox = Mailbox(env, capacity=1000)
+            super().__init__(env, initial_state)
+
+        def serving(self):
+            requests = yield self.mailbox.receive()   # a list, oldest first
+            for request in requests:
+                ...
+            return self.serving
+
+Producers put messages with `mailbox.put(message)`, from a state or any
+other process. When the mailbox is full, the event that `put` returns stays
+pending until the consumer has made room, so a producer that yields it
+blocks; otherwise it is an event that has already happened, which lets the
+producer go on without a trip through the event queue. `try_put` is the
+non-blocking version, for callbacks that cannot yield.
+
+The consumer's wake-up is scheduled at the time of the first message, with
+priority `LATE`: after every urgent and normal event at that time. So
+messages put by other events at the same time still make it into the batch.
+A mailbox has one consumer; `receive()` while a receive is already pending
+returns the pending event, so a state that was interrupted while waiting can
+wait for the same batch again without losing messages.
+"""
+
+import collections
+from typing import Any, Deque, List, Optional, Sequence, Tuple
+
+import simpy
+from simpy.events import NORMAL, Event
+
+
+# Scheduling priority of a mailbox's wake-up: after the URGENT (0) and
+# NORMAL (1) events at the same time.
+LATE = NORMAL + 1
+
+
+class Mailbox:
+    """A FIFO message queue with one consumer, and room for `capacity`
+    messages (unlimited by default).
+
+    >>> mailbox = Mailbox(env, capacity=2)
+    >>> mailbox.try_put('a'), mailbox.try_put('b'), mailbox.try_put('c')
+    (True, True, False)
+    >>> len(mailbox)
+    2
+    """
+
+    __slots__ = (
+        "env", "capacity", "messages", "_receiver", "_waiters", "_blocked", "_done"
+    )
+
+    def __init__(self, env: "simpy.core.Environment", capacity: float = float("inf")):
+        if capacity <= 0:
+            raise ValueError(f"capacity must be positive, not {capacity!r}")
+        self.env = env
+        self.capacity = capacity
+        self.messages: Deque[Any] = collections.deque()
+        # The pending receive() event, if any, and its callbacks list
+        self._receiver: Optional[Event] = None
+        self._waiters: Sequence[Any] = ()
+        # (put event, message) of the producers that wait for room
+        self._blocked: Deque[Tuple[Event, Any]] = collections.deque()
+        # An event that has already been processed: yielding it resumes the
+        # producer right away.
+        self._done = Event(env)
+        self._done._ok = True
+        self._done._value = None
+        self._done.callbacks = None
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def __repr__(self):
+        return (
+            f"<Mailbox with {len(self.messages)} messages, "
+            f"{len(self._blocked)} blocked producers>"
+        )
+
+    def put(self, message: Any) -> Event:
+        """Put `message` in the mailbox, and return an event to yield: it
+        has already happened if there was room, or else happens when the
+        consumer has made room and the message is in."""
+        if len(self.messages) < self.capacity:
+            self._append(message)
+            return self._done
+        event = Event(self.env)
+        self._blocked.append((event, message))
+        return event
+
+    def try_put(self, message: Any) -> bool:
+        """Put `message` in the mailbox if there is room, and return whether
+        there was."""
+        if len(self.messages) < self.capacity:
+            self._append(message)
+            return True
+        return False
+
+    def receive(self) -> Event:
+        """Return an event that happens once the mailbox holds at least one
+        message, at the end of that simulation time. Its value is the list
+        of all messages in the mailbox then, oldest first; they are taken
+        out of the mailbox."""
+        receiver = self._receiver
+        if receiver is None:
+            receiver = self._receiver = Event(self.env)
+            receiver.callbacks.append(self._deliver)
+            self._waiters = receiver.callbacks
+            if self.messages:
+                self._schedule(receiver)
+        return receiver
+
+    def _append(self, message: Any) -> None:
+        self.messages.append(message)
+        receiver = self._receiver
+        if receiver is not None and receiver._value is simpy.events.PENDING:
+            self._schedule(receiver)
+
+    def _schedule(self, receiver: Event) -> None:
+        # The value is filled in by `_deliver`, when the event is processed
+        receiver._ok = True
+        receiver._value = None
+        self.env.schedule(receiver, LATE)
+
+    def _deliver(self, receiver: Event) -> None:
+        """Hand every message to `receiver`, as the first of its callbacks,
+        and let the blocked producers fill up the room that this makes."""
+        self._receiver = None
+        # Drop the callbacks list: it holds our `_deliver`, so keeping it
+        # would tie the mailbox into a reference cycle.
+        waiters, self._waiters = self._waiters, ()
+        if len(waiters) == 1:
+            # Nobody waits for the batch any more (the consumer was
+            # interrupted): keep the messages for the next receive().
+            return
+        messages = self.messages
+        receiver._value = list(messages)
+        messages.clear()
+        blocked = self._blocked
+        while blocked and len(messages) < self.capacity:
+            event, message = blocked.popleft()
+            messages.append(message)
+            event.succeed()
+
+    def drain(self) -> List[Any]:
+        """Take every message out of the mailbox right away, without waiting,
+        and let blocked producers fill up the room."""
+        messages = list(self.messages)
+        self.messages.clear()
+        blocked = self._blocked
+        while blocked and len(self.messages) < self.capacity:
+            event, message = blocked.popleft()
+            self._append(message)
+            event.succeed()
+        return messages
@@ -0,0 +1,266 @@
+"""
+Orthogonal regions: several independent state machines in one FSM instance,
+run by one Simpy Process.
+
+A composite agent such as a machine that makes parts and also breaks down
+every now and then is usually written as two FSMs, each with a Process of
+its own, that talk through `process.interrupt()`:
+
+    machine = Machine(shop)                          # two Processes,
+    breaker = MachineFailure(shop, machine=machine)  # two instances
+
+With regions, the class declares the extra state machines it runs next to
+its main one, by the state each of them starts in:
+
+    class Machine(FSM):
+        regions = {"failures": "break_machine"}
+
+        def working(self):                 # the main region
+            done = yield self.env.timeout(self.work_left)
+            if done.__class__ is Signal:
+                return self.awaiting_repairman
+            ...
+
+        def break_machine(self):           # the "failures" region
+            yield self.env.timeout(self.shop.time_to_failure())
+            self.signal(BREAK)
+            return self.break_machine
+
+    machine = Machine(env, "working")      # one Process
+
+All regions share the instance, its attributes and its state table. The main
+region is the FSM's Process, as in `simpy_fsm.v4`: `process.interrupt()`
+and `fsm.signal()` go to it, and so do the interrupts with which Simpy
+preempts resource requests made in any region.
+
+Every other region is a `Region`: a trampoline generator that event
+callbacks resume directly, the way a Process would, but without a Process
+of its own. While a region runs, `env.active_process` is the FSM's Process.
+`fsm.region(name).signal(cause)` sends a region a signal (see
+`simpy_fsm.signals`): one urgent event and no exception, routed through
+the class's declared `signals` like any other signal.
+"""
+
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import simpy
+from simpy.events import URGENT, Event, Timeout
+
+from simpy_fsm import v4
+from simpy_fsm.signals import Signal
+from simpy_fsm.states import (
+    UNHANDLED, State, dormant, invalid_transition, looping, not_a_state, timed
+)
+from simpy_fsm.v4 import FsmGen, SubstateFSM
+from simpy_fsm.waits import left
+
+
+def _region_trampoline(fsm: Any, region: "Region", initial_state: Optional[State]) -> FsmGen:
+    """Run the states of `region` on `fsm`, starting in `initial_state`: the
+    trampoline of `simpy_fsm.v4`, except that it keeps the current state on
+    the region instead of on `fsm`."""
+    state = initial_state
+    while state is not None:
+        try:
+            state_func = state.func
+        except AttributeError:
+            raise invalid_transition(fsm, state) from None
+        region.current_state = state
+        if state_func is None:
+            # A timed state (see `simpy_fsm.states.timed`)
+            if state.on_enter is not None:
+                state.on_enter(fsm)
+            delay_func = state.delay_func
+            timeout = Timeout(
+                fsm.env, state.delay if delay_func is None else delay_func(fsm)
+            )
+            woken = yield timeout
+            while woken.__class__ is Signal and state.on_signal is None:
+                # A signal that this state does not handle
+                woken = yield timeout
+            if woken.__class__ is Signal:
+                state = state.signalled(woken, fsm)
+                continue
+            if state.on_timeout is not None:
+                state.on_timeout(fsm)
+            state = state.next_state
+            continue
+        state = (yield from state_func(fsm))
+    region.current_state = None
+
+
+class Region:
+    """A region of `fsm` called `name`, which starts in `initial_state`: a
+    trampoline generator, resumed by callbacks on the events it waits for.
+
+    `target` is the event the region waits for; it is None once the region
+    has stopped. So is `fsm`.
+    """
+
+    __slots__ = ("fsm", "name", "current_state", "generator", "target", "_callback")
+
+    def __init__(self, fsm: "FSM", name: str, initial_state: State):
+        self.fsm = fsm
+        self.name = name
+        self.current_state: Optional[State] = initial_state
+        self.generator = _region_trampoline(fsm, self, initial_state)
+        # One bound method for all the events we will wait for
+        self._callback = self._resume
+
+        # Start the way a Process starts: on an urgent event
+        start = Event(fsm.env)
+        start._ok = True
+        start._value = None
+        start.callbacks.append(self._callback)
+        fsm.env.schedule(start, URGENT)
+        self.target: Optional[Event] = start
+
+    def __repr__(self):
+        if self.fsm is None:
+            return f"<Region {self.name!r}, stopped>"
+        return f"<Region {self.name!r} of {self.fsm!r} in state {self.state_name}>"
+
+    @property
+    def state_name(self) -> Optional[str]:
+        """The name of the current state, or None if the region has stopped."""
+        state = self.current_state
+        return None if state is None else state.name
+
+    @property
+    def is_alive(self) -> bool:
+        """True until the region has returned None from its last state."""
+        return self.target is not None
+
+    def signal(self, cause: Hashable = None) -> Signal:
+        """Send signal `cause` to this region, in an urgent event at the
+        current time: see `simpy_fsm.signals`."""
+        if self.target is None:
+            raise RuntimeError(f"{self} has stopped and cannot receive signals.")
+        # Inlined from Signal.__init__(), which expects an FSM with a Process
+        env = self.fsm.env
+        signal = Signal.__new__(Signal)
+        signal.env = env
+        signal.callbacks = [self._receive]
+        signal._value = None
+        signal._ok = True
+        signal.fsm = self
+        signal.cause = cause
+        env.schedule(signal, URGENT)
+        return signal
+
+    def _receive(self, signal: Signal) -> None:
+        """Deliver `signal`, as `simpy_fsm.signals.receive` does for an FSM:
+        go to the target of the current state's handler, or else end the
+        current wait with `signal`."""
+        if self.target is None:
+            return  # Stopped before the signal arrived
+        state = self.current_state
+        fsm = self.fsm
+        target = fsm._signal_table[state.id].get(signal.cause, UNHANDLED)
+        waited = self.target
+        waited.callbacks.remove(self._callback)
+        if target is UNHANDLED:
+            signal._value = signal
+            self._resume(signal)
+            signal._value = None
+        else:
+            if target is not None and target.__class__ is not State:
+                target = target(fsm, signal)
+            self.generator.close()
+            self.generator = _region_trampoline(fsm, self, target)
+            self._resume(signal)
+        left(signal.env, waited)
+
+    def _stop(self) -> None:
+        """Mark the region as stopped, and drop the references that tie it
+        and its FSM into reference cycles (`_callback`, and `fsm`, whose
+        `_regions` refer back to the region), so that both can be freed
+        without a garbage collection."""
+        self.target = None
+        self._callback = None
+        self.fsm = None
+
+    def _resume(self, event: Event) -> None:
+        """Send the value of `event` to the region's generator (or throw it,
+        if the event failed), and wait for the event that it yields next."""
+        env = self.fsm.env
+        # Like Process._resume(): resource requests and other events that a
+        # state creates see the FSM's Process as the active process.
+        env._active_proc = self.fsm.process
+        while True:
+            try:
+                if event._ok:
+                    event = self.generator.send(event._value)
+                else:
+                    event._defused = True
+                    event = self.generator.throw(event._value)
+            except StopIteration:
+                self._stop()
+                break
+            except BaseException:
+                self._stop()
+                env._active_proc = None
+                raise
+            if event.callbacks is not None:
+                event.callbacks.append(self._callback)
+                self.target = event
+                break
+            # The event has already been processed: go on right away
+        env._active_proc = None
+
+
+class FSM(v4.FSM):
+    """A `simpy_fsm.v4` FSM that also runs the regions that its class
+    declares in `regions`, a dict of region name -> initial state name.
+
+    >>> class Machine(FSM):
+    >>>     regions = {'failures': 'break_machine'}
+    >>> machine = Machine(env, initial_state='working')
+    >>> machine.region('failures').state_name
+    'break_machine'
+
+    The states of all regions are methods of the class, and share `self`.
+    """
+
+    __slots__ = ("_regions",)
+
+    # region name -> name of the state it starts in
+    regions: Dict[str, str] = {}
+    _region_states: Tuple[Tuple[str, State], ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.regions and cls.max_dwell:
+            # The watchdog would end states of the main region only
+            raise TypeError(f"{cls.__name__}: regions cannot have max_dwell limits")
+        cls._region_states = tuple(
+            (name, cls._state(initial_state)) for name, initial_state in cls.regions.items()
+        )
+
+    def __init__(self, env: "simpy.core.Environment", initial_state: str):
+        # The regions are created with the Process (see `_start`)
+        self._regions: Tuple[Region, ...] = ()
+        super().__init__(env, initial_state)
+
+    def _start(self) -> None:
+        """Create this FSM's Process, and its other regions."""
+        super()._start()
+        self._regions = tuple(
+            Region(self, name, state) for name, state in self._region_states
+        )
+
+    def region(self, name: str) -> Region:
+        """Return the region called `name`."""
+        for region in self._regions:
+            if region.name == name:
+                return region
+        raise ValueError(
+            f"{type(self).__name__} has no region {name!r}; its regions are: "
+            f"{', '.join(self.regions) or '(none)'}"
+        )
+
+    @property
+    def state_names(self) -> Tuple[Optional[str], ...]:
+        """The names of the current states: of the main region first, then
+        of the other regions in declaration order."""
+        return (self.state_name,) + tuple(region.state_name for region in self._regions)
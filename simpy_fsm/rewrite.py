@@ -0,0 +1,446 @@
+"""
+Source-level rewrites of state methods.
+
+`make_looping(func, name)` turns a generator state method that returns
+`self.<name>` (a transition to itself) into one that loops instead:
+
+    def working(self):                  def working(self):
+        start = self.env.now                while True:
+        try:                                    start = self.env.now
+            yield self.env.timeout(5)           try:
+            return self.working     ->              yield self.env.timeout(5)
+        except simpy.Interrupt:                     continue
+            return self.broken                  except simpy.Interrupt:
+                                                    return self.broken
+                                                return
+
+Parameters with default values are set back to their defaults before the
+`continue`, and `*args`/`**kwargs` to empty, as for a new visit without
+arguments. The trampoline then never sees the self-transition, and no new
+generator is created for it. Rewriting needs the function's source; functions without
+source, or with closures, are returned unchanged.
+
+`flatten(cls, params, fallback)` goes further and compiles all the states of
+an FSM class into one generator function, in which every `return
+self.<state>` is a jump to that state's branch; `flat_trampoline()` caches
+the result per class. The `v1` and `v4` variants use it for classes that set
+`flatten = True`.
+"""
+
+import ast
+import copy
+import functools
+import inspect
+import sys
+import textwrap
+import weakref
+from typing import Any, Callable, List, Optional, Tuple
+
+
+class SelfTransitions(ast.NodeTransformer):
+    """Replace `return <self>.<name>` by `continue`, in the function's own
+    body, outside nested loops, functions and classes."""
+
+    def __init__(self, self_name: str, state_name: str, restart: List[ast.stmt] = ()):
+        self.self_name = self_name
+        self.state_name = state_name
+        self.restart = restart
+        self.count = 0
+
+    def is_self_transition(self, node: ast.Return) -> bool:
+        value = node.value
+        return (
+            isinstance(value, ast.Attribute)
+            and value.attr == self.state_name
+            and isinstance(value.value, ast.Name)
+            and value.value.id == self.self_name
+        )
+
+    def visit_Return(self, node: ast.Return):
+        if self.is_self_transition(node):
+            self.count += 1
+            statements = [copy.deepcopy(statement) for statement in self.restart]
+            statements.append(ast.Continue())
+            return [ast.copy_location(statement, node) for statement in statements]
+        return node
+
+    def skip(self, node):
+        """Leave nodes alone in which `continue` or `return` means something
+        else."""
+        return node
+
+    visit_For = visit_AsyncFor = visit_While = skip
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_Lambda = skip
+    visit_ClassDef = skip
+
+
+class PrivateNames(ast.NodeTransformer):
+    """Mangle `__private` names the way the compiler does inside the body of
+    class `class_name`: `__x` becomes `_ClassName__x`."""
+
+    def __init__(self, class_name: str):
+        self.prefix = "_" + class_name.lstrip("_")
+
+    def mangle(self, name: Optional[str]) -> Optional[str]:
+        if name and name.startswith("__") and not name.endswith("__"):
+            return self.prefix + name
+        return name
+
+    def visit_Name(self, node):
+        node.id = self.mangle(node.id)
+        return node
+
+    def visit_Attribute(self, node):
+        node.attr = self.mangle(node.attr)
+        return self.generic_visit(node)
+
+    def visit_arg(self, node):
+        node.arg = self.mangle(node.arg)
+        return self.generic_visit(node)
+
+    def visit_keyword(self, node):
+        node.arg = self.mangle(node.arg)
+        return self.generic_visit(node)
+
+
+def function_def(func: Callable) -> Optional[ast.FunctionDef]:
+    """Return the parsed definition of `func`, with its line numbers as in
+    its source file and its private names mangled as in its class, or None
+    if its source is not available."""
+    try:
+        lines, first_line = inspect.getsourcelines(func)
+    except (OSError, TypeError):
+        return None
+    module = ast.parse(textwrap.dedent("".join(lines)))
+    if not module.body or not isinstance(module.body[0], ast.FunctionDef):
+        return None
+    ast.increment_lineno(module, first_line - 1)
+    node = module.body[0]
+
+    qualname = func.__qualname__.split(".")
+    if len(qualname) >= 2 and qualname[-2] != "<locals>" and qualname[-2].strip("_"):
+        node.body = [PrivateNames(qualname[-2]).visit(stmt) for stmt in node.body]
+    return node
+
+
+def recompile(func: Callable, node: ast.FunctionDef, **free: Any) -> Callable:
+    """Compile function definition `node` in `func`'s module, and return the
+    new function with `func`'s defaults, name and docstring.
+
+    Decorators, annotations and default values are dropped from `node`
+    first: the defaults are copied from `func` instead of being evaluated
+    again. The keyword arguments are values the body refers to by name,
+    as free variables of the new function.
+    """
+    node.decorator_list = []
+    node.returns = None
+    arguments = node.args
+    for arg in arguments.posonlyargs + arguments.args + arguments.kwonlyargs:
+        arg.annotation = None
+    for arg in (arguments.vararg, arguments.kwarg):
+        if arg is not None:
+            arg.annotation = None
+    arguments.defaults = []
+    arguments.kw_defaults = [None] * len(arguments.kwonlyargs)
+
+    factory = ast.FunctionDef(
+        name="_rewrite_factory",
+        args=ast.arguments(
+            posonlyargs=[], args=[ast.arg(arg=name) for name in free], vararg=None,
+            kwonlyargs=[], kw_defaults=[], kwarg=None, defaults=[],
+        ),
+        body=[node, ast.Return(value=ast.Name(id=node.name, ctx=ast.Load()))],
+        decorator_list=[],
+        returns=None,
+    )
+    ast.copy_location(factory, node)
+    module = ast.fix_missing_locations(ast.Module(body=[factory], type_ignores=[]))
+    code = compile(module, inspect.getsourcefile(func) or "<fsm>", "exec")
+    namespace: dict = {}
+    exec(code, func.__globals__, namespace)
+    new = namespace["_rewrite_factory"](**free)
+    new.__defaults__ = func.__defaults__
+    new.__kwdefaults__ = func.__kwdefaults__
+    new.__name__ = func.__name__
+    new.__qualname__ = func.__qualname__
+    new.__doc__ = func.__doc__
+    new.__module__ = func.__module__
+    return new
+
+
+@functools.lru_cache(maxsize=None)
+def make_looping(func: Callable, state_name: str) -> Callable:
+    """Return a version of generator function `func`, the state called
+    `state_name`, in which `return self.<state_name>` loops back to the top
+    of the function instead of returning.
+
+    Before looping, the parameters with defaults are set back to them, and
+    `*args` and `**kwargs` to empty: the next pass starts as a visit without
+    arguments would.
+
+    Returns `func` itself if it has no such returns, or if it cannot be
+    rewritten (no source, or a closure).
+    """
+    if func.__closure__:
+        return func
+    node = function_def(func)
+    if node is None or not node.args.args:
+        return func
+
+    transformer = SelfTransitions(
+        node.args.args[0].arg, state_name, restart_statements(func, node.args)
+    )
+    body = []
+    for statement in node.body:
+        result = transformer.visit(statement)
+        body.extend(result if isinstance(result, list) else [result])
+    if not transformer.count:
+        return func
+    # Falling off the end of the body still ends the state
+    body.append(ast.Return(value=None))
+    loop = ast.While(test=ast.Constant(value=True), body=body, orelse=[])
+    node.body = [ast.copy_location(loop, node.body[0])]
+    return recompile(
+        func, node, _looping_defaults=func.__defaults__, _looping_kwdefaults=func.__kwdefaults__
+    )
+
+
+def restart_statements(func: Callable, arguments: ast.arguments) -> List[ast.stmt]:
+    """Return the statements that set `func`'s parameters as a call without
+    arguments would: the defaults (from `_looping_defaults` and
+    `_looping_kwdefaults`), and empty `*args` and `**kwargs`."""
+    def assign(name: str, value: ast.expr) -> ast.stmt:
+        return ast.Assign(targets=[ast.Name(id=name, ctx=ast.Store())], value=value)
+
+    def item(mapping: str, key: Any) -> ast.expr:
+        return ast.Subscript(
+            value=ast.Name(id=mapping, ctx=ast.Load()),
+            slice=ast.Constant(value=key),
+            ctx=ast.Load(),
+        )
+
+    statements = []
+    positional = arguments.posonlyargs + arguments.args
+    defaults = func.__defaults__ or ()
+    first = len(positional) - len(defaults)
+    for i, arg in enumerate(positional[first:]):
+        statements.append(assign(arg.arg, item("_looping_defaults", i)))
+    for arg in arguments.kwonlyargs:
+        if func.__kwdefaults__ and arg.arg in func.__kwdefaults__:
+            statements.append(assign(arg.arg, item("_looping_kwdefaults", arg.arg)))
+    if arguments.vararg is not None:
+        statements.append(assign(arguments.vararg.arg, ast.Tuple(elts=[], ctx=ast.Load())))
+    if arguments.kwarg is not None:
+        statements.append(assign(arguments.kwarg.arg, ast.Dict(keys=[], values=[])))
+    return statements
+
+
+class StateReturns(ast.NodeTransformer):
+    """Replace `return <next state>` by `<variable> = <next state>` followed
+    by `continue`, in the function's own body. `blocked` is set if a
+    `return` sits inside a nested loop, where `continue` would mean
+    something else."""
+
+    def __init__(self, variable: str):
+        self.variable = variable
+        self.blocked = False
+
+    def visit_Return(self, node: ast.Return):
+        value = node.value if node.value is not None else ast.Constant(value=None)
+        assign = ast.Assign(targets=[ast.Name(id=self.variable, ctx=ast.Store())], value=value)
+        return [ast.copy_location(assign, node), ast.copy_location(ast.Continue(), node)]
+
+    def visit_loop(self, node):
+        for child in ast.walk(node):
+            if isinstance(child, ast.Return):
+                self.blocked = True
+        return node
+
+    def skip(self, node):
+        return node
+
+    visit_For = visit_AsyncFor = visit_While = visit_loop
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_Lambda = skip
+    visit_ClassDef = skip
+
+
+FLAT_TEMPLATE = """
+def _flat_factory({refs}):
+    def {name}({params}, _flat_state):
+        while _flat_state is not None:
+            _flat_fsm.current_state = _flat_state
+            {branches}
+            else:
+                _flat_func = getattr(_flat_state, "func", None)
+                if _flat_func is None:
+                    # A timed state, or not a state: let the generic
+                    # trampoline take over from here.
+                    return (yield from _flat_fallback({params}, _flat_state))
+                _flat_state = yield from _flat_func({params})
+        _flat_fsm.current_state = None
+    return {name}
+"""
+
+
+def local_names(node: ast.FunctionDef) -> Tuple[set, set]:
+    """Return the names `node`'s body assigns, and the names it reads without
+    assigning them (globals, usually). Names bound in nested scopes count
+    too, which errs on the safe side."""
+    stored = {arg.arg for arg in node.args.args}
+    loaded = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name):
+            (loaded if isinstance(child.ctx, ast.Load) else stored).add(child.id)
+        elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            stored.add(child.name)
+        elif isinstance(child, ast.alias):
+            stored.add((child.asname or child.name).split(".")[0])
+        elif isinstance(child, ast.ExceptHandler) and child.name:
+            stored.add(child.name)
+    return stored, loaded - stored
+
+
+def inline_state(state, n_params: int, module_globals: dict) -> Optional[ast.FunctionDef]:
+    """Return the definition of `state`'s method with its returns turned
+    into jumps, or None if it cannot be inlined into a flattened generator
+    run in `module_globals`."""
+    func = state.definition
+    if (
+        state.func is None
+        or getattr(state.func, "_fsm_max_dwell", False)
+        or not inspect.isgeneratorfunction(func)
+        or func.__closure__
+        or func.__globals__ is not module_globals
+    ):
+        return None
+    node = function_def(func)
+    if node is None:
+        return None
+    arguments = node.args
+    if (
+        len(arguments.args) != n_params
+        or arguments.posonlyargs
+        or arguments.vararg
+        or arguments.kwonlyargs
+        or arguments.kwarg
+    ):
+        return None
+    transformer = StateReturns("_flat_state")
+    body = []
+    for statement in node.body:
+        result = transformer.visit(statement)
+        body.extend(result if isinstance(result, list) else [result])
+    if transformer.blocked or any(
+        isinstance(child, (ast.Global, ast.Nonlocal)) for child in ast.walk(node)
+    ):
+        return None
+    # Falling off the end of the body ends the FSM, as `return None` would
+    body.extend(transformer.visit(ast.copy_location(ast.Return(value=None), node.body[-1])))
+    node.body = body
+    return node
+
+
+def flatten(cls: type, params: Tuple[str, ...], fallback: Callable) -> Callable:
+    """Return a generator function `flat(*params, initial_state)` that runs
+    FSM class `cls` in one generator: the bodies of its state methods are
+    inlined as the branches of one loop, and `return self.next_state`
+    becomes a jump to the next state's branch.
+
+    `params` name the trampoline's arguments before the state, e.g.
+    `("fsm", "data")`; every state method takes the same arguments. States
+    that cannot be inlined (no source, a closure, another module, other
+    arguments, a `return` inside a loop, a local name that another state
+    uses as a global) are run as generators from the
+    flattened loop; timed states, and values that are not states, are
+    handed to `fallback`, the variant's generic trampoline, for the rest of
+    the run.
+    """
+    module = sys.modules.get(cls.__module__)
+    module_globals = vars(module) if module is not None else {}
+    flat_params = ["_flat_" + param for param in params]
+
+    # All inlined bodies share one function's locals: skip a state that
+    # reads, as a global, a name that another inlined state assigns.
+    inlined = []
+    all_stored: set = set()
+    all_free: set = set()
+    for state in cls._states.values():
+        node = inline_state(state, len(params), module_globals)
+        if node is None:
+            continue
+        stored, free = local_names(node)
+        if free & all_stored or stored & all_free:
+            continue
+        all_stored |= stored
+        all_free |= free
+        inlined.append((state, node))
+
+    refs = [f"_flat_S{i}" for i in range(len(inlined))] + ["_flat_fallback"]
+    branches = "\n            ".join(
+        f"{'if' if i == 0 else 'elif'} _flat_state is _flat_S{i}:\n                pass"
+        for i in range(len(inlined))
+    ) or "if False:\n                pass"
+    name = f"_flat_{cls.__name__}"
+    source = FLAT_TEMPLATE.format(
+        refs=", ".join(refs), name=name, params=", ".join(flat_params), branches=branches
+    )
+    tree = ast.parse(source)
+    first_line = class_first_line(cls)
+    for node in ast.walk(tree):
+        if hasattr(node, "lineno"):
+            node.lineno = node.end_lineno = first_line
+
+    # Splice the state bodies into the `if ... elif ...` chain
+    flat_def = tree.body[0].body[0]
+    branch = flat_def.body[0].body[1]
+    for state, node in inlined:
+        prologue = [
+            ast.copy_location(
+                ast.Assign(
+                    targets=[ast.Name(id=arg.arg, ctx=ast.Store())],
+                    value=ast.Name(id=flat_param, ctx=ast.Load()),
+                ),
+                node,
+            )
+            for arg, flat_param in zip(node.args.args, flat_params)
+        ]
+        branch.body = prologue + node.body
+        if branch.orelse and isinstance(branch.orelse[0], ast.If):
+            branch = branch.orelse[0]
+
+    code = compile(ast.fix_missing_locations(tree), source_file(cls), "exec")
+    namespace: dict = {}
+    exec(code, module_globals, namespace)
+    return namespace["_flat_factory"](*(state for state, _ in inlined), fallback)
+
+
+def class_first_line(cls: type) -> int:
+    try:
+        return inspect.getsourcelines(cls)[1]
+    except (OSError, TypeError):
+        return 1
+
+
+def source_file(cls: type) -> str:
+    try:
+        return inspect.getsourcefile(cls) or "<fsm>"
+    except TypeError:
+        return "<fsm>"
+
+
+_flat_cache: "weakref.WeakKeyDictionary[type, Callable]" = weakref.WeakKeyDictionary()
+
+
+def flat_trampoline(cls: type, params: Tuple[str, ...], fallback: Callable) -> Callable:
+    """Return `flatten(cls, params, fallback)`, compiling it only once per
+    class; if `cls` cannot be flattened at all, return `fallback`."""
+    try:
+        return _flat_cache[cls]
+    except KeyError:
+        pass
+    try:
+        flat = flatten(cls, params, fallback)
+    except SyntaxError:
+        flat = fallback
+    _flat_cache[cls] = flat
+    return flat
@@ -0,0 +1,173 @@
+"""
+Signals: messages for an FSM that do not raise an exception in its states.
+
+`fsm.process.interrupt(cause)` builds a `simpy.Interrupt`, and throws it
+through the trampoline's `yield from` into the current state, which must
+catch it. `fsm.signal(cause)` delivers `cause` without raising anything. It
+arrives the way an interrupt does, in an urgent event at the current time,
+and then one of two things happens:
+
+- If the class declares a handler for `cause` in the current state, the
+  FSM goes where the handler says. The current state's generator is closed
+  (its `finally` blocks run), and the FSM starts over in the target state:
+
+      class Machine(FSM):
+          signals = {
+              "idle": {Break: "broken"},
+              "working": {Break: on_break},   # on_break(self, signal)
+          }
+
+  A target is the name of a state, None to stop the FSM, or a callable that
+  gets `(fsm, signal)` and returns the next state (in v2 and v3, possibly
+  a `goto()`).
+
+- Otherwise the wait of the current state ends: its `yield` returns the
+  `Signal` event instead of the value of the event it was waiting for.
+
+      def working(self):
+          start = self.env.now
+          done = yield self.env.timeout(self.work_left)
+          if done.__class__ is Signal:   # instead of `except Interrupt:`
+              self.work_left -= self.env.now - start
+              return self.broken
+
+  Like an Interrupt, the signal does not cancel the event the state was
+  waiting for (but see `track_left` in `simpy_fsm.waits`).
+
+`process.interrupt()` still works as before. `python -m benchmarks
+--workload interrupt_heavy --impl v4 v4_signals` compares the two.
+
+The hierarchical engine (`simpy_fsm.hsm`) routes signals through the same
+declarations, to the innermost state that handles them.
+"""
+
+from typing import Any, Hashable, Sequence
+
+import simpy
+
+from simpy.events import PENDING, URGENT, Event
+
+from simpy_fsm.states import UNHANDLED, State
+from simpy_fsm.waits import left
+
+
+class Signal(Event):
+    """Signal `cause` to `fsm`: an urgent event at the current time, whose
+    callback `fsm._receive(signal)` delivers the signal.
+
+    While the signal ends a state's wait, the value of the event is the
+    event itself, so that the state gets the `Signal` back from its `yield`.
+    """
+
+    def __init__(self, fsm: Any, cause: Hashable = None):
+        # Inlined from Event.__init__(), as in `simpy.events.Interruption`
+        self.env = fsm.env
+        self.callbacks = [fsm._receive]
+        self._value = None
+        self._ok = True
+        self.fsm = fsm
+        self.cause = cause
+
+        process = fsm.process
+        if process is None:
+            raise RuntimeError(f"{fsm!r} has not started and cannot receive signals.")
+        if process._value is not PENDING:
+            raise RuntimeError(f"{process} has terminated and cannot receive signals.")
+        self.env.schedule(self, URGENT)
+
+    @classmethod
+    def to_all(
+        cls, env: "simpy.core.Environment", fsms: Sequence[Any], cause: Hashable = None
+    ) -> "Signal":
+        """Signal `cause` to every FSM in `fsms`, in one urgent event: one
+        event-loop step delivers the signal to all of them, in order. FSMs
+        that have stopped by then are skipped. The signal's `fsm` is None."""
+        signal = cls.__new__(cls)
+        signal.env = env
+        signal.callbacks = [signal._deliver_all]
+        signal._value = None
+        signal._ok = True
+        signal.fsm = None
+        signal.cause = cause
+        signal.recipients = fsms
+        env.schedule(signal, URGENT)
+        return signal
+
+    def _deliver_all(self, event: Event) -> None:
+        for fsm in self.recipients:
+            fsm._receive(self)
+
+    def __repr__(self):
+        return f"<Signal({self.cause!r}) for {self.fsm!r}>"
+
+
+def receive(fsm: Any, signal: Signal) -> None:
+    """Deliver `signal` to `fsm`, an FSM of `simpy_fsm.v1` ... `v4`: go to
+    the target of the current state's handler, if it has one, or else end
+    the current wait with `signal`.
+
+    `fsm._generator_at(state)` must return a new trampoline generator that
+    starts in `state`.
+    """
+    process = fsm.process
+    if process._value is not PENDING:
+        return  # Stopped before the signal arrived
+    state = fsm.current_state
+    target = (
+        UNHANDLED if state is None
+        else fsm._signal_table[state.id].get(signal.cause, UNHANDLED)
+    )
+    # Like an Interrupt: stop waiting for the target event
+    waited = process._target
+    waited.callbacks.remove(process._resume)
+    if target is UNHANDLED:
+        signal._value = signal
+        process._resume(signal)
+        # The state has its Signal: break the event's reference to itself,
+        # so that reference counting frees it.
+        signal._value = None
+    else:
+        if target is not None and target.__class__ is not State:
+            target = target(fsm, signal)
+        restart_at(fsm, target, signal)
+    left(fsm.env, waited)
+
+
+class MaxDwell:
+    """The cause of the signal with which the watchdog ends a state that
+    has lasted longer than its `max_dwell` limit (see
+    `simpy_fsm.states.compile_dwell`)."""
+
+
+def expire_dwell(fsm: Any, target: Any) -> None:
+    """Move `fsm`, which has been in its current state for too long, to
+    `target`: a `State`, None to stop, or a callable that gets
+    `(fsm, signal)` and returns the next state. Like a handled signal, but
+    delivered right away, from the watchdog's callback."""
+    process = fsm.process
+    if process._value is not PENDING:
+        return
+    # Inlined from Signal.__init__(): this signal is not scheduled
+    signal = Signal.__new__(Signal)
+    signal.env = fsm.env
+    signal.callbacks = None
+    signal._value = None
+    signal._ok = True
+    signal.fsm = fsm
+    signal.cause = MaxDwell
+    waited = process._target
+    waited.callbacks.remove(process._resume)
+    if target is not None and target.__class__ is not State:
+        target = target(fsm, signal)
+    restart_at(fsm, target, signal)
+    left(fsm.env, waited)
+
+
+def restart_at(fsm: Any, target: Any, event: Event) -> None:
+    """Leave the current state of `fsm`, whose process has stopped waiting,
+    and start over in `target`; `event` resumes the process."""
+    process = fsm.process
+    process._generator.close()
+    process._generator = fsm._generator_at(target)
+    event._value = None
+    process._resume(event)
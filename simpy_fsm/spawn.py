@@ -0,0 +1,297 @@
+"""
+Bulk creation of FSM instances.
+
+`FSM.spawn_many(env, n, initial_state, per_instance=..., **params)` creates
+`n` instances of an FSM class at once, and returns them as an `FSMGroup`:
+
+    machines = Machine.spawn_many(
+        env, 100_000, "working",
+        per_instance={"id": range(100_000)},  # one value per instance
+        repairman=repairman,                  # shared by all instances
+        route=["lathe", "mill"],              # shared too, even a list
+    )
+    machines.alive()              # number of machines whose process runs
+    machines.state_counts()       # Counter({'working': 100000})
+    machines.signal(BREAK)        # one event signals every machine
+
+Creating instances one by one is dominated by two costs that grow with the
+population: every process pushes its Initialize event onto the event heap
+separately, and every few hundred allocations the cyclic garbage collector
+scans the ever-growing set of live objects. `spawn_many` collects the
+Initialize events and adds them to the heap in one `heapify`, and keeps the
+garbage collector paused while it builds the instances.
+
+A class with `autostart = False` creates no Process in `__init__`: its
+instances have `process = None`, and hold no generator and no event, until
+they are started. `fsm.start(at=...)`, `start_all(fsms, at=...)` and
+`FSMGroup.start(at=...)` start them now, at a later simulation time, or each
+at its own time:
+
+    class Car(FSM):
+        autostart = False
+
+    cars = Car.spawn_many(env, 100_000, "parked")   # nothing scheduled yet
+    cars.start(at=range(100_000))                   # one more car per minute
+
+The FSMs that start at the same time share one urgent event, which creates
+their Processes when it fires.
+
+`gc_frozen()` runs a block, typically `env.run()`, with the objects that
+exist when it starts frozen out of the cyclic garbage collector, so that the
+collector's full passes do not scan the whole population again and again.
+"""
+
+import collections
+import contextlib
+import gc
+import heapq
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import simpy
+from simpy.events import NORMAL, PENDING, URGENT, Event
+
+from simpy_fsm.signals import Signal
+
+
+class FSMGroup:
+    """A group of FSM instances, e.g. as returned by `FSM.spawn_many()`.
+
+    Behaves like a read-only list of the instances, and answers questions
+    about the group as a whole.
+    """
+
+    __slots__ = ("env", "members")
+
+    def __init__(self, env: "simpy.core.Environment", members: List[Any]):
+        self.env = env
+        self.members = members
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.members)
+
+    def __getitem__(self, index):
+        return self.members[index]
+
+    def __repr__(self):
+        return f"<FSMGroup of {len(self.members)}>"
+
+    def processes(self) -> List[simpy.Process]:
+        """Return the Simpy processes of the members that have started."""
+        return [fsm.process for fsm in self.members if fsm.process is not None]
+
+    def alive(self) -> int:
+        """Return the number of members whose process is still running."""
+        return sum(1 for process in self.processes() if process.is_alive)
+
+    def start(self, at: Any = None) -> None:
+        """Start the members: see `start_all`."""
+        start_all(self.members, at)
+
+    def state_counts(self) -> "collections.Counter[Optional[str]]":
+        """Return the number of members per state name (None counts the
+        members that have finished)."""
+        return collections.Counter(fsm.state_name for fsm in self.members)
+
+    def interrupt(self, cause: Optional[Any] = None) -> None:
+        """Interrupt the process of every member that is still running."""
+        for process in self.processes():
+            if process.is_alive:
+                process.interrupt(cause)
+
+    def signal(self, cause: Optional[Any] = None) -> Optional[Signal]:
+        """Signal `cause` to every member that is still running, in one
+        urgent event (see `simpy_fsm.signals`). Returns the `Signal`, or
+        None if no member is running."""
+        recipients = [
+            fsm
+            for fsm in self.members
+            if fsm.process is not None and fsm.process._value is PENDING
+        ]
+        if not recipients:
+            return None
+        return Signal.to_all(self.env, recipients, cause)
+
+    def all_done(self) -> simpy.events.AllOf:
+        """Return an event that triggers once the process of every member
+        that has started has ended."""
+        return self.env.all_of(self.processes())
+
+
+@contextlib.contextmanager
+def batched_schedule(env: "simpy.core.Environment"):
+    """Within this block, collect the events scheduled on `env`, and add them
+    to its event heap in one go when the block ends.
+
+    Only plain `simpy.Environment` heaps are batched; other environments
+    schedule every event as usual.
+    """
+    if type(env).schedule is not simpy.Environment.schedule:
+        yield
+        return
+
+    batch: List[tuple] = []
+    append = batch.append
+    eid = env._eid
+    now = env._now
+
+    def schedule(event, priority=NORMAL, delay=0):
+        append((now + delay, priority, next(eid), event))
+
+    env.schedule = schedule  # Shadows Environment.schedule on this instance
+    try:
+        yield
+    finally:
+        del env.schedule
+        if batch:
+            env._queue.extend(batch)
+            heapq.heapify(env._queue)
+
+
+@contextlib.contextmanager
+def gc_paused():
+    """Pause the cyclic garbage collector within this block."""
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+@contextlib.contextmanager
+def gc_frozen():
+    """Within this block, keep the cyclic garbage collector away from every
+    object that exists when the block starts.
+
+    Build the model first, then run it in this block:
+
+    >>> shop = setup(env)
+    >>> with gc_frozen():
+    >>>     env.run(until=SIM_TIME)
+
+    The collector then only scans the objects created during the run, instead
+    of the whole long-lived population at every full collection. Objects
+    created before the block that become garbage during it are not collected
+    until the block ends, unless reference counting frees them; finished
+    FSMs are, since they are not in reference cycles.
+    """
+    gc.collect()
+    gc.freeze()
+    try:
+        yield
+    finally:
+        gc.unfreeze()
+
+
+def check_per_instance(
+    n: int, per_instance: Dict[str, Sequence[Any]], shared: Dict[str, Any]
+) -> None:
+    """Raise ValueError unless every sequence in `per_instance` has `n`
+    values, and no parameter is both per instance and shared."""
+    for key, values in per_instance.items():
+        if key in shared:
+            raise ValueError(f"spawn_many: {key} is both per instance and shared")
+        if len(values) != n:
+            raise ValueError(
+                f"spawn_many: {key} has {len(values)} values for {n} instances"
+            )
+
+
+def spawn_many(
+    cls: type,
+    env: "simpy.core.Environment",
+    n: int,
+    initial_state: Optional[str] = None,
+    per_instance: Optional[Dict[str, Sequence[Any]]] = None,
+    **shared: Any,
+) -> FSMGroup:
+    """Create `n` instances of FSM class `cls` on `env`, and return them as
+    an `FSMGroup`.
+
+    Instance `i` is created as `cls(env, initial_state, **kwargs)`, where
+    `kwargs` holds the `i`-th value of every sequence in `per_instance`,
+    which maps parameter names to `n` values each, and every value of
+    `shared` as is, whatever its type. If `initial_state` is None,
+    `cls.__init__`'s default is used.
+    """
+    per_instance = per_instance or {}
+    check_per_instance(n, per_instance, shared)
+    if initial_state is not None:
+        shared["initial_state"] = initial_state
+
+    with gc_paused(), batched_schedule(env):
+        if not per_instance:
+            members = [cls(env, **shared) for _ in range(n)]
+        else:
+            keys = tuple(per_instance)
+            members = [
+                cls(env, **shared, **dict(zip(keys, values)))
+                for values in zip(*per_instance.values())
+            ]
+    return FSMGroup(env, members)
+
+
+def start(fsm: Any, at: Optional[float] = None) -> None:
+    """Start `fsm`, whose class has `autostart = False`: now, or at
+    simulation time `at`. The FSM methods `start()` are this function."""
+    start_all((fsm,), at)
+
+
+def start_all(fsms: Iterable[Any], at: Any = None) -> None:
+    """Start `fsms`, whose classes have `autostart = False`: now if `at` is
+    None, else at simulation time `at`. If `at` is a list, tuple or range,
+    it holds one start time per FSM.
+
+    An FSM that is started twice before its first start time starts at the
+    earlier of the two times.
+    """
+    fsms = list(fsms)
+    if not fsms:
+        return
+    for fsm in fsms:
+        if fsm.process is not None:
+            raise RuntimeError(f"{fsm!r} has already started.")
+    env = fsms[0].env
+    now = env.now
+    if isinstance(at, (list, tuple, range)):
+        if len(at) != len(fsms):
+            raise ValueError(f"start_all: {len(at)} start times for {len(fsms)} FSMs")
+        batches: Dict[Any, List[Any]] = {}
+        for fsm, time in zip(fsms, at):
+            batches.setdefault(time, []).append(fsm)
+    else:
+        batches = {at: fsms}
+    for time in batches:
+        if time is not None and time < now:
+            raise ValueError(f"Cannot start at {time}, before the current time {now}")
+
+    for time, batch in batches.items():
+        if time is None or time == now:
+            _start_now(env, batch)
+            continue
+        # The event's value is the batch of FSMs it starts
+        event = Event(env)
+        event._ok = True
+        event._value = batch
+        event.callbacks.append(_start_batch)
+        env.schedule(event, URGENT, time - now)
+
+
+def _start_batch(event: Event) -> None:
+    _start_now(event.env, [fsm for fsm in event._value if fsm.process is None])
+
+
+def _start_now(env: "simpy.core.Environment", fsms: List[Any]) -> None:
+    """Create the Processes of `fsms` now."""
+    if len(fsms) < len(env._queue):
+        # A heap push per Process costs less than one heapify of the queue
+        for fsm in fsms:
+            fsm._start()
+        return
+    with gc_paused(), batched_schedule(env):
+        for fsm in fsms:
+            fsm._start()
@@ -0,0 +1,709 @@
+"""
+State tables shared by the Simpy FSM variants.
+
+Every subclass of `StateMachine` (and so every `FSM` and `SubstateFSM`
+subclass in `simpy_fsm.v1` ... `v4`) finds its state methods once, when the
+class is defined, and replaces each of them on the class with a `State`
+object:
+
+    class Car(FSM):
+        def parking(self, data):
+            yield self.env.timeout(5)
+            return self.driving   # -> the class's `State` for `driving`
+
+    Car._states   # {'parking': <State Car.parking>, 'driving': ...}
+
+`self.driving` then evaluates to that shared `State` object: no bound method
+is created per transition, and the trampolines call `state.func` directly.
+
+Each `State` also has a small integer `id`, its position in the class's
+table. The trampolines store the running `State` as `fsm.current_state`, so
+`fsm.state_id` and `fsm.state_name` are always current:
+
+    Car._state_names        # ('parking', 'driving'), indexed by state id
+    car.state_id            # 1
+    car.state_name          # 'driving'
+
+A state method is any public generator function defined on the class or
+inherited from a base class, unless it is decorated with `@not_a_state`. A
+helper generator that states `yield from` must be decorated so, or it
+becomes a `State`, which cannot be called:
+
+    class Car(FSM):
+        @not_a_state
+        def wait_a_bit(self, n):
+            yield self.env.timeout(n)
+
+        def parking(self, data):
+            yield from self.wait_a_bit(2)
+            return self.driving
+
+A state that only waits and moves on can instead be declared with `timed()`;
+the trampolines run such a state without a generator:
+
+    class Car(FSM):
+        parking = timed(5, "driving")
+        driving = timed(2, "parking")
+
+A class can also declare the signals its states handle (see
+`simpy_fsm.signals`); `compile_signals` turns the declarations into one dict
+per state id, `cls._signal_table`.
+
+A state that only waits for a signal or an interrupt can be declared with
+`dormant()`: it puts nothing on the event queue while it waits.
+
+`max_dwell` limits how long an FSM may stay in a state; `compile_dwell`
+arms one shared watchdog on entry to such a state, and disarms it on exit:
+
+    class Machine(FSM):
+        max_dwell = {"awaiting_repairman": (120, "escalated")}
+
+`self.sleep(delay)` waits like `self.env.timeout(delay)`, with one shared,
+recycled event for all FSMs that wake up at the same time (see
+`simpy_fsm.waits`).
+
+A generator state decorated with `@looping` handles `return self.<itself>`
+by starting over in the same generator.
+
+In the variants whose states take arguments (v2, v3), a state passes
+arguments to the next one with `return self.goto(self.next_state, *args)`,
+which fills in and returns the FSM's own `Transition` instead of a new tuple.
+"""
+
+import inspect
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Optional, Tuple
+
+from simpy.events import Event
+from simpy.exceptions import Interrupt
+
+from simpy_fsm.rewrite import make_looping
+from simpy_fsm.timers import watchdog
+from simpy_fsm.waits import waits
+
+
+class Timed:
+    """The declaration of a timed state, as returned by `timed()`."""
+
+    __slots__ = (
+        "duration", "next_state", "on_enter", "on_timeout", "on_interrupt",
+        "on_signal",
+    )
+
+    def __init__(
+        self, duration, next_state, on_enter, on_timeout, on_interrupt, on_signal
+    ):
+        self.duration = duration
+        self.next_state = next_state
+        self.on_enter = on_enter
+        self.on_timeout = on_timeout
+        self.on_interrupt = on_interrupt
+        self.on_signal = on_signal
+
+
+def timed(
+    duration: Any,
+    next_state: Optional[str],
+    *,
+    on_enter: Optional[Callable[..., Any]] = None,
+    on_timeout: Optional[Callable[..., Any]] = None,
+    on_interrupt: Any = None,
+    on_signal: Any = None,
+) -> Timed:
+    """Declare a state that waits for `duration`, then goes to `next_state`.
+
+        class MachineFailure(FSM):
+            break_machine = timed(
+                lambda self: random.expovariate(1 / MTTF),
+                "break_machine",
+                on_timeout=lambda self: self.machine.process.interrupt(),
+            )
+
+    - `duration`: a number, or a callable that returns one.
+    - `next_state`: the name of the next state, or None to stop.
+    - `on_enter`, `on_timeout`: callables to run when the state is entered,
+      and when its duration has passed.
+    - `on_interrupt`: what to do when the process is interrupted while it
+      waits: the name of the state to go to, or a callable that returns the
+      next `State` (or None). Without it, the Interrupt propagates, just as
+      it would from a state method without a `try`.
+    - `on_signal`: where a signal goes that the class's `signals` do not
+      handle in this state (see `simpy_fsm.signals`): the name of a state,
+      or a callable that returns the next state. Without it, such a signal
+      is ignored, and the state waits for the rest of its duration.
+
+    Callables get the arguments the variant's trampoline gives its states:
+    `(self, data)` in `simpy_fsm.v1`, `(self)` in the other variants;
+    `on_interrupt` and `on_signal` get the Interrupt or the `Signal` as an
+    extra last argument.
+
+    The trampoline waits for the state's Timeout itself: visiting a timed
+    state creates no generator, and does not go through `yield from`.
+    """
+    return Timed(duration, next_state, on_enter, on_timeout, on_interrupt, on_signal)
+
+
+class Dormant:
+    """The declaration of a dormant state, as returned by `dormant()`."""
+
+    __slots__ = ("on_enter", "on_signal", "on_interrupt")
+
+    def __init__(self, on_enter, on_signal, on_interrupt):
+        self.on_enter = on_enter
+        self.on_signal = on_signal
+        self.on_interrupt = on_interrupt
+
+
+def dormant(
+    *,
+    on_enter: Optional[Callable[..., Any]] = None,
+    on_signal: Any = None,
+    on_interrupt: Any = None,
+) -> Dormant:
+    """Declare a state that waits for nothing: it puts no event on the event
+    queue, and only a signal or an interrupt wakes it up.
+
+        class Stoplight(FSM):
+            signals = {"off": {TurnOn: "on"}}
+            off = dormant(on_enter=lambda self: self.lamp_off())
+
+    instead of a state that polls to stay alive:
+
+        def off(self):
+            yield self.env.timeout(100)
+            return self.off
+
+    - `on_enter`: a callable to run when the state is entered.
+    - `on_signal`: where a signal goes that the class's `signals` do not
+      handle in this state: the name of a state, or a callable that returns
+      the next state. Without it, such signals are ignored, and the state
+      stays dormant. (The hierarchical engine, `simpy_fsm.hsm`, drops
+      unhandled signals before they reach any state.)
+    - `on_interrupt`: where an Interrupt goes: the name of a state, or a
+      callable that returns the next state. Without it, the Interrupt
+      propagates, as from a state method without a `try`.
+
+    Callables get the arguments the variant's trampoline gives its states,
+    as for `timed()`; `on_signal` and `on_interrupt` get the `Signal` or
+    the Interrupt as an extra last argument.
+
+    A dormant state runs as a small generator that waits for an Event that
+    nobody triggers, so it works in every generator variant.
+    """
+    return Dormant(on_enter, on_signal, on_interrupt)
+
+
+def looping(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Mark generator state method `func` as a looping state: when it
+    returns itself (`return self.working` from `working`), it starts over
+    in the same generator instead of ending it and having the trampoline
+    create a new one.
+
+        class Machine(FSM):
+            @looping
+            def working(self):
+                yield self.env.timeout(self.time_per_part())
+                self.parts_made += 1
+                return self.working    # loops; no new generator
+
+    Every iteration runs the body from the top, as a new visit would, and
+    the FSM's `current_state` stays the same, as it would. Parameters with
+    default values start over from their defaults, and `*args` and
+    `**kwargs` from empty, as `return self.working` would pass no arguments;
+    only the other locals of the previous iteration are still there. See
+    `simpy_fsm.rewrite`.
+
+    A parameter without a default, after `self` (and `data` in v1), raises
+    TypeError here: `return self.working` could not start a new visit of
+    such a state either.
+    """
+    if not inspect.isgeneratorfunction(func):
+        raise TypeError(f"looping() needs a generator state method, not {func!r}")
+    parameters = list(inspect.signature(func).parameters.values())
+    for parameter in parameters[2:]:
+        if parameter.default is parameter.empty and parameter.kind not in (
+            parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD,
+        ):
+            raise TypeError(
+                f"looping() cannot restart {func.__qualname__}(): "
+                f"parameter {parameter.name!r} has no default"
+            )
+    func._fsm_looping = True
+    return func
+
+
+def not_a_state(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Mark public generator method `func` as a helper rather than a state:
+    `compile_states` leaves it on the class as a plain method, so that states
+    can call it, as in `yield from self.wait_a_bit(2)`.
+
+        class Car(FSM):
+            @not_a_state
+            def wait_a_bit(self, n):
+                yield self.env.timeout(n)
+    """
+    func._fsm_not_a_state = True
+    return func
+
+
+class State:
+    """One state of an FSM class: the state method, the name it was defined
+    under, and its integer id within the class.
+
+    Returning `self.my_state` from a state returns this object; the
+    trampoline calls `state.func` with the FSM instance as its first
+    argument.
+
+    For a timed state (see `timed()`), `func` is None, and the trampoline
+    uses `delay` (or `delay_func`), `next_state` and the callbacks instead.
+    For a dormant state (see `dormant()`), `func` is generated from the
+    declaration once the class's states are known.
+    """
+
+    __slots__ = (
+        "name", "func", "owner", "id", "definition",
+        "delay", "delay_func", "next_state", "on_enter", "on_timeout",
+        "on_interrupt", "on_signal",
+    )
+
+    def __init__(self, name: str, definition: Any, owner: type, id: int):
+        self.name = name
+        self.definition = definition
+        self.owner = owner
+        self.id = id
+        if isinstance(definition, (Timed, Dormant)):
+            self.func = None
+        elif getattr(definition, "_fsm_looping", False):
+            self.func = make_looping(definition, name)
+        else:
+            self.func = definition
+        self.delay = None
+        self.delay_func = None
+        self.next_state = None
+        self.on_enter = None
+        self.on_timeout = None
+        self.on_interrupt = None
+        self.on_signal = None
+
+    def __repr__(self):
+        return f"<State {self.owner.__name__}.{self.name}>"
+
+    def __call__(self, *args: Any, **kwargs: Any):
+        raise TypeError(
+            f"{self.owner.__name__}.{self.name} is a state, which cannot be "
+            f"called: return it (`return self.{self.name}`) to go to it, or, "
+            f"if it is a helper generator, decorate it with @not_a_state"
+        )
+
+    def resolve_timed(self, states: Dict[str, "State"]) -> None:
+        """Fill in the timed-state fields from this state's `Timed`
+        declaration, looking up state names in `states`."""
+        timed = self.definition
+        if callable(timed.duration):
+            self.delay_func = timed.duration
+        else:
+            self.delay = timed.duration
+        self.next_state = self._lookup(states, timed.next_state, "next_state")
+        self.on_enter = timed.on_enter
+        self.on_timeout = timed.on_timeout
+        if isinstance(timed.on_interrupt, str):
+            self.on_interrupt = self._lookup(states, timed.on_interrupt, "on_interrupt")
+        else:
+            self.on_interrupt = timed.on_interrupt
+        if isinstance(timed.on_signal, str):
+            self.on_signal = self._lookup(states, timed.on_signal, "on_signal")
+        else:
+            self.on_signal = timed.on_signal
+
+    def resolve_dormant(self, states: Dict[str, "State"]) -> None:
+        """Generate `func` from this state's `Dormant` declaration, looking
+        up state names in `states`."""
+        declaration = self.definition
+        self.on_enter = declaration.on_enter
+        on_signal = declaration.on_signal
+        if isinstance(on_signal, str):
+            on_signal = self._lookup(states, on_signal, "on_signal")
+        if isinstance(declaration.on_interrupt, str):
+            self.on_interrupt = self._lookup(states, declaration.on_interrupt, "on_interrupt")
+        else:
+            self.on_interrupt = declaration.on_interrupt
+        self.func = dormant_func(self, on_signal)
+
+    def _lookup(self, states: Dict[str, "State"], name: Optional[str], field: str):
+        if name is None:
+            return None
+        try:
+            return states[name]
+        except KeyError:
+            raise ValueError(
+                f"{self.owner.__name__}.{self.name}: {field}={name!r} is not "
+                f"one of its states: {', '.join(states)}"
+            ) from None
+
+    def interrupted(self, interrupt: BaseException, *args: Any) -> Optional["State"]:
+        """Return the state that timed state `self` goes to when `interrupt`
+        arrives during its wait, or re-raise `interrupt` if it has no
+        `on_interrupt`. `args` are the arguments for the callbacks."""
+        handler = self.on_interrupt
+        if handler is None:
+            raise interrupt
+        if handler.__class__ is State:
+            return handler
+        return handler(*args, interrupt)
+
+    def signalled(self, signal: Event, *args: Any) -> Optional["State"]:
+        """Return the state that timed state `self` goes to when `signal`,
+        which the class's `signals` do not handle, arrives during its wait.
+        Only called if `self` has an `on_signal`; `args` are the arguments
+        for the callbacks."""
+        handler = self.on_signal
+        if handler.__class__ is State:
+            return handler
+        return handler(*args, signal)
+
+
+def dormant_func(state: State, on_signal: Any) -> Callable[..., Any]:
+    """Return the generator function that runs dormant state `state`, whose
+    unhandled signals go to `on_signal` (a `State`, a callable, or None)."""
+
+    def func(fsm: Any, *args: Any):
+        if state.on_enter is not None:
+            state.on_enter(fsm, *args)
+        # Nobody triggers this event: only an interrupt, or a signal that
+        # ends the wait (see `simpy_fsm.signals`), gets us past the yield.
+        wakeup = Event(fsm.env)
+        while True:
+            try:
+                signal = yield wakeup
+            except Interrupt as interrupt:
+                return state.interrupted(interrupt, fsm, *args)
+            if on_signal is None:
+                continue
+            if on_signal.__class__ is State:
+                return on_signal
+            return on_signal(fsm, *args, signal)
+
+    func.__name__ = state.name
+    func.__qualname__ = f"{state.owner.__qualname__}.{state.name}"
+    return func
+
+
+def dwell_func(state: State, limit: Any, expire: Callable[[Any], None]):
+    """Return a generator function that runs the function of `state`, and
+    arms the watchdog to call `expire(fsm)` if the FSM stays in `state`
+    longer than `limit` (a number, or a function of the FSM).
+
+    A state that returns itself stays in the state: the watchdog is armed on
+    the first entry only, and left armed across the self-transition, as it
+    is while a `@looping` state starts over.
+    """
+    func = state.func
+
+    def watched(fsm: Any, *args: Any, **kwargs: Any):
+        timers = watchdog(fsm.env)
+        if fsm not in timers:
+            timers.arm(fsm, limit(fsm) if callable(limit) else limit, expire)
+        result = None
+        try:
+            result = (yield from func(fsm, *args, **kwargs))
+            return result
+        finally:
+            if next_state_of(result) is not state:
+                timers.cancel(fsm)
+
+    watched.__name__ = func.__name__
+    watched.__qualname__ = func.__qualname__
+    # Flattened classes (see `simpy_fsm.rewrite`) must not inline the state
+    watched._fsm_max_dwell = True
+    return watched
+
+
+def next_state_of(result: Any) -> Any:
+    """Return the state that `result`, the return value of a state, leads
+    to: the state itself, or that of a `goto()` or `(state, args, kwargs)`
+    transition."""
+    if result.__class__ is tuple:
+        return result[0]
+    if result.__class__ is Transition:
+        return result.state
+    return result
+
+
+def is_state_method(name: str, value: Any) -> bool:
+    """Return True if class attribute `name = value` is a state method, or
+    a timed or dormant state. Methods decorated with `@not_a_state` are
+    not."""
+    if name.startswith("_") or getattr(value, "_fsm_not_a_state", False):
+        return False
+    return inspect.isgeneratorfunction(value) or isinstance(value, (Timed, Dormant))
+
+
+def compile_states(cls: type) -> Dict[str, State]:
+    """Find the state methods of `cls` and its bases, replace each one on
+    `cls` with a `State`, and store the name -> `State` table as
+    `cls._states`, and the state names by id as `cls._state_names`.
+
+    Every class gets its own `State` objects, also for inherited states, so
+    that a subclass's table never points into its base class's table.
+    """
+    definitions: Dict[str, Any] = {}
+    for klass in reversed(cls.__mro__):
+        for name, value in vars(klass).items():
+            if isinstance(value, State):
+                value = value.definition
+            if cls._is_state_method(name, value):
+                definitions[name] = value
+            else:
+                # A subclass may override a state with a non-state
+                definitions.pop(name, None)
+
+    states = {
+        name: State(name, definition, cls, id)
+        for id, (name, definition) in enumerate(definitions.items())
+    }
+    for name, state in states.items():
+        if isinstance(state.definition, Dormant):
+            state.resolve_dormant(states)
+        elif state.func is None:
+            state.resolve_timed(states)
+        setattr(cls, name, state)
+    cls._states = states
+    cls._state_names = tuple(states)
+    check_initial_state_default(cls)
+    return states
+
+
+# The signal table entry of a state without handlers
+_NO_SIGNALS: Mapping[Hashable, Any] = MappingProxyType({})
+
+# What a signal table returns for a signal that the state does not handle
+UNHANDLED = object()
+
+
+def compile_signals(cls: type) -> Tuple[Mapping[Hashable, Any], ...]:
+    """Resolve the `signals` declarations of `cls` and its bases into
+    `cls._signal_table`: per state id, a dict from signal to what it leads
+    to: a `State`, None (stop the machine), or a handler to call.
+
+    A subclass's `signals` add to, and override, those of its bases.
+    """
+    declared: Dict[str, Dict[Hashable, Any]] = {}
+    for klass in reversed(cls.__mro__):
+        for state_name, handlers in vars(klass).get("signals", {}).items():
+            declared.setdefault(state_name, {}).update(handlers)
+
+    states = cls._states
+    table: List[Mapping[Hashable, Any]] = [_NO_SIGNALS] * len(states)
+    for state_name, handlers in declared.items():
+        if state_name not in states:
+            raise ValueError(
+                f"{cls.__name__}.signals: {state_name!r} is not one of its "
+                f"states: {', '.join(states)}"
+            )
+        resolved: Dict[Hashable, Any] = {}
+        for signal, target in handlers.items():
+            if callable(target):
+                resolved[signal] = target
+                continue
+            if target is not None and target not in states:
+                raise ValueError(
+                    f"{cls.__name__}.signals[{state_name!r}]: {signal!r} leads "
+                    f"to {target!r}, which is not one of its states: "
+                    f"{', '.join(states)}"
+                )
+            resolved[signal] = None if target is None else states[target]
+        table[states[state_name].id] = resolved
+    cls._signal_table = tuple(table)
+    return cls._signal_table
+
+
+def compile_dwell(cls: type) -> None:
+    """Apply the `max_dwell` declarations of `cls` and its bases: wrap the
+    function of every state that has a limit (see `dwell_func`), so that the
+    FSM leaves the state for its target once it has been in it too long.
+
+    A declaration maps a state name to `(limit, target)`. The target is a
+    state name, None to stop the FSM, or a callable that gets
+    `(fsm, signal)` and returns the next state, as in `signals`; the
+    signal's cause is `simpy_fsm.signals.MaxDwell`.
+
+    The limit counts from the moment the FSM enters the state from another
+    state. A self-transition (`return self.working` from `working`, whether
+    or not `working` is `@looping`) does not restart it, so an FSM that
+    keeps returning to the same state still expires. Entering the state
+    through a signal or a `max_dwell` target does restart it, also when the
+    target is the same state.
+    """
+    declared: Dict[str, Tuple[Any, Any]] = {}
+    for klass in reversed(cls.__mro__):
+        declared.update(vars(klass).get("max_dwell", {}))
+    if not declared:
+        return
+    if not hasattr(cls, "_dwell_expired"):
+        raise TypeError(
+            f"{cls.__name__}.max_dwell: only the FSMs of simpy_fsm.v1 ... v4 "
+            f"can limit how long they stay in a state"
+        )
+    states = cls._states
+    for state_name, (limit, target) in declared.items():
+        state = states.get(state_name)
+        if state is None:
+            raise ValueError(
+                f"{cls.__name__}.max_dwell: {state_name!r} is not one of its "
+                f"states: {', '.join(states)}"
+            )
+        if state.func is None:
+            raise TypeError(
+                f"{cls.__name__}.max_dwell: {state_name!r} is a timed state, "
+                f"which ends on its own"
+            )
+        if isinstance(target, str):
+            target = state._lookup(states, target, "max_dwell target")
+        state.func = dwell_func(
+            state, limit, lambda fsm, target=target: fsm._dwell_expired(target)
+        )
+
+
+def check_initial_state_default(cls: type) -> None:
+    """Raise ValueError if `cls.__init__` has a default `initial_state` that
+    is not one of its states.
+
+    This catches typos like `def __init__(self, env, initial_state="wroking")`
+    when the class is defined, instead of when it is instantiated. Classes
+    without states of their own (e.g. abstract bases) are not checked.
+    """
+    if not cls._states:
+        return
+    try:
+        parameter = inspect.signature(cls.__init__).parameters.get("initial_state")
+    except (TypeError, ValueError):
+        return
+    if parameter is None or not isinstance(parameter.default, str):
+        return
+    if parameter.default not in cls._states:
+        raise ValueError(
+            f"{cls.__name__}.__init__ defaults to initial_state="
+            f"{parameter.default!r}, which is not one of its states: "
+            f"{', '.join(cls._states)}"
+        )
+
+
+class StateMachine:
+    """Base class of `FSM` and `SubstateFSM`: compiles the state table of
+    every subclass when the subclass is defined, and exposes the state an
+    instance is in.
+
+    `current_state` is the `State` the instance is in (or, before its
+    process has started, the state it will start in); it is None once the
+    instance has returned None from its last state.
+    """
+
+    __slots__ = ("current_state",)
+
+    _states: Dict[str, State] = {}
+    _state_names: Tuple[str, ...] = ()
+
+    # state name -> {signal: the name of the state it leads to, None to
+    # stop, or a handler}; see `simpy_fsm.signals`
+    signals: Dict[str, Dict[Hashable, Any]] = {}
+    _signal_table: Tuple[Mapping[Hashable, Any], ...] = ()
+
+    # state name -> (maximum time in the state, where to go after it); see
+    # `compile_dwell`
+    max_dwell: Dict[str, Tuple[Any, Any]] = {}
+
+    # Decides which class attributes `compile_states` turns into states
+    _is_state_method = staticmethod(is_state_method)
+
+    @property
+    def state_id(self) -> Optional[int]:
+        """The id of the current state, or None if the FSM has finished."""
+        state = self.current_state
+        return None if state is None else state.id
+
+    @property
+    def state_name(self) -> Optional[str]:
+        """The name of the current state, or None if the FSM has finished."""
+        state = self.current_state
+        return None if state is None else state.name
+
+    def sleep(self, delay: Any) -> Event:
+        """Return an event that happens `delay` from now, like
+        `self.env.timeout(delay)`, but shared with every FSM that sleeps until
+        the same time, and recycled once it has fired: yield it right away.
+        See `simpy_fsm.waits`."""
+        try:
+            shared = self.env._fsm_waits
+        except AttributeError:
+            shared = waits(self.env)
+        return shared.sleep(delay)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        compile_states(cls)
+        compile_signals(cls)
+        compile_dwell(cls)
+
+    @classmethod
+    def _state(cls, name: str) -> State:
+        """Return the `State` called `name`, or raise a ValueError that lists
+        the valid names."""
+        try:
+            return cls._states[name]
+        except KeyError:
+            raise ValueError(
+                f"{cls.__name__} has no state {name!r}; its states are: "
+                f"{', '.join(cls._states) or '(none)'}"
+            ) from None
+
+
+class Transition:
+    """A transition to `state` that passes it `args` and `kwargs`, as
+    returned by `goto()`.
+
+    `kwargs` is None rather than an empty dict when there are no keyword
+    arguments, so that the trampoline can call `state.func(fsm, *args)`.
+    """
+
+    __slots__ = ("state", "args", "kwargs")
+
+    def __init__(self):
+        self.state: Optional[State] = None
+        self.args: Tuple[Any, ...] = ()
+        self.kwargs: Optional[Dict[str, Any]] = None
+
+    def __repr__(self):
+        return f"<Transition to {self.state!r} args={self.args!r} kwargs={self.kwargs!r}>"
+
+
+def goto(fsm: Any, state: State, *args: Any, **kwargs: Any) -> Transition:
+    """Return a transition to `state`, passing it `args` and `kwargs`. For
+    the variants whose states take arguments (`simpy_fsm.v2`, `v3`), whose
+    FSMs have this function as their `goto` method:
+
+        def awaiting_repairman(self):
+            request = self.repairman.request()
+            yield request
+            return self.goto(self.being_repaired, request)
+
+    Every call on `fsm` fills in and returns the same `Transition`, which
+    `fsm` creates on its first `goto()`, so a state must return it right
+    away, and not keep it. A state that passes no arguments can simply
+    `return self.next_state`.
+    """
+    transition = fsm._transition
+    if transition is None:
+        transition = fsm._transition = Transition()
+    transition.state = state
+    transition.args = args
+    transition.kwargs = kwargs or None
+    return transition
+
+
+def invalid_transition(fsm: Any, value: Any) -> TypeError:
+    """Return the error to raise when a state returns something that is not a
+    `State` of `fsm`'s class."""
+    return TypeError(
+        f"{type(fsm).__name__}: a state must return one of its states "
+        f"(e.g. `return self.my_state`) or None, not {value!r}"
+    )
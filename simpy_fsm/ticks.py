@@ -0,0 +1,161 @@
+"""
+An integer-tick Simpy Environment with a calendar queue.
+
+`simpy.Environment` keeps every scheduled event in one binary heap of
+`(time, priority, id, event)` tuples, so scheduling and processing an event
+cost O(log n) in the number of pending events, and times are floats:
+`env.now - start` after a few million minutes is no longer exact (see
+`worklog.md`, and the FIXME in the machine shop's `UnimportantWork`).
+
+`TickEnvironment` is a drop-in replacement whose clock counts whole ticks.
+Its queue is a calendar: one bucket per tick that has events, and a heap of
+only those ticks. Timer-heavy models schedule most events on a tick that
+already has a bucket, which is O(1): a dict lookup and a deque append. The
+heap only grows by the number of distinct pending ticks.
+
+    env = TickEnvironment(resolution=1000)      # 1000 ticks per minute
+    light = Stoplight(env, "green")             # any FSM, unchanged
+    yield env.timeout(env.ticks(2.5))           # 2500 ticks
+
+Delays must be whole ticks: an int, or a float without a fractional part.
+Anything else raises a TypeError, instead of rounding silently;
+`env.ticks(duration)` converts a duration in model units, rounding to the
+nearest tick. Within a tick, events run in the same order as in Simpy:
+by priority, then in the order they were scheduled.
+"""
+
+from collections import deque
+from heapq import heapify, heappop, heappush
+from numbers import Integral
+from typing import Any, Collection, Deque, Dict, List, Tuple
+
+import simpy
+from simpy.core import EmptySchedule, Infinity, StopSimulation
+from simpy.events import NORMAL, Event, EventPriority
+
+
+# A tick's events: the NORMAL ones in order, and a heap of
+# (priority, id, event) for the rest
+Bucket = Tuple[Deque[Event], List[Tuple[int, int, Event]]]
+
+
+def whole_ticks(delay: Any) -> int:
+    """Return `delay` as an int, or raise TypeError if it is not a whole
+    number of ticks."""
+    if isinstance(delay, Integral):
+        return int(delay)
+    if isinstance(delay, float) and delay.is_integer():
+        return int(delay)
+    raise TypeError(
+        f"A TickEnvironment schedules in whole ticks, not {delay!r}; "
+        f"use env.ticks(duration) to convert"
+    )
+
+
+class TickEnvironment(simpy.Environment):
+    """A Simpy Environment whose time is an int number of ticks, with
+    `resolution` ticks per unit of model time.
+
+    >>> env = TickEnvironment(resolution=10)
+    >>> env.ticks(0.25)
+    2
+    >>> env.timeout(0.5)
+    Traceback (most recent call last):
+    TypeError: A TickEnvironment schedules in whole ticks, not 0.5; ...
+    """
+
+    def __init__(self, initial_time: int = 0, resolution: int = 1):
+        super().__init__(whole_ticks(initial_time))
+        if resolution <= 0:
+            raise ValueError(f"resolution must be positive, not {resolution!r}")
+        self.resolution = resolution
+        # self._queue is the heap of the ticks that have a bucket
+        self._buckets: Dict[int, Bucket] = {}
+
+    def ticks(self, duration: float) -> int:
+        """Return `duration`, in units of model time, as a whole number of
+        ticks."""
+        return round(duration * self.resolution)
+
+    def schedule(
+        self, event: Event, priority: EventPriority = NORMAL, delay: Any = 0
+    ) -> None:
+        """Schedule `event` with `priority`, `delay` ticks from now."""
+        if delay.__class__ is not int:
+            delay = whole_ticks(delay)
+        at = self._now + delay
+        bucket = self._buckets.get(at)
+        if bucket is None:
+            bucket = self._buckets[at] = (deque(), [])
+            heappush(self._queue, at)
+        eid = next(self._eid)
+        if priority == NORMAL:
+            bucket[0].append(event)
+        else:
+            heappush(bucket[1], (priority, eid, event))
+
+    def queued(self) -> int:
+        """Return the number of events on the event queue."""
+        return sum(len(normal) + len(other) for normal, other in self._buckets.values())
+
+    def discard(self, events: Collection[Event]) -> int:
+        """Take `events` off the event queue, and return how many of them
+        were on it."""
+        removed = 0
+        buckets = self._buckets
+        for at, (normal, other) in list(buckets.items()):
+            kept = [event for event in normal if event not in events]
+            if len(kept) < len(normal):
+                removed += len(normal) - len(kept)
+                normal.clear()
+                normal.extend(kept)
+            if other:
+                size = len(other)
+                other[:] = [entry for entry in other if entry[2] not in events]
+                heapify(other)
+                removed += size - len(other)
+            if not normal and not other:
+                del buckets[at]
+        # In place, because step() may be processing an event
+        self._queue[:] = list(buckets)
+        heapify(self._queue)
+        return removed
+
+    def peek(self) -> Any:
+        """Return the tick of the next scheduled event, or `Infinity` if
+        there is none."""
+        try:
+            return self._queue[0]
+        except IndexError:
+            return Infinity
+
+    def step(self) -> None:
+        """Process the next event; raise EmptySchedule if there is none."""
+        try:
+            now = self._queue[0]
+        except IndexError:
+            raise EmptySchedule from None
+        normal, other = self._buckets[now]
+        if other and (not normal or other[0][0] < NORMAL):
+            event = heappop(other)[2]
+        else:
+            event = normal.popleft()
+        if not normal and not other:
+            heappop(self._queue)
+            del self._buckets[now]
+        self._now = now
+
+        # From here on, as in simpy.Environment.step()
+        callbacks, event.callbacks = event.callbacks, None
+        try:
+            for callback in callbacks:
+                callback(event)
+        except StopSimulation:
+            event.callbacks = callbacks[callbacks.index(callback) + 1 :]
+            self.schedule(event, EventPriority(-1))
+            raise
+
+        if not event._ok and not hasattr(event, "_defused"):
+            exc = type(event._value)(*event._value.args)
+            exc.__cause__ = event._value
+            raise exc
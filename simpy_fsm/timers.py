@@ -0,0 +1,201 @@
+"""
+A timer service: many per-FSM deadlines in one heap, woken by one event.
+
+Failure injection is usually written as one extra FSM per target, which
+sleeps and then interrupts its target:
+
+    class MachineFailure(FSM):
+        def break_machine(self):
+            yield self.env.timeout(self.shop.time_to_failure())
+            if not self.machine.broken:
+                self.machine.process.interrupt()
+            return self.break_machine
+
+So 100000 machines need 100000 extra Processes, each with a Timeout on the
+event queue. A `TimerService` keeps all those deadlines in one heap instead,
+and has one event on the queue, for the earliest deadline:
+
+    failures = TimerService(env)
+
+    def break_machine(machine):
+        if not machine.broken:             # skip the broken ones
+            machine.process.interrupt()
+        return shop.time_to_failure()      # and re-arm
+
+    for machine in machines:
+        failures.arm(machine, shop.time_to_failure(), break_machine)
+
+When a deadline comes, the service calls its action with the key it was
+armed for. If the action returns a delay, the key is re-armed with that
+delay; if it returns None, the timer is done.
+
+`arm()` and re-arming cost O(log n); `cancel()` costs O(1). Cancelled and
+replaced deadlines stay in the heap until they come up, or until they are
+more than half the heap, which then gets compacted.
+
+Actions run in an event callback, not in a process, so
+`env.active_process` is None while they run; they can interrupt or signal
+any FSM.
+
+`watchdog(env)` is the service that enforces the `max_dwell` limits of the
+FSMs on `env` (see `simpy_fsm.states.compile_dwell`).
+"""
+
+import heapq
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+import simpy
+from simpy.events import NORMAL, Event
+
+
+Action = Callable[[Any], Optional[float]]
+
+# Compact the heap only when it has at least this many entries
+MIN_COMPACT = 64
+
+
+class TimerService:
+    """Deadlines on environment `env`, at most one per key (usually an FSM),
+    in one heap.
+
+    >>> timers = TimerService(env)
+    >>> timers.arm(machine, 10, lambda machine: machine.process.interrupt())
+    >>> timers.deadline(machine)
+    10
+    >>> timers.cancel(machine)
+    True
+    """
+
+    __slots__ = (
+        "env", "_heap", "_armed", "_counter", "_stale", "_wake_at", "_wakeup", "_callback"
+    )
+
+    def __init__(self, env: "simpy.core.Environment"):
+        self.env = env
+        # [deadline, sequence number, key, action]; the sequence number keeps
+        # deadlines at the same time in the order they were armed. A stale
+        # entry has None for its key and action.
+        self._heap: List[List[Any]] = []
+        # key -> its live heap entry
+        self._armed: Dict[Hashable, List[Any]] = {}
+        self._counter = 0
+        # Heap entries that were cancelled or replaced
+        self._stale = 0
+        # The time of the earliest wake-up event on the event queue
+        self._wake_at = float("inf")
+        self._callback = self._wake
+        # The wake-up event, reused once Simpy has processed it
+        self._wakeup = Event(env)
+        self._wakeup._ok = True
+        self._wakeup._value = None
+        self._wakeup.callbacks = None
+
+    def __len__(self) -> int:
+        return len(self._armed)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._armed
+
+    def __repr__(self):
+        return f"<TimerService with {len(self._armed)} timers>"
+
+    def arm(self, key: Hashable, delay: float, action: Action) -> None:
+        """Call `action(key)` after `delay`, instead of at the deadline that
+        `key` had, if any. If `action` returns a delay, `key` is armed again
+        with it."""
+        if delay < 0:
+            raise ValueError(f"Negative delay {delay}")
+        old = self._armed.get(key)
+        if old is not None:
+            self._forget(old)
+        deadline = self.env.now + delay
+        entry = [deadline, self._counter, key, action]
+        self._counter += 1
+        self._armed[key] = entry
+        heapq.heappush(self._heap, entry)
+        if deadline < self._wake_at:
+            self._schedule(deadline)
+
+    def cancel(self, key: Hashable) -> bool:
+        """Forget the deadline of `key`, and return whether it had one."""
+        entry = self._armed.pop(key, None)
+        if entry is None:
+            return False
+        self._forget(entry)
+        return True
+
+    def deadline(self, key: Hashable) -> Optional[float]:
+        """Return the time at which `key` is due, or None if it is not
+        armed."""
+        entry = self._armed.get(key)
+        return None if entry is None else entry[0]
+
+    def _forget(self, entry: List[Any]) -> None:
+        """Mark heap entry `entry` stale, and compact the heap if more than
+        half of it is stale."""
+        entry[2] = entry[3] = None
+        self._stale += 1
+        if self._stale > MIN_COMPACT and 2 * self._stale > len(self._heap):
+            self._compact()
+
+    def _schedule(self, deadline: float) -> None:
+        """Put a wake-up event on the event queue for `deadline`."""
+        env = self.env
+        wakeup = self._wakeup
+        if wakeup.callbacks is None:
+            # Processed: put the same event on the queue again
+            wakeup.callbacks = [self._callback]
+        else:
+            # Still on the queue for a later deadline, where it will find
+            # nothing to do
+            wakeup = self._wakeup = Event(env)
+            wakeup._ok = True
+            wakeup._value = None
+            wakeup.callbacks.append(self._callback)
+        env.schedule(wakeup, NORMAL, deadline - env.now)
+        self._wake_at = deadline
+
+    def _wake(self, event: Event) -> None:
+        """Run the actions of every deadline that has come, and schedule the
+        wake-up for the next one."""
+        env = self.env
+        now = env.now
+        if now < self._wake_at:
+            return  # An earlier deadline was armed after this wake-up
+        heap = self._heap
+        armed = self._armed
+        while heap and heap[0][0] <= now:
+            _, _, key, action = heapq.heappop(heap)
+            if action is None:
+                self._stale -= 1
+                continue
+            del armed[key]
+            delay = action(key)
+            if delay is not None:
+                self.arm(key, delay, action)
+        # While we ran the actions, `arm` scheduled nothing: the next
+        # wake-up is ours to schedule.
+        self._wake_at = float("inf")
+        while heap and heap[0][3] is None:
+            heapq.heappop(heap)
+            self._stale -= 1
+        if heap:
+            self._schedule(heap[0][0])
+
+    def _compact(self) -> None:
+        """Drop the cancelled and replaced entries from the heap."""
+        # In place, because `_wake` may be walking the heap
+        heap = self._heap
+        heap[:] = [entry for entry in heap if entry[3] is not None]
+        heapq.heapify(heap)
+        self._stale = 0
+
+
+def watchdog(env: "simpy.core.Environment") -> TimerService:
+    """Return the TimerService that enforces the `max_dwell` limits of the
+    FSMs on `env`, creating it the first time."""
+    try:
+        return env._fsm_watchdog
+    except AttributeError:
+        env._fsm_watchdog = TimerService(env)
+        return env._fsm_watchdog
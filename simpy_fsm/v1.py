@@ -5,9 +5,20 @@ Simpy FSM variant 1:
 """
 
 from types import SimpleNamespace
-from typing import Callable, Generator, TypeVar, Any, Optional, Iterator
+from typing import Callable, Generator, TypeVar, Any, Optional, Iterator, Tuple, Dict, Sequence
 
-import simpy  # Only used for type annotations
+import simpy
+from simpy import Interrupt, Timeout
+
+from simpy_fsm.data import slotted_namespace
+from simpy_fsm.rewrite import flat_trampoline
+from simpy_fsm.signals import Signal, expire_dwell, receive
+from simpy_fsm.spawn import FSMGroup, spawn_many, start
+from simpy_fsm.states import (
+    State, StateMachine, dormant, invalid_transition, looping, not_a_state,
+    timed
+)
+from simpy_fsm.waits import FSMProcess
 
 
 # Create a few helper aliases to prevent recursive type definitions:
@@ -17,15 +28,14 @@ FsmGen = Generator[simpy.Event, Any, Any]
 FsmGenFunc = Callable[[Data], FsmGen]
 
 
-def _trampoline(data: Data, initial_state: FsmGenFunc) -> FsmGen:
+def _trampoline(fsm: Any, data: Data, initial_state: State) -> FsmGen:
     """Tie multiple subgenerators into one generator that passes control
     between them.
 
     The trampoline generator starts by yielding from the first
     subgenerator; when that subgenerator is done, it `return`s the next
-    generator function to yield from. This lets you write a multi-state
-    process as multiple subgenerators, one per state, that transition into
-    each other.
+    state to yield from. This lets you write a multi-state process as
+    multiple subgenerators, one per state, that transition into each other.
 
     You can pass the resulting generator to Simpy's `env.process(...)` to
     create a corresponding Simpy Process.
@@ -37,46 +47,86 @@ def _trampoline(data: Data, initial_state: FsmGenFunc) -> FsmGen:
     How this _trampoline() method works:
     - It's a generator, so it can be passed to `env.process`.
     - It delegates to the subgenerator (the current state method) via
-      `yield from state()`. This statement opens a two-way communication
-      channel between the subgenerator and Simpy's env simulation-runner.
-      When a state yields, it yields control to the Simpy environment.
+      `yield from state.func(fsm, data)`. This statement opens a two-way
+      communication channel between the subgenerator and Simpy's env
+      simulation-runner. When a state yields, it yields control to the Simpy
+      environment.
     - When a state is done, it can `return self.my_next_state` this returns
       control to the _trampoline() function, which delegates to the new
-      subgenerator.
+      subgenerator. `self.my_next_state` is the `State` object from the
+      class's state table (see `simpy_fsm.states`), so the trampoline calls
+      its function directly instead of going through a bound method.
 
     Example usage:
 
-        SimpleNamespace(count=1)
-
-        def f1(data):
-            yield "One"
-            data.count += 1
-            if 7 < data.count:
-                return
-            return f2
-
-        def f2(data):
-            yield "Two"
-            data.count += 2
-            return f1
-
-        process = _trampoline(None, f1)
-        # yields "One", "Two", "One", ...; stops after the counter reaches 7
+        class Counter(FSM):
+            def f1(self, data):
+                yield self.env.timeout(1)
+                data.count += 1
+                if 7 < data.count:
+                    return
+                return self.f2
+
+            def f2(self, data):
+                yield self.env.timeout(1)
+                data.count += 2
+                return self.f1
+
+        counter = Counter(env, "f1", data=SimpleNamespace(count=1))
+        # Runs _trampoline(counter, counter.data, Counter.f1) as a process:
+        # f1, f2, f1, ...; stops after the counter exceeds 7
     """
-    state_generator: FsmGen = initial_state(data)
-    while True:
+    state: Optional[State] = initial_state
+    while state is not None:
+        try:
+            state_func = state.func
+        except AttributeError:
+            raise invalid_transition(fsm, state) from None
+        fsm.current_state = state
+        if state_func is None:
+            # A timed state (see `simpy_fsm.states.timed`): wait for its
+            # Timeout right here, without a generator of its own.
+            if state.on_enter is not None:
+                state.on_enter(fsm, data)
+            delay_func = state.delay_func
+            timeout = Timeout(
+                fsm.env, state.delay if delay_func is None else delay_func(fsm, data)
+            )
+            try:
+                woken = yield timeout
+                while woken.__class__ is Signal and state.on_signal is None:
+                    # A signal that this state does not handle: wait for
+                    # the rest of the delay
+                    woken = yield timeout
+            except Interrupt as interrupt:
+                state = state.interrupted(interrupt, fsm, data)
+                continue
+            if woken.__class__ is Signal:
+                state = state.signalled(woken, fsm, data)
+                continue
+            if state.on_timeout is not None:
+                state.on_timeout(fsm, data)
+            state = state.next_state
+            continue
         # Inside the brackets: `yield from` connects the state's generator
         # directly to our process's driver, a Simpy Environment.
         #
         # Eventually, the generator will `return`; at that point, control
-        # returns here, and we use the return value as the next state function.
-        state_func: Optional[FsmGenFunc] = (yield from state_generator)
-        if state_func is None:
-            break
-        state_generator: FsmGen = state_func(data)  # type: ignore
+        # returns here, and we use the return value as the next state.
+        state = (yield from state_func(fsm, data))
+    fsm.current_state = None
+
 
+def _trampoline_for(cls: type) -> Callable[..., FsmGen]:
+    """Return the trampoline to run FSM class `cls` with: its flattened
+    generator if `cls.flatten` is true (see `simpy_fsm.rewrite.flatten`),
+    else `_trampoline`."""
+    if cls.flatten:
+        return flat_trampoline(cls, ("fsm", "data"), _trampoline)
+    return _trampoline
 
-class FSM:
+
+class FSM(StateMachine):
     """To write a Simpy process in finite state machine style, inherit from
     this class.
 
@@ -110,23 +160,110 @@ class FSM:
     >>> env.run(until=15)
     >>> car1.data.n_trips
     2
+    >>> car1.state_name, car1.state_id  # kept current by the trampoline
+    ('parked', 1)
+
+    For large populations, declare `__slots__` for the attributes your class
+    sets on `self`, and `data_slots` for the attributes its states set on
+    `data`:
+
+    >>> class Car(FSM):
+    >>>     __slots__ = ()
+    >>>     data_slots = ('n_trips',)
+
+    Instances of such a class have no `__dict__`, and their default `data`
+    is a slotted namespace instead of a SimpleNamespace.
     """
 
+    __slots__ = ("env", "data", "process")
+
+    # Run instances in one flattened generator; see `_trampoline_for`
+    flatten = False
+
+    # Create the process in `__init__`, rather than in `start()` (see
+    # `simpy_fsm.spawn`)
+    autostart = True
+
+    # Attribute names of the default `data` object; None means "any name"
+    data_slots: Optional[Tuple[str, ...]] = None
+    _data_class: type = SimpleNamespace
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "data_slots" in vars(cls):
+            cls._data_class = (
+                SimpleNamespace
+                if cls.data_slots is None
+                else slotted_namespace(f"{cls.__name__}Data", cls.data_slots)
+            )
+
     def __init__(self, env: "simpy.core.Environment", initial_state: str, data=None):
         """Init state machine instance, and init its Process as
-        `self.process`.
+        `self.process` (unless the class has `autostart = False`).
         """
 
         self.env = env
+        self.current_state = self._state(initial_state)
         # Create `self.data` as a public handle of the `data` object
-        self.data = data if data is not None else SimpleNamespace()
-        # Create a process; add it to the env; and make it accessible on self.
-        self.process = env.process(
-            _trampoline(data=self.data, initial_state=getattr(self, initial_state))
+        self.data = data if data is not None else self._data_class()
+        self.process: Optional[simpy.Process] = None
+        if self.autostart:
+            self._start()
+
+    def _start(self) -> None:
+        """Create this FSM's Process, which starts in `current_state`."""
+        self.process = FSMProcess(
+            self.env, _trampoline_for(type(self))(self, self.data, self.current_state)
         )
 
+    start = start
+
+    @classmethod
+    def spawn_many(
+        cls,
+        env: "simpy.core.Environment",
+        n: int,
+        initial_state: Optional[str] = None,
+        per_instance: Optional[Dict[str, Sequence[Any]]] = None,
+        **params: Any,
+    ) -> FSMGroup:
+        """Create `n` instances in one go, and return them as an `FSMGroup`.
+
+        >>> cars = Car.spawn_many(env, 3, initial_state='parked')
+        >>> cars.alive()
+        3
+
+        Other keyword arguments go to `__init__` of every instance as they
+        are; `per_instance` maps argument names to one value per instance:
+
+        >>> cars = Car.spawn_many(env, 3, 'parked', per_instance={'id': range(3)})
+
+        See `simpy_fsm.spawn`.
+        """
+        return spawn_many(cls, env, n, initial_state, per_instance, **params)
+
+    def signal(self, cause: Any = None) -> Signal:
+        """Send signal `cause` to this FSM. Unlike `process.interrupt()`, it
+        raises no exception in the state: see `simpy_fsm.signals`.
+
+        >>> car.signal('Get driving')
+        """
+        return Signal(self, cause)
+
+    _receive = receive
+    _dwell_expired = expire_dwell
+
+    def _generator_at(self, state: Optional[State]) -> FsmGen:
+        """Return a new trampoline for this FSM that starts in `state`."""
+        return _trampoline_for(type(self))(self, self.data, state)
+
+
+class SubstateFSM(StateMachine):
+    __slots__ = ("env", "generator")
+
+    # Run instances in one flattened generator; see `_trampoline_for`
+    flatten = False
 
-class SubstateFSM:
     def __init__(self, env: "simpy.core.Environment", initial_state: str, data):
         """Init sub-state machine instance, and init its generator as
         `self.generator`.
@@ -136,10 +273,20 @@ class SubstateFSM:
         """
 
         self.env = env
+        self.current_state = self._state(initial_state)
         # Create our generator, and make it accessible on self.
-        self.generator = _trampoline(
-            data=data, initial_state=getattr(self, initial_state)
-        )
+        self.generator = _trampoline_for(type(self))(self, data, self.current_state)
+
+    def restart(self, initial_state: str, data) -> FsmGen:
+        """Put this machine back in `initial_state`, with a new generator,
+        and return that generator. A parent can create its sub-machine once,
+        and re-enter it every time with
+        `yield from self.substate.restart('green', data)`.
+        """
+        self.generator.close()
+        self.current_state = self._state(initial_state)
+        self.generator = _trampoline_for(type(self))(self, data, self.current_state)
+        return self.generator
 
 
 def process_name(i: int, of: int) -> str:
@@ -1,13 +1,24 @@
 """
 Simpy FSM variant 2:
     - State method initialized with (self, args, kwargs)
-    - State method eventually returns (next state method, args, kwargs)
+    - State method eventually returns (next state method, args, kwargs), or
+      the bare next state method, or `self.goto(next state method, *args,
+      **kwargs)`
 """
 
 from types import SimpleNamespace
-from typing import Callable, Generator, TypeVar, Any, Optional, Iterator
+from typing import Callable, Generator, TypeVar, Any, Optional, Iterator, Dict, Sequence
 
-import simpy  # Only used for type annotations
+import simpy
+from simpy import Interrupt, Timeout
+
+from simpy_fsm.signals import Signal, expire_dwell, receive
+from simpy_fsm.spawn import FSMGroup, spawn_many, start
+from simpy_fsm.states import (
+    State, StateMachine, Transition, dormant, goto, invalid_transition, looping,
+    not_a_state, timed
+)
+from simpy_fsm.waits import FSMProcess
 
 
 # Create a few helper aliases to prevent recursive type definitions:
@@ -17,15 +28,14 @@ FsmGen = Generator[simpy.Event, Any, Any]
 FsmGenFunc = Callable[[Data], FsmGen]
 
 
-def _trampoline(initial_state: FsmGenFunc, args, kwargs) -> FsmGen:
+def _trampoline(fsm: Any, initial_state: State, args, kwargs) -> FsmGen:
     """Tie multiple subgenerators into one generator that passes control
     between them.
 
     The trampoline generator starts by yielding from the first
     subgenerator; when that subgenerator is done, it `return`s the next
-    generator function to yield from. This lets you write a multi-state
-    process as multiple subgenerators, one per state, that transition into
-    each other.
+    state to yield from. This lets you write a multi-state process as
+    multiple subgenerators, one per state, that transition into each other.
 
     You can pass the resulting generator to Simpy's `env.process(...)` to
     create a corresponding Simpy Process.
@@ -37,46 +47,98 @@ def _trampoline(initial_state: FsmGenFunc, args, kwargs) -> FsmGen:
     How this _trampoline() method works:
     - It's a generator, so it can be passed to `env.process`.
     - It delegates to the subgenerator (the current state method) via
-      `yield from state()`. This statement opens a two-way communication
-      channel between the subgenerator and Simpy's env simulation-runner.
-      When a state yields, it yields control to the Simpy environment.
-    - When a state is done, it can `return self.my_next_state` this returns
-      control to the _trampoline() function, which delegates to the new
-      subgenerator.
+      `yield from state.func(fsm, *args, **kwargs)`. This statement opens a two-way
+      communication channel between the subgenerator and Simpy's env
+      simulation-runner. When a state yields, it yields control to the Simpy
+      environment.
+    - When a state is done, it can `return self.my_next_state, args, kwargs`
+      this returns control to the _trampoline() function, which delegates to
+      the new subgenerator. `self.my_next_state` is the `State` object from the
+      class's state table (see `simpy_fsm.states`), so the trampoline calls
+      its function directly instead of going through a bound method.
+    - Returning the bare `self.my_next_state` (no arguments), or
+      `self.goto(self.my_next_state, *args, **kwargs)`, does the same
+      without building a tuple and a dict per transition.
 
     Example usage:
 
-        SimpleNamespace(count=1)
-
-        def f1(data):
-            yield "One"
-            data.count += 1
-            if 7 < data.count:
-                return
-            return f2
+        class Counter(FSM):
+            def f1(self, count):
+                yield self.env.timeout(1)
+                if 7 < count + 1:
+                    return None
+                return self.goto(self.f2, count + 1)
 
-        def f2(data):
-            yield "Two"
-            data.count += 2
-            return f1
+            def f2(self, count):
+                yield self.env.timeout(1)
+                return self.f1, (count + 2,), {}
 
-        process = _trampoline(None, f1)
-        # yields "One", "Two", "One", ...; stops after the counter reaches 7
+        counter = Counter(env, "f1", args=(1,))
+        # Runs _trampoline(counter, Counter.f1, (1,), {}) as a process:
+        # f1, f2, f1, ...; stops after the counter exceeds 7
     """
-    state_generator: FsmGen = initial_state(*args, **kwargs)
-    while True:
+    state: Optional[State] = initial_state
+    # args None: call the state with no arguments; kwargs None: with
+    # positional arguments only.
+    if not args and not kwargs:
+        args = None
+    kwargs = kwargs or None
+    while state is not None:
+        try:
+            state_func = state.func
+        except AttributeError:
+            raise invalid_transition(fsm, state) from None
+        fsm.current_state = state
+        if state_func is None:
+            # A timed state (see `simpy_fsm.states.timed`): wait for its
+            # Timeout right here, without a generator of its own.
+            if state.on_enter is not None:
+                state.on_enter(fsm)
+            delay_func = state.delay_func
+            timeout = Timeout(
+                fsm.env, state.delay if delay_func is None else delay_func(fsm)
+            )
+            try:
+                woken = yield timeout
+                while woken.__class__ is Signal and state.on_signal is None:
+                    # A signal that this state does not handle: wait for
+                    # the rest of the delay
+                    woken = yield timeout
+            except Interrupt as interrupt:
+                state, args = state.interrupted(interrupt, fsm), None
+                continue
+            if woken.__class__ is Signal:
+                state, args = state.signalled(woken, fsm), None
+                continue
+            if state.on_timeout is not None:
+                state.on_timeout(fsm)
+            state, args = state.next_state, None
+            continue
         # Inside the brackets: `yield from` connects the state's generator
         # directly to our process's driver, a Simpy Environment.
         #
         # Eventually, the generator will `return`; at that point, control
-        # returns here, and we use the return value as the next state function.
-        state_func, args, kwargs = (yield from state_generator)
-        if state_func is None:
-            break
-        state_generator: FsmGen = state_func(*args, **kwargs)  # type: ignore
-
-
-class FSM:
+        # returns here, and we use the return value as the next state.
+        if args is None:
+            result = (yield from state_func(fsm))
+        elif kwargs is None:
+            result = (yield from state_func(fsm, *args))
+        else:
+            result = (yield from state_func(fsm, *args, **kwargs))
+
+        if result.__class__ is State:
+            state, args = result, None
+        elif result.__class__ is Transition:
+            state, args, kwargs = result.state, result.args, result.kwargs
+        elif result.__class__ is tuple and len(result) == 3:
+            state, args, kwargs = result
+            kwargs = kwargs or None
+        else:
+            state, args = result, None  # None, or not a state (raises above)
+    fsm.current_state = None
+
+
+class FSM(StateMachine):
     """To write a Simpy process in finite state machine style, inherit from
     this class.
 
@@ -110,28 +172,110 @@ class FSM:
     >>> env.run(until=15)
     >>> car1.data.n_trips
     2
+    >>> car1.state_name, car1.state_id  # kept current by the trampoline
+    ('parked', 1)
+
+    For large populations, declare `__slots__` for the attributes your class
+    sets on `self`; its instances then have no `__dict__`:
+
+    >>> class Car(FSM):
+    >>>     __slots__ = ('n_trips',)
     """
 
+    __slots__ = ("env", "process", "_transition")
+
+    # Fills in this FSM's `_transition` (see `simpy_fsm.states.goto`)
+    goto = goto
+
+    # Create the process in `__init__`, rather than in `start()` (see
+    # `simpy_fsm.spawn`)
+    autostart = True
+
     def __init__(self, env: "simpy.core.Environment", initial_state: str, args=None, kwargs=None):
         """Init state machine instance, and init its Process as
-        `self.process`.
+        `self.process` (unless the class has `autostart = False`).
         """
 
         self.env = env
+        self.current_state = self._state(initial_state)
+        self._transition: Optional[Transition] = None
+        self.process: Optional[simpy.Process] = None
+        if not self.autostart:
+            if args or kwargs:
+                raise TypeError(
+                    f"{type(self).__name__} has autostart = False, so its "
+                    f"initial state cannot take arguments"
+                )
+            return
         # Create `self.data` as a public handle of the `data` object
         args = args if args is not None else ()
         kwargs = kwargs if kwargs is not None else {}
         # Create a process; add it to the env; and make it accessible on self.
-        self.process = env.process(
+        self.process = FSMProcess(
+            env,
             _trampoline(
-                initial_state=getattr(self, initial_state),
+                self,
+                initial_state=self.current_state,
                 args=args,
                 kwargs=kwargs,
-            )
+            ),
         )
 
+    def _start(self) -> None:
+        """Create this FSM's Process, which starts in `current_state`."""
+        self.process = FSMProcess(self.env, self._generator_at(self.current_state))
+
+    start = start
+
+    @classmethod
+    def spawn_many(
+        cls,
+        env: "simpy.core.Environment",
+        n: int,
+        initial_state: Optional[str] = None,
+        per_instance: Optional[Dict[str, Sequence[Any]]] = None,
+        **params: Any,
+    ) -> FSMGroup:
+        """Create `n` instances in one go, and return them as an `FSMGroup`.
+
+        >>> cars = Car.spawn_many(env, 3, initial_state='parked')
+        >>> cars.alive()
+        3
+
+        Other keyword arguments go to `__init__` of every instance as they
+        are; `per_instance` maps argument names to one value per instance:
+
+        >>> cars = Car.spawn_many(env, 3, 'parked', per_instance={'id': range(3)})
+
+        See `simpy_fsm.spawn`.
+        """
+        return spawn_many(cls, env, n, initial_state, per_instance, **params)
+
+    def signal(self, cause: Any = None) -> Signal:
+        """Send signal `cause` to this FSM. Unlike `process.interrupt()`, it
+        raises no exception in the state: see `simpy_fsm.signals`.
+
+        >>> car.signal('Get driving')
+        """
+        return Signal(self, cause)
+
+    _receive = receive
+    _dwell_expired = expire_dwell
+
+    def _generator_at(self, target: Any) -> FsmGen:
+        """Return a new trampoline for this FSM that starts in `target`, a
+        `State` or a `goto()` transition."""
+        if target.__class__ is Transition:
+            return _trampoline(self, target.state, target.args, target.kwargs)
+        return _trampoline(self, target, None, None)
+
+
+class SubstateFSM(StateMachine):
+    __slots__ = ("env", "generator", "_transition")
+
+    # Fills in this FSM's `_transition` (see `simpy_fsm.states.goto`)
+    goto = goto
 
-class SubstateFSM:
     def __init__(self, env: "simpy.core.Environment", initial_state: str, *args,
             **kwargs):
         """Init sub-state machine instance, and init its generator as
@@ -142,15 +286,29 @@ class SubstateFSM:
         """
 
         self.env = env
+        self.current_state = self._state(initial_state)
+        self._transition: Optional[Transition] = None
         # Create our generator, and make it accessible on self.
         args = args if args is not None else ()
         kwargs = kwargs if kwargs is not None else {}
         self.generator = _trampoline(
-            initial_state=getattr(self, initial_state),
+            self,
+            initial_state=self.current_state,
             args=args,
             kwargs=kwargs
         )
 
+    def restart(self, initial_state: str, *args, **kwargs) -> FsmGen:
+        """Put this machine back in `initial_state`, with a new generator
+        that passes `args` and `kwargs` to it, and return that generator. A
+        parent can create its sub-machine once, and re-enter it every time
+        with `yield from self.substate.restart('green')`.
+        """
+        self.generator.close()
+        self.current_state = self._state(initial_state)
+        self.generator = _trampoline(self, self.current_state, args, kwargs)
+        return self.generator
+
 
 def process_name(i: int, of: int) -> str:
     """Return e.g. '| | 2 |': an n-track name with track `i` (here i=2) marked.
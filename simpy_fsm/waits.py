@@ -0,0 +1,331 @@
+"""
+Shared, recycled wait events: `fsm.sleep(delay)`.
+
+Every `yield self.env.timeout(3)` allocates a Timeout, and puts it on the
+event queue, even when a hundred stoplights all wait until the same time,
+and the Timeout is garbage as soon as it has fired. `self.sleep(delay)`
+waits just as long, but:
+
+- all FSMs that sleep until the same absolute time wait for one event,
+  which is on the event queue once;
+- once that event has fired, it goes back to a free list, and the next
+  `sleep()` puts the same object on the event queue again.
+
+So a hundred stoplights that turn green together cost one event per phase
+instead of a hundred, and a population in a steady state stops allocating
+events at all:
+
+    class StoplightOn(SubstateFSM):
+        def green(self):
+            yield self.sleep(3)             # instead of self.env.timeout(3)
+            return self.yellow
+
+Interrupts and signals work as with a Timeout: the interrupted FSM stops
+waiting, and the others that share the event still wake up on time.
+
+Because the event is shared and then reused, yield it right away, and keep
+no reference to it: once it has fired, it may already stand for a later
+time. Its value is always None.
+
+An interrupted sleeper leaves its event on the event queue, where it would
+fire for nobody: a model whose states are interrupted again and again fills
+the queue with such stale events, which Simpy still compares and pops.
+`sleep()` events notice when their last sleeper has left them. Once more
+than half of the event queue is stale events (checked every `MIN_COMPACT`
+stale events), they are taken off the queue in one pass, and recycled.
+`waits(env).cancelled` counts the events taken off the queue this way,
+which never had to be processed. Note that this ends an `env.run()` without
+`until` at the last live event, not at the last stale one.
+
+Other events that an FSM leaves behind, such as the
+`env.timeout(self.work_left)` of an interrupted `working` state, stay on
+the event queue until they fire, as in Simpy: somebody else may hold on to
+them. `track_left(env)` opts in to treating them as stale too. An FSM's
+Process is an `FSMProcess`, whose interrupts, like the FSM's signals, tell
+`Waits.left()` which event the FSM stopped waiting for; with tracking on, an
+event that nothing else waits for counts as stale, until it fires or
+somebody yields it again. Compacting the queue takes such events off it,
+without recycling them. One that is yielded again goes back on the queue
+with its original entry, so it fires in the same order as if it had never
+left, or right away if its time has passed. So turn tracking on only if
+nothing in the model looks at events that the FSMs have left: such an event
+is not `processed` at its time, and no longer keeps `env.run()` going.
+Tracking needs a `simpy.Environment`: a `TickEnvironment` does not keep the
+order in which it scheduled its events.
+
+The sleepers that share an event wake up in the order in which they called
+`sleep()`, but all of them at the place in the event queue of the first one.
+So a later sleeper can wake up before other events that were scheduled at
+the same time after its event was, where it would have woken up after them
+with a Timeout of its own.
+"""
+
+import heapq
+from typing import Any, Collection, Dict, List, Optional, Set, Tuple
+
+import simpy
+from simpy.events import NORMAL, PENDING, Event, Interruption
+
+from simpy_fsm.ticks import TickEnvironment
+
+
+# Compact the event queue only when it has at least this many stale events
+MIN_COMPACT = 64
+
+
+class _Sleepers(list):
+    """The callbacks of a `sleep()` event: `_release` first, then the
+    sleepers. Tells `waits` when the last sleeper has left (see
+    `Waits._abandon`)."""
+
+    __slots__ = ("waits", "event")
+
+    def remove(self, callback: Any) -> None:
+        list.remove(self, callback)
+        if len(self) == 1:
+            self.waits._abandon(self.event)
+
+
+class _Discarded(list):
+    """The callbacks of a stale event that was taken off the event queue:
+    the first callback added to it puts the event back on the queue, with
+    its event queue `entry` (at the current time, if that has passed)."""
+
+    __slots__ = ("entry",)
+
+    def append(self, callback: Any) -> None:
+        list.append(self, callback)
+        entry = self.entry
+        if entry is not None:
+            self.entry = None
+            at, priority, eid, event = entry
+            env = event.env
+            heapq.heappush(env._queue, (max(at, env._now), priority, eid, event))
+
+
+class Waits:
+    """The shared wait events on environment `env`: at most one pending
+    event per wake-up time, and a free list of events that have fired.
+
+    >>> waits = Waits(env)
+    >>> waits.sleep(3) is waits.sleep(3)
+    True
+    >>> len(waits)      # pending wake-up times
+    1
+    """
+
+    __slots__ = (
+        "env", "cancelled", "tracking", "_pending", "_free", "_abandoned",
+        "_callback", "_forget",
+    )
+
+    def __init__(self, env: "simpy.core.Environment"):
+        self.env = env
+        # Stale events taken off the event queue before they fired
+        self.cancelled = 0
+        # Whether other events that FSMs leave count as stale; see
+        # `track_left`
+        self.tracking = False
+        # wake-up time -> the pending event for it
+        self._pending: Dict[Any, Event] = {}
+        # Events that have fired, to put on the event queue again
+        self._free: List[Event] = []
+        # Pending events that every sleeper has left, and (if tracking)
+        # other events on the event queue that every FSM waiting for them
+        # has left
+        self._abandoned: Set[Event] = set()
+        self._callback = self._release
+        self._forget = self._abandoned.discard
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __repr__(self):
+        return (
+            f"<Waits with {len(self._pending)} pending ({len(self._abandoned)} "
+            f"stale), {len(self._free)} free events>"
+        )
+
+    @property
+    def stale(self) -> int:
+        """The number of stale events: pending `sleep()` events that every
+        sleeper has left, and (if tracking) other events that every FSM has
+        left."""
+        return len(self._abandoned)
+
+    def sleep(self, delay: Any) -> Event:
+        """Return an event that happens `delay` from now, shared with every
+        other `sleep()` until the same time."""
+        env = self.env
+        at = env._now + delay
+        event = self._pending.get(at)
+        if event is not None:
+            if len(event.callbacks) == 1:
+                # Perhaps abandoned: it is not any more
+                self._abandoned.discard(event)
+            return event
+        if delay < 0:
+            raise ValueError(f"Negative delay {delay}")
+        free = self._free
+        if free:
+            event = free.pop()
+        else:
+            event = Event(env)
+            event._ok = True
+            event._value = None
+        sleepers = event.callbacks = _Sleepers((self._callback,))
+        sleepers.waits = self
+        sleepers.event = event
+        env.schedule(event, NORMAL, delay)
+        self._pending[at] = event
+        return event
+
+    def _release(self, event: Event) -> None:
+        """Recycle `event` as the first of its callbacks: the sleepers it
+        wakes up after this can already get it back from `sleep()`, for a
+        later time, because Simpy has taken its callbacks off it."""
+        del self._pending[self.env._now]
+        self._free.append(event)
+        if self._abandoned:
+            self._abandoned.discard(event)
+
+    def left(self, event: Optional[Event]) -> None:
+        """Note that an FSM has stopped waiting for `event`, because of an
+        interrupt or a signal. If tracking, the event is on the event queue,
+        and nothing else waits for it, count it as stale until it fires, or
+        somebody yields it again."""
+        if event is None or not self.tracking:
+            return
+        callbacks = event.callbacks
+        if (
+            callbacks  # Somebody else waits for it, or it is tracked already
+            or callbacks is None  # Processed
+            or callbacks.__class__ is _Sleepers  # Tracks its own sleepers
+            # Taken off the event queue, and not yielded again since
+            or (callbacks.__class__ is _Discarded and callbacks.entry is not None)
+            or event._value is PENDING  # Not on the event queue
+            or not event._ok  # Simpy must raise its exception
+        ):
+            return
+        # Forget the event when it fires
+        callbacks.append(self._forget)
+        self._abandon(event)
+
+    def _abandon(self, event: Event) -> None:
+        """Note that every sleeper has left `event`, and compact the event
+        queue if more than half of it is stale."""
+        abandoned = self._abandoned
+        abandoned.add(event)
+        # Counting the event queue costs O(n) for a TickEnvironment: check
+        # only every MIN_COMPACT stale events.
+        if len(abandoned) % MIN_COMPACT == 0 and 2 * len(abandoned) > queued(self.env):
+            self.compact()
+
+    def compact(self) -> int:
+        """Take the stale events off the event queue, recycle the `sleep()`
+        events among them, and return how many there were."""
+        abandoned = self._abandoned
+        if not abandoned:
+            return 0
+        # Skip the events that somebody has yielded again since they were
+        # left: only `_release` or `_forget` is waiting for a stale event.
+        stale = {event for event in abandoned if len(event.callbacks) == 1}
+        sleeps = {event for event in stale if event.callbacks.__class__ is _Sleepers}
+        if len(sleeps) < len(stale):
+            # Keep the entries of the tracked events, to put them back
+            taken = take(self.env, stale)
+            for entry in taken:
+                event = entry[3]
+                if event not in sleeps:
+                    callbacks = event.callbacks = _Discarded()
+                    callbacks.entry = entry
+            removed = len(taken)
+        else:
+            removed = discard(self.env, stale)
+        pending = self._pending
+        for at in [at for at, event in pending.items() if event in sleeps]:
+            del pending[at]
+        self._free.extend(sleeps)
+        abandoned.difference_update(stale)
+        self.cancelled += removed
+        return removed
+
+
+def queued(env: "simpy.core.Environment") -> int:
+    """Return the number of events on the event queue of `env`."""
+    if isinstance(env, TickEnvironment):
+        return env.queued()
+    return len(env._queue)
+
+
+def take(
+    env: "simpy.core.Environment", events: Collection[Event]
+) -> List[Tuple[Any, int, int, Event]]:
+    """Take `events` off the event queue of `simpy.Environment` `env`, and
+    return their `(time, priority, id, event)` entries."""
+    queue = env._queue
+    taken = [entry for entry in queue if entry[3] in events]
+    if taken:
+        # In place, because env.step() may be processing an event
+        queue[:] = [entry for entry in queue if entry[3] not in events]
+        heapq.heapify(queue)
+    return taken
+
+
+def discard(env: "simpy.core.Environment", events: Collection[Event]) -> int:
+    """Take `events` off the event queue of `env`, and return how many of
+    them were on it."""
+    if isinstance(env, TickEnvironment):
+        return env.discard(events)
+    return len(take(env, events))
+
+
+class FSMProcess(simpy.Process):
+    """The Process of an FSM: a `simpy.Process` whose interrupts tell
+    `left()` which event they made it stop waiting for."""
+
+    def interrupt(self, cause: Optional[Any] = None) -> None:
+        """Interrupt this process, as `simpy.Process.interrupt()` does."""
+        _Interruption(self, cause)
+
+
+class _Interruption(Interruption):
+    def _interrupt(self, event: Event) -> None:
+        target = self.process._target
+        super()._interrupt(event)
+        callbacks = target.callbacks
+        if callbacks is not None and not callbacks:
+            # Nobody waits for the target any more
+            left(self.env, target)
+
+
+def left(env: "simpy.core.Environment", event: Optional[Event]) -> None:
+    """Tell the `Waits` of `env` that an FSM has stopped waiting for
+    `event`, if it tracks such events (see `track_left`)."""
+    shared = getattr(env, "_fsm_waits", None)
+    if shared is not None and shared.tracking:
+        shared.left(event)
+
+
+def track_left(env: "simpy.core.Environment") -> Waits:
+    """Count the events that FSMs on `env` leave behind as stale, as well as
+    `sleep()` events, so that compaction takes them off the event queue;
+    return the `Waits` of `env`.
+
+    Raises TypeError for a `TickEnvironment`, which could not put such an
+    event back in its place on the queue if it was yielded again.
+    """
+    if isinstance(env, TickEnvironment):
+        raise TypeError("track_left() needs a simpy.Environment, not a TickEnvironment")
+    shared = waits(env)
+    shared.tracking = True
+    return shared
+
+
+def waits(env: "simpy.core.Environment") -> Waits:
+    """Return the `Waits` of `env`, creating it the first time."""
+    try:
+        return env._fsm_waits
+    except AttributeError:
+        env._fsm_waits = Waits(env)
+        return env._fsm_waits